@@ -4,22 +4,78 @@ CryptoAnalyzer - Aplicacion Flask Principal
 Analizador de Fortaleza Criptografica
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from modules.classic_ciphers import CaesarCipher, VigenereCipher, PlayfairCipher
 from modules.cryptanalysis import FrequencyAnalysis, BruteForce
+from modules.many_time_pad import recover_plaintexts, check_input_size
 from modules.modern_crypto import AESCrypto, RSACrypto, HybridCrypto
 from modules.reports import ReportGenerator
 from modules.modern_crypto import AESEvaluator, RSAEvaluator
 from modules.modern_crypto import StrengthEvaluator, VulnerabilityDetector
+from modules.key_pool import get_key_pool
+from modules.benchmark_history import BenchmarkHistory
+from modules import benchmark_suite
+from modules.randomness import run_battery, run_battery_stream
+from modules import scanner
+from modules.nonce_audit import audit_log
+from modules.batch_audit import evaluate_batch, BatchSummary
+from modules.batch_gcd import audit_shared_factors, iter_key_file
+from modules.key_audit import audit_key_file
+from modules.rsa_weakness import MAX_FERMAT_BUDGET_MS
+from modules import evaluation_tables
+from modules.evaluation_tables import cached_evaluation
+from modules.benchmark import DATA_DIR
 import io
+import json
 import base64
 import os
+import tempfile
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'cryptoanalyzer-secret-key-2024'
 
 print("APP CARGADA CORRECTAMENTE")
 
+# Única raíz de ficheros del servidor que la API puede leer (escaneos de directorios)
+SERVER_FILES_ROOT = os.environ.get('CRYPTOANALYZER_FILES_ROOT', os.path.join(DATA_DIR, 'files'))
+
+# Caché HTTP de las tablas de evaluación (el ETag cambia si cambia el contenido)
+EVALUATION_MAX_AGE = 3600
+EVALUATION_SHARED_MAX_AGE = 86400
+
+def record_benchmark(suite, results, params):
+    """Guarda el resultado en el histórico y lo compara con la línea base"""
+    try:
+        history = BenchmarkHistory()
+        run_id = history.record(suite, BenchmarkHistory.measurements_from_results(suite, results), params)
+        return dict(history.check_regressions(run_id), run_id=run_id)
+    except Exception as e:
+        # El histórico nunca debe hacer fallar el benchmark
+        return {'error': str(e)}
+
+def request_workers(value):
+    """Número de procesos pedido por el cliente, limitado a los núcleos disponibles"""
+    if not value:
+        return None
+    cpu_count = os.cpu_count() or 1
+    return max(1, min(int(value), cpu_count))
+
+def request_budget_ms(value):
+    """Presupuesto de Fermat por clave pedido por el cliente, limitado a MAX_FERMAT_BUDGET_MS"""
+    if value is None:
+        return None
+    return max(0.0, min(float(value), MAX_FERMAT_BUDGET_MS))
+
+def server_path(path):
+    """Ruta pedida por el cliente resuelta dentro de SERVER_FILES_ROOT (ValueError si sale de ella)"""
+    if not path:
+        raise ValueError('Se requiere una ruta')
+    root = os.path.realpath(SERVER_FILES_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError('Ruta fuera del directorio permitido')
+    return resolved
+
 # Rutas principales
 @app.route('/')
 def index():
@@ -203,6 +259,27 @@ def vigenere_estimate_key():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/analysis/many-time-pad', methods=['POST'])
+def many_time_pad():
+    try:
+        data = request.get_json()
+        encoded = data.get('ciphertexts', [])
+        if len(encoded) < 2:
+            return jsonify({'success': False, 'error': 'Se requieren al menos dos textos cifrados'}), 400
+        hex_encoding = data.get('encoding', 'base64') == 'hex'
+        # Tamaño decodificado estimado, antes de decodificar nada
+        check_input_size(len(c) // 2 if hex_encoding else len(c) * 3 // 4 for c in encoded)
+        if hex_encoding:
+            ciphertexts = [bytes.fromhex(c) for c in encoded]
+        else:
+            ciphertexts = [base64.b64decode(c, validate=True) for c in encoded]
+        results = recover_plaintexts(ciphertexts, cribs=data.get('cribs', []),
+                                     auto_apply=bool(data.get('auto_apply', True)),
+                                     top=int(data.get('top', 10)))
+        return jsonify({'success': True, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 # API - ALGORITMOS MODERNOS
 @app.route('/api/aes/generate-key', methods=['POST'])
 def aes_generate_key():
@@ -220,11 +297,42 @@ def rsa_generate_keypair():
     try:
         data = request.get_json()
         key_size = int(data.get('key_size', 2048))
-        keypair = RSACrypto.generate_keypair(key_size)
+        keypair = get_key_pool().acquire(key_size)
         return jsonify({'success': True, 'keypair': keypair})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/rsa/batch', methods=['POST'])
+def rsa_batch():
+    try:
+        data = request.get_json()
+        operation = data.get('operation', '')
+        key = data.get('key', '')
+        items = data.get('items', [])
+        workers = data.get('workers')
+
+        if operation not in RSACrypto.BATCH_OPERATIONS:
+            return jsonify({'success': False, 'error': 'Operación no soportada. Use encrypt, decrypt, sign o verify'}), 400
+
+        if not key:
+            return jsonify({'success': False, 'error': 'Se requiere una clave'}), 400
+
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'error': 'Se requiere una lista de elementos'}), 400
+
+        results = RSACrypto.batch(operation, items, key, workers=request_workers(workers))
+        failed = sum(1 for r in results if not r['success'])
+        return jsonify({'success': True, 'operation': operation, 'count': len(results), 'failed': failed, 'results': results})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/rsa/pool/metrics', methods=['GET'])
+def rsa_pool_metrics():
+    try:
+        return jsonify({'success': True, 'metrics': get_key_pool().metrics()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
  
 @app.route('/api/analyze/aes', methods=['POST'])
 def analyze_aes():
@@ -246,6 +354,198 @@ def analyze_aes():
             'error': str(e)
         })
 
+@app.route('/api/analyze/randomness', methods=['POST'])
+def analyze_randomness():
+    try:
+        # Fichero subido (se procesa por fragmentos) o datos en base64
+        if 'file' in request.files:
+            results = run_battery_stream(request.files['file'].stream)
+        else:
+            data = request.json
+            results = run_battery(data.get('data', ''))
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/scan', methods=['POST'])
+def start_scan():
+    try:
+        data = request.json
+        # Solo rutas dentro de SERVER_FILES_ROOT (cli.py scan para el resto)
+        source = server_path(data.get('source'))
+        job = scanner.start_scan_job(
+            source,
+            lines=bool(data.get('lines', False)),
+            encoding=data.get('encoding', 'auto'),
+            workers=request_workers(data.get('workers')),
+            label=os.path.relpath(source, os.path.realpath(SERVER_FILES_ROOT))
+        )
+        
+        return jsonify({
+            'success': True,
+            'job': job
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/scan', methods=['GET'])
+def list_scans():
+    return jsonify({
+        'success': True,
+        'jobs': scanner.list_scan_jobs()
+    })
+
+@app.route('/api/scan/<job_id>', methods=['GET'])
+def scan_status(job_id):
+    job = scanner.get_scan_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@app.route('/api/scan/<job_id>/cancel', methods=['POST'])
+def cancel_scan(job_id):
+    job = scanner.cancel_scan_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
+@app.route('/api/scan/<job_id>/results', methods=['GET'])
+def scan_results(job_id):
+    output = scanner.scan_job_output(job_id)
+    if output is None or not os.path.exists(output):
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    
+    return send_file(output, mimetype='application/x-ndjson', as_attachment=True,
+                     download_name=f'scan_{job_id}.ndjson')
+
+@app.route('/api/audit/nonces', methods=['POST'])
+def audit_nonces():
+    try:
+        # Log subido (se guarda temporalmente en disco) o ruta dentro de SERVER_FILES_ROOT
+        if 'file' in request.files:
+            options = request.form
+            upload_dir = os.path.join(DATA_DIR, 'uploads')
+            os.makedirs(upload_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=upload_dir, delete=False) as f:
+                request.files['file'].save(f)
+                path = f.name
+        else:
+            options = request.json
+            path = server_path(options.get('path'))
+        
+        try:
+            report = audit_log(
+                path,
+                options.get('format', 'auto'),
+                options.get('nonce_encoding', 'text'),
+                max_pairs=int(options.get('max_pairs', 100))
+            )
+        finally:
+            if 'file' in request.files:
+                os.remove(path)
+        
+        if 'file' in request.files:
+            report['path'] = request.files['file'].filename
+        
+        return jsonify({
+            'success': True,
+            'report': report
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/audit/keys', methods=['POST'])
+def audit_keys():
+    try:
+        # Solo volcados subidos (se guardan temporalmente en disco); los ficheros
+        # locales se analizan con cli.py keys
+        if 'file' not in request.files:
+            return jsonify({'success': False, 'error': 'Se requiere un fichero de claves'}), 400
+        
+        options = request.form
+        upload_dir = os.path.join(DATA_DIR, 'uploads')
+        os.makedirs(upload_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=upload_dir, delete=False) as f:
+            request.files['file'].save(f)
+            path = f.name
+        
+        try:
+            key_length = options.get('key_length')
+            report = audit_key_file(path, options.get('encoding', 'auto'), int(key_length) if key_length else None)
+        finally:
+            os.remove(path)
+        
+        report['path'] = request.files['file'].filename
+        
+        return jsonify({
+            'success': True,
+            'report': report
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/audit/rsa-shared-factors', methods=['POST'])
+def audit_rsa_shared_factors():
+    try:
+        # Fichero de claves subido o lista de claves (PEM, módulo hex o {'id', 'public_key'})
+        if 'file' in request.files:
+            options = request.form
+            upload_dir = os.path.join(DATA_DIR, 'uploads')
+            os.makedirs(upload_dir, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=upload_dir, delete=False) as f:
+                request.files['file'].save(f)
+                path = f.name
+            try:
+                report = audit_shared_factors(iter_key_file(path, request.files['file'].filename),
+                                              workers=request_workers(options.get('workers', type=int)),
+                                              budget_ms=request_budget_ms(options.get('budget_ms', type=float)))
+            finally:
+                os.remove(path)
+        else:
+            options = request.json
+            keys = [
+                (key.get('id', i), key.get('public_key') or key.get('n')) if isinstance(key, dict) else (i, key)
+                for i, key in enumerate(options.get('keys', []))
+            ]
+            if len(keys) < 2:
+                return jsonify({'success': False, 'error': 'Se requieren al menos dos claves'}), 400
+            report = audit_shared_factors(keys, workers=request_workers(options.get('workers')),
+                                          budget_ms=request_budget_ms(options.get('budget_ms')))
+        
+        return jsonify({
+            'success': True,
+            'report': report
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
 @app.route('/api/analyze/rsa', methods=['POST'])
 def analyze_rsa():
     try:
@@ -270,14 +570,119 @@ def analyze_rsa():
             'error': str(e)
         })
 
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    try:
+        data = request.json
+        results = evaluate_batch(data.get('configs'), workers=data.get('workers'))
+        summary = BatchSummary(len(data['configs']))
+        
+        if not data.get('stream', True):
+            items = []
+            for item in results:
+                summary.add(item)
+                items.append(item)
+            return jsonify({
+                'success': True,
+                'results': sorted(items, key=lambda item: item['index']),
+                'summary': summary.to_dict()
+            })
+        
+        # NDJSON: un resultado por línea según terminan y el resumen al final
+        def generate():
+            for item in results:
+                summary.add(item)
+                yield json.dumps(dict(item, kind='result'), ensure_ascii=False) + '\n'
+            yield json.dumps(dict(summary.to_dict(), kind='summary'), ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/report/<fmt>', methods=['POST'])
+def export_report(fmt):
+    # Reporte generado en el servidor y enviado por fragmentos (HTML o JSON)
+    try:
+        if fmt not in ('html', 'json'):
+            raise ValueError(f'Formato no soportado: {fmt}')
+        data = request.json
+        if data.get('analyses'):
+            # Reporte consolidado de varios análisis
+            analysis_data = ReportGenerator.consolidate(data['analyses'])
+        else:
+            analysis_data = data.get('analysis_data') or ReportGenerator.analysis_data_from_evaluations(
+                data.get('aes_analysis'), data.get('rsa_analysis')
+            )
+        report = ReportGenerator.generate_full_report(analysis_data)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    if fmt == 'html':
+        response = Response(stream_with_context(ReportGenerator.stream_html_report(report)),
+                            mimetype='text/html')
+    else:
+        response = Response(stream_with_context(ReportGenerator.stream_json_report(report)),
+                            mimetype='application/json')
+    if data.get('download'):
+        filename = f"reporte_cryptoanalyzer_{report['metadata']['generated_at'][:10]}.{fmt}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/evaluate/<kind>', methods=['GET'])
+def evaluation_table(kind):
+    # Tabla precalculada: sin parámetros la tabla completa de kind ('aes', 'rsa' o 'all')
+    try:
+        option = request.args.get('mode') if kind == 'aes' else request.args.get('padding')
+        entry = cached_evaluation(kind, request.args.get('key_size', type=int), option)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = EVALUATION_MAX_AGE
+    response.cache_control.s_maxage = EVALUATION_SHARED_MAX_AGE
+    return response.make_conditional(request)
+
 @app.route('/api/benchmark/aes', methods=['POST'])
 def benchmark_aes():
     try:
         data = request.json
         text = data.get('text', 'Test text')
-        iterations = data.get('iterations', 100)
+        iterations = int(data.get('iterations', 100))
+        cpu = data.get('cpu')
         
-        results = AESCrypto.benchmark(text, iterations=iterations)
+        results = AESCrypto.benchmark(text, iterations=iterations, cpu=cpu)
+        history = record_benchmark('aes', results, {'iterations': iterations, 'text_bytes': len(text.encode('utf-8'))})
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'history': history
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/benchmark/aes/matrix', methods=['POST'])
+def benchmark_aes_matrix():
+    try:
+        data = request.json or {}
+        modes = data.get('modes') or None
+        key_sizes = data.get('key_sizes') or None
+        payload_sizes = data.get('payload_sizes') or None
+        samples = int(data.get('samples', 10))
+        cpu = data.get('cpu')
+        
+        results = AESCrypto.benchmark_matrix(modes, key_sizes, payload_sizes, samples=samples, cpu=cpu)
         
         return jsonify({
             'success': True,
@@ -294,9 +699,142 @@ def benchmark_rsa():
     try:
         data = request.json
         text = data.get('text', 'Test')[:100]  # Limitar para RSA
-        iterations = data.get('iterations', 10)
+        iterations = int(data.get('iterations', 10))
+        cpu = data.get('cpu')
+        
+        results = RSACrypto.benchmark(text, iterations=iterations, cpu=cpu)
+        history = record_benchmark('rsa', results, {'iterations': iterations, 'text_bytes': len(text.encode('utf-8'))})
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'history': history
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/benchmark/classic', methods=['POST'])
+def benchmark_classic():
+    try:
+        data = request.json or {}
+        sizes = data.get('sizes') or None
+        samples = int(data.get('samples', 5))
+        
+        results = benchmark_suite.run_complexity('classic', sizes, samples=samples)
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/benchmark/analysis', methods=['POST'])
+def benchmark_analysis():
+    try:
+        data = request.json or {}
+        sizes = data.get('sizes') or None
+        samples = int(data.get('samples', 5))
         
-        results = RSACrypto.benchmark(text, iterations=iterations)
+        results = benchmark_suite.run_complexity('cryptanalysis', sizes, samples=samples)
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        })
+
+@app.route('/api/benchmark/history', methods=['GET'])
+def benchmark_history():
+    try:
+        name = request.args.get('name')
+        suite = request.args.get('suite')
+        limit = int(request.args.get('limit', 50))
+        history = BenchmarkHistory()
+        
+        if name:
+            return jsonify({'success': True, 'name': name, 'trend': history.trend(name, limit=limit)})
+        
+        return jsonify({
+            'success': True,
+            'environment': BenchmarkHistory.environment(),
+            'runs': history.runs(suite=suite, limit=limit)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/benchmark/history/baseline', methods=['POST'])
+def benchmark_history_baseline():
+    try:
+        data = request.json or {}
+        run_id = data.get('run_id')
+        if run_id is None:
+            return jsonify({'success': False, 'error': 'Se requiere run_id'}), 400
+        
+        baseline = BenchmarkHistory().set_baseline(int(run_id))
+        return jsonify({'success': True, 'baseline': baseline})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/benchmark/history/regressions', methods=['GET'])
+def benchmark_history_regressions():
+    try:
+        run_id = request.args.get('run_id')
+        threshold = float(request.args.get('threshold', 0.05))
+        if run_id is None:
+            return jsonify({'success': False, 'error': 'Se requiere run_id'}), 400
+        
+        report = BenchmarkHistory().check_regressions(int(run_id), threshold=threshold)
+        return jsonify({'success': True, 'run_id': int(run_id), **report})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/benchmark/rsa/keygen', methods=['POST'])
+def benchmark_rsa_keygen():
+    try:
+        data = request.json or {}
+        key_sizes = data.get('key_sizes') or (1024, 2048)
+        runs = int(data.get('runs', 20))
+        
+        if runs < 2 or runs > 500:
+            return jsonify({'success': False, 'error': 'El número de ejecuciones debe estar entre 2 y 500'}), 400
+        if not isinstance(key_sizes, (list, tuple)) or len(key_sizes) > len(RSACrypto.KEYGEN_KEY_SIZES):
+            return jsonify({'success': False, 'error': f'Como máximo {len(RSACrypto.KEYGEN_KEY_SIZES)} tamaños de clave'}), 400
+        
+        results = RSACrypto.benchmark_keygen(key_sizes, runs=runs)
+        
+        return jsonify({
+            'success': True,
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/api/benchmark/scaling', methods=['POST'])
+def benchmark_scaling():
+    try:
+        data = request.json or {}
+        workloads = data.get('workloads') or None
+        max_workers = data.get('max_workers')
+        target_seconds = float(data.get('target_seconds', 0.2))
+        
+        if target_seconds <= 0 or target_seconds > 5:
+            return jsonify({'success': False, 'error': 'target_seconds debe estar entre 0 y 5'}), 400
+        
+        results = benchmark_suite.run_scaling(workloads, request_workers(max_workers), target_seconds=target_seconds)
         
         return jsonify({
             'success': True,
@@ -314,6 +852,10 @@ print("TODAS LAS RUTAS DEFINIDAS")
 if __name__ == '__main__':
     port = int(os.environ.get("PORT", 10000))  # Render asigna este puerto
 
+    # Arrancar el pool de claves RSA y precalcular las tablas antes de aceptar peticiones
+    get_key_pool()
+    evaluation_tables.warm()
+
     print("=" * 50)
     print("Iniciando CryptoAnalyzer...")
     print(f"Servidor corriendo en: http://0.0.0.0:{port}")
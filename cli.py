@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+CryptoAnalyzer - Línea de comandos
+Ejecuta benchmarks y análisis sin arrancar el servidor Flask
+
+Ejemplos:
+    python cli.py bench --list
+    python cli.py bench --filter classic --filter 'cryptanalysis/*' --sizes 1000,100000
+    python cli.py bench --format csv --output resultados.csv
+    python cli.py bench --output hoy.json --compare ayer.json
+    python cli.py ecb volcado.img --memory-limit 512
+    python cli.py scan blobs/ --output resultados.ndjson
+    python cli.py scan cifrados.txt --lines --summary resumen.json
+    python cli.py nonces mensajes.ndjson --nonce-encoding base64
+    python cli.py keys export_kms.txt --encoding base64
+    python cli.py gcd claves.pem flota.ndjson --output compartidos.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import datetime
+
+from modules.benchmark import welch_t_test
+from modules.benchmark_history import BenchmarkHistory
+
+
+CSV_FIELDS = [
+    'name', 'group', 'size', 'samples', 'outliers', 'median_ms', 'mean_ms', 'p95_ms', 'p99_ms',
+    'min_ms', 'max_ms', 'stddev_ms', 'ci95_low_ms', 'ci95_high_ms', 'ops_per_s', 'mb_per_s',
+    'iterations_per_sample', 'peak_bytes', 'peak_bytes_per_input_byte', 'retained_blocks', 'retained_bytes'
+]
+
+
+def _kept_samples(result):
+    """Resultado con samples sin outliers: media y desviación se calculan sin ellos"""
+    return dict(result, samples=result['samples'] - (result.get('outliers') or 0))
+
+
+def compare_results(previous, current, threshold=0.05):
+    """Compara dos ejecuciones emparejando por (nombre, tamaño)"""
+    before = {(r['name'], r['size']): r for r in previous}
+    comparison = []
+
+    for result in current:
+        old = before.get((result['name'], result['size']))
+        if old is None or old['mean_ms'] <= 0:
+            continue
+        change = (result['mean_ms'] - old['mean_ms']) / old['mean_ms']
+        significant, t_value = welch_t_test(_kept_samples(old), _kept_samples(result))
+        if significant and change > threshold:
+            status = 'REGRESIÓN'
+        elif significant and change < -threshold:
+            status = 'MEJORA'
+        else:
+            status = 'IGUAL'
+        comparison.append({
+            'name': result['name'],
+            'size': result['size'],
+            'previous_mean_ms': old['mean_ms'],
+            'current_mean_ms': result['mean_ms'],
+            'change_percent': change * 100,
+            't_value': t_value,
+            'status': status
+        })
+
+    return comparison
+
+
+def write_output(document, output_format, stream):
+    """Escribe los resultados como JSON o CSV"""
+    if output_format == 'json':
+        json.dump(document, stream, indent=2, ensure_ascii=False)
+        stream.write('\n')
+        return
+
+    writer = csv.DictWriter(stream, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for result in document['results']:
+        low, high = result['ci95_ms']
+        writer.writerow(dict(result, ci95_low_ms=low, ci95_high_ms=high, **(result.get('memory') or {})))
+
+
+def load_previous(path):
+    """Carga una ejecución anterior en JSON (o CSV generado por esta herramienta)"""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            rows = []
+            for row in csv.DictReader(f):
+                size = row['size']
+                rows.append({
+                    'name': row['name'],
+                    'size': int(size) if size not in ('', 'None') else None,
+                    'mean_ms': float(row['mean_ms']),
+                    'stddev_ms': float(row['stddev_ms']),
+                    'samples': int(row['samples']),
+                    'outliers': int(row.get('outliers') or 0)
+                })
+            return rows
+        return json.load(f)['results']
+
+
+def command_bench(args):
+    from modules import benchmark_suite
+
+    if args.list:
+        for name in benchmark_suite.select(args.filter):
+            entry = benchmark_suite.BENCHMARKS[name]
+            sizes = ', '.join(str(s) for s in entry['sizes']) if entry['sized'] else '-'
+            print(f'{name:40} {sizes}')
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',')] if args.sizes else None
+
+    def progress(result):
+        size = f" [{result['size']}]" if result['size'] is not None else ''
+        memory = f", pico {result['memory']['peak_bytes']} B" if result.get('memory') else ''
+        print(f"{result['name']}{size}: mediana {result['median_ms']:.4f} ms, "
+              f"p95 {result['p95_ms']:.4f} ms, {result['ops_per_s']:.1f} ops/s{memory}", file=sys.stderr)
+
+    results = benchmark_suite.run_suite(args.filter, sizes, samples=args.samples, cpu=args.cpu,
+                                        progress=None if args.quiet else progress)
+
+    document = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': BenchmarkHistory.environment(),
+        'samples': args.samples,
+        'results': results
+    }
+
+    exit_code = 0
+    if args.compare:
+        document['comparison'] = compare_results(load_previous(args.compare), results, args.threshold)
+        regressions = [c for c in document['comparison'] if c['status'] == 'REGRESIÓN']
+        for item in regressions:
+            print(f"REGRESIÓN {item['name']} [{item['size']}]: {item['change_percent']:+.1f}%", file=sys.stderr)
+        if regressions:
+            exit_code = 1
+
+    if args.record:
+        history = BenchmarkHistory()
+        measurements = [
+            {'name': f"{r['name']}[{r['size']}]" if r['size'] is not None else r['name'], 'stats': r}
+            for r in results
+        ]
+        run_id = history.record('cli', measurements, {'filter': args.filter, 'sizes': sizes, 'samples': args.samples})
+        document['history'] = dict(history.check_regressions(run_id, args.threshold), run_id=run_id)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as f:
+            write_output(document, args.format, f)
+    else:
+        write_output(document, args.format, sys.stdout)
+
+    return exit_code
+
+
+def command_ecb(args):
+    from modules.modern_crypto import CryptoAnalyzer
+
+    result = CryptoAnalyzer.detect_patterns_file(args.path, args.block_size,
+                                                 memory_limit=args.memory_limit * 1024 * 1024)
+    json.dump(dict(result, path=args.path, block_size=args.block_size), sys.stdout, indent=2, ensure_ascii=False)
+    sys.stdout.write('\n')
+    return 1 if result['repeated_blocks'] else 0
+
+
+def command_scan(args):
+    from modules import scanner
+
+    def progress(summary):
+        print(f'\r{summary.items} elementos, {summary.errors} errores', end='', file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            summary = scanner.scan(args.source, args.lines, output, args.workers, args.encoding,
+                                   args.block_size, progress=None if args.quiet else progress)
+    else:
+        summary = scanner.scan(args.source, args.lines, sys.stdout, args.workers, args.encoding,
+                               args.block_size)
+
+    if args.output and not args.quiet:
+        print(file=sys.stderr)
+
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(summary, sys.stderr, indent=2, ensure_ascii=False)
+        sys.stderr.write('\n')
+
+    return 1 if summary['flagged'] else 0
+
+
+def command_nonces(args):
+    from modules.nonce_audit import audit_log
+
+    report = audit_log(args.log, args.format, args.nonce_encoding,
+                       memory_limit=args.memory_limit * 1024 * 1024, max_pairs=args.max_pairs)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+
+    if not args.quiet:
+        print(f"{report['records']} registros, {report['reused_nonces']} nonces reutilizados "
+              f"en {report['affected_keys']} claves", file=sys.stderr)
+    return 1 if report['reused_nonces'] else 0
+
+
+def command_keys(args):
+    from modules.key_audit import audit_key_file
+
+    report = audit_key_file(args.path, args.encoding, args.key_length)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+
+    weak = sum(group['severities'].get('CRÍTICO', 0) + group['duplicated_keys'] for group in report['by_length'])
+    if not args.quiet:
+        print(f"{report['keys']} claves, {weak} con patrones o duplicadas, "
+              f"{report['invalid_lines']} líneas inválidas", file=sys.stderr)
+    return 1 if weak else 0
+
+
+def command_gcd(args):
+    from modules.batch_gcd import audit_shared_factors, iter_key_file
+
+    def keys():
+        for path in args.keys:
+            yield from iter_key_file(path)
+
+    report = audit_shared_factors(keys(), workers=args.workers, weak_checks=not args.no_weak_checks,
+                                  budget_ms=args.budget_ms)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write('\n')
+
+    if not args.quiet:
+        print(f"{report['keys']} claves, {len(report['vulnerable'])} con primos compartidos, "
+              f"{len(report['duplicate_moduli'])} módulos duplicados, {len(report['weak_moduli'])} módulos débiles "
+              f"({report['backend']}, {report['timings']['total_ms'] / 1000:.1f} s)", file=sys.stderr)
+    return 1 if report['vulnerable'] or report['duplicate_moduli'] or report['weak_moduli'] else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='CryptoAnalyzer desde la línea de comandos')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    bench = subparsers.add_parser('bench', help='Ejecutar la suite de benchmarks')
+    bench.add_argument('--list', action='store_true', help='Listar benchmarks registrados')
+    bench.add_argument('--filter', action='append', help='Filtro por nombre (glob o subcadena); repetible')
+    bench.add_argument('--sizes', help='Tamaños de entrada separados por comas')
+    bench.add_argument('--samples', type=int, default=10, help='Muestras por benchmark')
+    bench.add_argument('--cpu', type=int, help='Fijar el proceso a esta CPU')
+    bench.add_argument('--format', choices=['json', 'csv'], default='json')
+    bench.add_argument('--output', help='Fichero de salida (por defecto stdout)')
+    bench.add_argument('--compare', help='Ejecución anterior (JSON o CSV) para comparar')
+    bench.add_argument('--threshold', type=float, default=0.05, help='Cambio relativo mínimo para regresión')
+    bench.add_argument('--record', action='store_true', help='Guardar en el histórico SQLite')
+    bench.add_argument('--quiet', action='store_true', help='No mostrar progreso')
+    bench.set_defaults(handler=command_bench)
+
+    ecb = subparsers.add_parser('ecb', help='Buscar bloques repetidos (patrón ECB) en un fichero')
+    ecb.add_argument('path', help='Fichero a analizar')
+    ecb.add_argument('--block-size', type=int, default=16, help='Tamaño de bloque en bytes')
+    ecb.add_argument('--memory-limit', type=int, default=256, help='Memoria máxima en MB antes de usar particiones en disco')
+    ecb.set_defaults(handler=command_ecb)
+
+    scan = subparsers.add_parser('scan', help='Escanear un corpus de textos cifrados (NDJSON)')
+    scan.add_argument('source', help='Directorio (un blob por fichero) o fichero de líneas base64')
+    scan.add_argument('--lines', action='store_true', help='source es un fichero con un base64 por línea')
+    scan.add_argument('--encoding', choices=['auto', 'raw', 'base64'], default='auto',
+                      help='Codificación de los ficheros de un directorio')
+    scan.add_argument('--block-size', type=int, default=16, help='Tamaño de bloque en bytes')
+    scan.add_argument('--workers', type=int, help='Procesos (por defecto, uno por CPU)')
+    scan.add_argument('--output', help='Fichero NDJSON de resultados (por defecto stdout)')
+    scan.add_argument('--summary', help='Fichero JSON del resumen (por defecto stderr)')
+    scan.add_argument('--quiet', action='store_true', help='No mostrar progreso')
+    scan.set_defaults(handler=command_scan)
+
+    nonces = subparsers.add_parser('nonces', help='Buscar IV/nonces reutilizados en un log de mensajes')
+    nonces.add_argument('log', help='Log NDJSON o CSV con key_id, nonce (o iv) y ciphertext')
+    nonces.add_argument('--format', choices=['auto', 'ndjson', 'csv'], default='auto')
+    nonces.add_argument('--nonce-encoding', choices=['text', 'hex', 'base64'], default='text',
+                        help='Codificación del nonce en el log')
+    nonces.add_argument('--memory-limit', type=int, default=256, help='Memoria máxima del índice en MB')
+    nonces.add_argument('--max-pairs', type=int, default=100, help='Pares reportados por nonce reutilizado')
+    nonces.add_argument('--output', help='Fichero JSON del informe (por defecto stdout)')
+    nonces.add_argument('--quiet', action='store_true', help='No mostrar el resumen')
+    nonces.set_defaults(handler=command_nonces)
+
+    keys = subparsers.add_parser('keys', help='Analizar un volcado de claves simétricas')
+    keys.add_argument('path', help='Fichero con una clave por línea (hex o base64) o volcado binario')
+    keys.add_argument('--encoding', choices=['auto', 'hex', 'base64', 'raw'], default='auto')
+    keys.add_argument('--key-length', type=int, help='Longitud de clave en bytes (obligatoria con raw)')
+    keys.add_argument('--output', help='Fichero JSON del informe (por defecto stdout)')
+    keys.add_argument('--quiet', action='store_true', help='No mostrar el resumen')
+    keys.set_defaults(handler=command_keys)
+
+    gcd = subparsers.add_parser('gcd', help='Buscar primos compartidos entre claves RSA (batch GCD)')
+    gcd.add_argument('keys', nargs='+', help='Ficheros NDJSON, bundles PEM o un módulo por línea')
+    gcd.add_argument('--workers', type=int, help='Procesos (por defecto uno por CPU)')
+    gcd.add_argument('--no-weak-checks', action='store_true',
+                     help='Omitir factores pequeños, cuadrado perfecto y Fermat por clave')
+    gcd.add_argument('--budget-ms', type=float, help='CPU máxima de Fermat por clave en ms')
+    gcd.add_argument('--output', help='Fichero JSON del informe (por defecto stdout)')
+    gcd.add_argument('--quiet', action='store_true', help='No mostrar el resumen')
+    gcd.set_defaults(handler=command_gcd)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
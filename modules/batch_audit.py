@@ -0,0 +1,157 @@
+"""
+Evaluación por lotes de configuraciones AES y RSA
+
+Cada configuración se evalúa con StrengthEvaluator en un pool de procesos;
+los resultados se entregan según terminan y un resumen final ordena las
+configuraciones por puntuación.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import os
+import time
+
+from Crypto.PublicKey import RSA
+
+from modules.modern_crypto import StrengthEvaluator
+
+
+# Configuraciones aceptadas en una sola petición
+MAX_BATCH_CONFIGS = 2000
+
+# Peores configuraciones que se destacan en el resumen
+WEAKEST_ITEMS = 10
+
+
+def config_type(config):
+    """'aes' o 'rsa' según el campo type o los campos presentes"""
+    kind = str(config.get('type', '')).lower()
+    if kind in ('aes', 'rsa'):
+        return kind
+    return 'rsa' if config.get('public_key') else 'aes'
+
+
+def evaluate_config(index, config):
+    """Evalúa una configuración (se ejecuta en un proceso del pool)"""
+    started = time.perf_counter()
+    kind = config_type(config)
+    item = {
+        'index': index,
+        'id': config.get('id', index),
+        'type': kind
+    }
+
+    try:
+        if kind == 'aes':
+            item['mode'] = config.get('mode', 'CBC')
+            evaluation = StrengthEvaluator.evaluate_aes_implementation(
+                config.get('sample', config.get('plaintext', '')), config.get('key', ''), item['mode']
+            )
+        else:
+            key_size = config.get('key_size') or RSA.import_key(config['public_key']).size_in_bits()
+            item['key_size'] = int(key_size)
+            evaluation = StrengthEvaluator.evaluate_rsa_implementation(config['public_key'], int(key_size))
+            evaluation['padding'] = config.get('padding', 'OAEP')
+    except Exception as e:
+        evaluation = {'error': str(e)}
+
+    if 'error' in evaluation:
+        item['error'] = evaluation['error']
+    else:
+        item['score'] = evaluation['score']
+        item['issues'] = evaluation['issues']
+        item['evaluation'] = evaluation
+    item['elapsed_ms'] = (time.perf_counter() - started) * 1000
+    return item
+
+
+class BatchSummary:
+    """Resumen de un lote: recuentos, media y ranking por puntuación"""
+
+    def __init__(self, total):
+        self.total = total
+        self.items = []
+        self.errors = 0
+        self.started = time.perf_counter()
+
+    def add(self, item):
+        if 'error' in item:
+            self.errors += 1
+        self.items.append({
+            key: item.get(key) for key in ('index', 'id', 'type', 'score', 'issues', 'error')
+            if key in item
+        })
+
+    def to_dict(self):
+        scored = [item for item in self.items if 'score' in item]
+        ranking = sorted(scored, key=lambda item: (-item['score'], item['index']))
+        for rank, item in enumerate(ranking, 1):
+            item['rank'] = rank
+
+        by_type = {}
+        for item in scored:
+            stats = by_type.setdefault(item['type'], {'count': 0, 'score_sum': 0})
+            stats['count'] += 1
+            stats['score_sum'] += item['score']
+
+        return {
+            'total': self.total,
+            'evaluated': len(self.items),
+            'errors': self.errors,
+            'mean_score': sum(item['score'] for item in scored) / len(scored) if scored else None,
+            'by_type': {
+                kind: {'count': stats['count'], 'mean_score': stats['score_sum'] / stats['count']}
+                for kind, stats in by_type.items()
+            },
+            'ranking': ranking,
+            'weakest': ranking[::-1][:WEAKEST_ITEMS],
+            'failed': [item for item in self.items if 'error' in item],
+            'elapsed_ms': (time.perf_counter() - self.started) * 1000
+        }
+
+
+def evaluate_batch(configs, workers=None):
+    """
+    Evalúa configuraciones en paralelo y las devuelve según terminan
+
+    Args:
+        configs: Lista de dicts AES {'key', 'mode', 'sample'} o RSA
+            {'public_key', 'key_size', 'padding'}, con 'id' y 'type' opcionales
+        workers: Procesos del pool (1 evalúa en el propio proceso); como
+            mucho uno por núcleo
+
+    Returns:
+        Iterador con un resultado por configuración (con su 'index' en la
+        lista original). La validación y la creación del pool se hacen
+        antes de empezar, para que los errores lleguen antes de la respuesta.
+    """
+    if not isinstance(configs, list) or not configs:
+        raise ValueError('Se requiere una lista de configuraciones')
+    if len(configs) > MAX_BATCH_CONFIGS:
+        raise ValueError(f'Máximo {MAX_BATCH_CONFIGS} configuraciones por lote')
+    if not all(isinstance(config, dict) for config in configs):
+        raise ValueError('Cada configuración debe ser un objeto')
+
+    cpu_count = os.cpu_count() or 1
+    workers = int(workers) if workers else cpu_count
+    if workers < 1:
+        raise ValueError('workers debe ser mayor que 0')
+    workers = min(workers, cpu_count, len(configs))
+
+    # Sin procesos hasta el primer submit: si nunca se itera no queda nada vivo
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    return _evaluate(configs, executor)
+
+
+def _evaluate(configs, executor):
+    if executor is None:
+        for index, config in enumerate(configs):
+            yield evaluate_config(index, config)
+        return
+
+    try:
+        futures = [executor.submit(evaluate_config, index, config) for index, config in enumerate(configs)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # Si el cliente deja de leer, no se evalúa lo que quede pendiente
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,272 @@
+"""
+Detección de factores primos compartidos entre muchas claves RSA (batch GCD)
+
+Con un árbol de productos y un árbol de restos se calcula, para cada
+módulo n_i, gcd(n_i, producto del resto de módulos) sin comparar pares:
+coste casi lineal en el número de claves. Las claves se reparten en
+trozos; cada proceso construye el árbol de su trozo y el proceso principal
+solo combina los productos de los trozos.
+
+Usa gmpy2 si está instalado (mucho más rápido con números grandes) y los
+enteros de Python si no.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import math
+import os
+import time
+
+from Crypto.PublicKey import RSA
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+BACKEND = 'gmpy2' if gmpy2 is not None else 'python'
+
+# Claves por trozo enviado a un proceso
+CHUNK_KEYS = 4096
+
+# Por debajo de este número de claves no compensa arrancar procesos
+MIN_PARALLEL_KEYS = 2 * CHUNK_KEYS
+
+
+def _number(value):
+    return gmpy2.mpz(value) if gmpy2 is not None else int(value)
+
+
+def _gcd(a, b):
+    return gmpy2.gcd(a, b) if gmpy2 is not None else math.gcd(a, b)
+
+
+def product_tree(values):
+    """Niveles del árbol de productos, de las hojas (values) a la raíz"""
+    tree = [list(values)]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append([level[i] * level[i + 1] if i + 1 < len(level) else level[i]
+                     for i in range(0, len(level), 2)])
+    return tree
+
+
+def remainder_tree(tree, root_remainder):
+    """
+    Restos R mod v^2 de todas las hojas bajando desde la raíz
+
+    Como c^2 divide a v^2 para cada hijo c de v, (R mod v^2) mod c^2 =
+    R mod c^2: cada nivel solo divide números del tamaño del siguiente.
+    """
+    remainders = [root_remainder]
+    for level in reversed(tree[:-1]):
+        remainders = [remainders[i // 2] % (value * value) for i, value in enumerate(level)]
+    return remainders
+
+
+def _leaf_gcds(moduli, remainders):
+    return [_gcd(r // n, n) for n, r in zip(moduli, remainders)]
+
+
+def _chunk_product(moduli):
+    """Producto de un trozo (se ejecuta en un proceso del pool)"""
+    values = [_number(n) for n in moduli]
+    return int(product_tree(values)[-1][0])
+
+
+def _chunk_gcds(moduli, root_remainder):
+    """gcd de cada módulo del trozo con el producto total (en un proceso del pool)"""
+    values = [_number(n) for n in moduli]
+    tree = product_tree(values)
+    gcds = _leaf_gcds(values, remainder_tree(tree, _number(root_remainder)))
+    return [int(g) for g in gcds]
+
+
+def batch_gcd(moduli, workers=None):
+    """
+    gcd(n_i, producto de todos los demás) para cada módulo
+
+    Los módulos deben ser distintos (un duplicado comparte todo su valor).
+    Los trozos se procesan en paralelo; la cima del árbol (trozos ya
+    multiplicados) se resuelve en el proceso principal.
+    """
+    if not moduli:
+        return []
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(int(workers or cpu_count), cpu_count))
+    if workers == 1 or len(moduli) < MIN_PARALLEL_KEYS:
+        return _serial_batch_gcd(moduli)
+
+    chunks = [moduli[i:i + CHUNK_KEYS] for i in range(0, len(moduli), CHUNK_KEYS)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 1. Producto de cada trozo en paralelo
+        products = [_number(p) for p in executor.map(_chunk_product, chunks)]
+
+        # 2. Cima del árbol: producto total y restos P mod P_j^2 de cada trozo
+        top = product_tree(products)
+        chunk_remainders = remainder_tree(top, top[-1][0])
+
+        # 3. Cada trozo baja su propio árbol de restos en paralelo
+        results = executor.map(_chunk_gcds, chunks, [int(r) for r in chunk_remainders])
+        return [g for chunk in results for g in chunk]
+
+
+def _serial_batch_gcd(moduli):
+    values = [_number(n) for n in moduli]
+    tree = product_tree(values)
+    return [int(g) for g in _leaf_gcds(values, remainder_tree(tree, tree[-1][0]))]
+
+
+def _parse_modulus(value):
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    if value.startswith('-----BEGIN'):
+        return RSA.import_key(value).n
+    if value.lower().startswith('0x'):
+        return int(value, 16)
+    if value.isdigit():
+        return int(value)
+    return int(value, 16)
+
+
+def modulus_from(value):
+    """
+    Módulo de un PEM, un entero o una cadena hexadecimal/decimal
+
+    Rechaza (ValueError) los valores que no pueden ser un módulo RSA: menores
+    que 3 (un 0 anularía el producto de todo el árbol) o pares.
+    """
+    n = _parse_modulus(value)
+    if isinstance(n, bool) or n < 3:
+        raise ValueError('El módulo debe ser un entero mayor que 2')
+    if n % 2 == 0:
+        raise ValueError('El módulo es par')
+    return n
+
+
+def iter_key_file(path, name=None):
+    """
+    (id, módulo) de un fichero de claves
+
+    Acepta NDJSON ({"id", "public_key"|"n"}), un bundle PEM con varias
+    claves o un módulo (hex o decimal) por línea. Las claves sin id se
+    identifican como <name>:<línea> (name es por defecto el nombre del fichero).
+    """
+    name = name or os.path.basename(path)
+    with open(path, encoding='utf-8') as f:
+        pem = []
+        for number, line in enumerate(f, 1):
+            stripped = line.strip()
+            if pem or stripped.startswith('-----BEGIN'):
+                pem.append(stripped)
+                if stripped.startswith('-----END'):
+                    yield f'{name}:{number}', '\n'.join(pem)
+                    pem = []
+                continue
+            if not stripped:
+                continue
+            if stripped.startswith('{'):
+                record = json.loads(stripped)
+                yield record.get('id', f'{name}:{number}'), record.get('public_key') or record.get('n')
+            else:
+                yield f'{name}:{number}', stripped
+
+
+def audit_shared_factors(keys, workers=None, weak_checks=True, budget_ms=None):
+    """
+    Busca claves RSA que comparten un primo con otras del conjunto
+
+    Args:
+        keys: Iterable de (id, clave) donde clave es PEM, entero o hex
+        workers: Procesos para los trozos del árbol
+        weak_checks: Comprobar además cada módulo por separado (factores
+            pequeños, cuadrado perfecto, Fermat) con modules.rsa_weakness
+        budget_ms: Presupuesto de CPU de Fermat por clave
+
+    Returns:
+        Resumen con módulos duplicados, claves factorizadas y con qué
+        otras claves comparte primo cada una
+    """
+    from modules.rsa_weakness import FERMAT_BUDGET_MS, check_moduli
+
+    started = time.perf_counter()
+    ids_by_modulus = {}
+    invalid = []
+    total = 0
+
+    for key_id, value in keys:
+        total += 1
+        try:
+            n = modulus_from(value)
+        except (ValueError, TypeError, IndexError) as e:
+            invalid.append({'id': key_id, 'error': str(e)})
+            continue
+        ids_by_modulus.setdefault(n, []).append(key_id)
+
+    moduli = list(ids_by_modulus)
+    load_ms = (time.perf_counter() - started) * 1000
+
+    gcd_start = time.perf_counter()
+    gcds = batch_gcd(moduli, workers)
+    gcd_ms = (time.perf_counter() - gcd_start) * 1000
+
+    weak_moduli = []
+    weak_ms = None
+    if weak_checks:
+        weak_start = time.perf_counter()
+        checks = check_moduli(moduli, FERMAT_BUDGET_MS if budget_ms is None else budget_ms, workers)
+        weak_moduli = [
+            {'ids': ids_by_modulus[n], 'bits': n.bit_length(), 'issues': check['issues']}
+            for n, check in zip(moduli, checks) if check['issues']
+        ]
+        weak_ms = (time.perf_counter() - weak_start) * 1000
+
+    # gcd == n: los dos primos aparecen en otras claves; se resuelve por pares
+    # solo entre los módulos afectados, que son pocos
+    weak = [(n, g) for n, g in zip(moduli, gcds) if g != 1]
+    factors = {}
+    for n, g in weak:
+        if g != n:
+            factors[n] = g
+            continue
+        for other, _ in weak:
+            shared = math.gcd(n, other) if other != n else 1
+            if 1 < shared < n:
+                factors[n] = shared
+                break
+
+    ids_by_prime = {}
+    for n, p in factors.items():
+        for prime in (p, n // p):
+            ids_by_prime.setdefault(prime, set()).update(map(str, ids_by_modulus[n]))
+
+    vulnerable = []
+    for n, p in factors.items():
+        ids = ids_by_modulus[n]
+        shared_with = set()
+        for prime in (p, n // p):
+            shared_with |= ids_by_prime.get(prime, set())
+        for key_id in ids:
+            vulnerable.append({
+                'id': key_id,
+                'bits': n.bit_length(),
+                'factor': hex(p),
+                'shared_with': sorted(shared_with - {str(key_id)})
+            })
+
+    return {
+        'keys': total,
+        'unique_moduli': len(moduli),
+        'invalid': invalid,
+        'duplicate_moduli': [ids for ids in ids_by_modulus.values() if len(ids) > 1],
+        'vulnerable': vulnerable,
+        'unresolved': [ids_by_modulus[n] for n, _ in weak if n not in factors],
+        'weak_moduli': weak_moduli,
+        'backend': BACKEND,
+        'timings': {'load_ms': load_ms, 'batch_gcd_ms': gcd_ms,
+                    'weak_checks_ms': weak_ms,
+                    'total_ms': (time.perf_counter() - started) * 1000}
+    }
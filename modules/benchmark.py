@@ -0,0 +1,248 @@
+"""
+Arnés de benchmarks con medición estadística
+"""
+
+from contextlib import contextmanager
+import math
+import os
+import statistics
+import threading
+import time
+import tracemalloc
+
+
+# Directorio para datos persistentes (claves de prueba, históricos, cachés)
+DATA_DIR = os.environ.get(
+    'CRYPTOANALYZER_DATA_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+)
+
+# Serializa los perfiles de memoria (tracemalloc es global al proceso)
+_memory_lock = threading.Lock()
+
+
+def data_path(*parts):
+    """Ruta dentro de DATA_DIR, creando el directorio padre si no existe"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def histogram(values, bins=10):
+    """Histograma de ancho fijo: lista de {'from', 'to', 'count'}"""
+    if not values:
+        return []
+    low, high = min(values), max(values)
+    width = (high - low) / bins or 1
+    counts = [0] * bins
+    for value in values:
+        counts[min(bins - 1, int((value - low) / width))] += 1
+    return [
+        {'from': low + i * width, 'to': low + (i + 1) * width, 'count': count}
+        for i, count in enumerate(counts)
+    ]
+
+
+# Valores críticos de t de Student (dos colas, 95%) para muestras pequeñas
+_T_CRITICAL_95 = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+    8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086,
+    25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980
+}
+
+
+def t_critical(degrees_of_freedom):
+    """Valor crítico de t al 95% (conservador entre entradas de la tabla)"""
+    for df in sorted(_T_CRITICAL_95):
+        if degrees_of_freedom <= df:
+            return _T_CRITICAL_95[df]
+    return 1.960
+
+
+def welch_t_test(before, after):
+    """
+    Prueba t de Welch entre dos resultados resumidos
+
+    Cada argumento es un diccionario con mean_ms, stddev_ms y samples.
+    Devuelve (diferencia significativa al 95%, valor t o None si no hay varianza).
+    """
+    n0, n1 = before['samples'], after['samples']
+    v0 = before['stddev_ms'] ** 2 / n0 if n0 else 0
+    v1 = after['stddev_ms'] ** 2 / n1 if n1 else 0
+    diff = after['mean_ms'] - before['mean_ms']
+
+    if v0 + v1 == 0:
+        return diff != 0, None
+
+    t_value = diff / math.sqrt(v0 + v1)
+    denominator = 0
+    if n0 > 1:
+        denominator += v0 ** 2 / (n0 - 1)
+    if n1 > 1:
+        denominator += v1 ** 2 / (n1 - 1)
+    df = (v0 + v1) ** 2 / denominator if denominator else 1
+
+    return abs(t_value) > t_critical(max(1, int(df))), t_value
+
+
+def _percentile(sorted_values, percent):
+    """Percentil con interpolación lineal sobre una lista ordenada"""
+    if not sorted_values:
+        return 0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return sorted_values[lower]
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def measure_memory(func, payload_bytes=0):
+    """
+    Perfil de memoria de una llamada a func() con tracemalloc
+
+    Devuelve el pico asignado por encima de la memoria previa, el pico por
+    byte de entrada y los bloques/bytes nuevos que siguen vivos al terminar
+    la llamada (incluido el resultado). tracemalloc solo conoce los bloques
+    vivos, así que las asignaciones liberadas antes del final solo se ven
+    reflejadas en el pico.
+
+    tracemalloc es global al proceso: las mediciones de varios hilos (por
+    ejemplo, peticiones concurrentes) se ejecutan de una en una.
+    """
+    with _memory_lock:
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        try:
+            before = tracemalloc.take_snapshot()
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            del result
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    difference = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'filename')
+    peak_bytes = max(0, peak - baseline)
+
+    return {
+        'peak_bytes': peak_bytes,
+        'peak_bytes_per_input_byte': peak_bytes / payload_bytes if payload_bytes else None,
+        'retained_blocks': max(0, sum(stat.count_diff for stat in difference)),
+        'retained_bytes': max(0, sum(stat.size_diff for stat in difference))
+    }
+
+
+@contextmanager
+def pinned_cpu(cpu):
+    """Fija el proceso a una CPU durante la medición (si el sistema lo permite)"""
+    if cpu is None or not hasattr(os, 'sched_setaffinity'):
+        yield False
+        return
+
+    previous = os.sched_getaffinity(0)
+    try:
+        os.sched_setaffinity(0, {int(cpu)})
+    except OSError:
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        os.sched_setaffinity(0, previous)
+
+
+class BenchmarkHarness:
+    """
+    Mide una operación con calentamiento, número de iteraciones adaptativo
+    y estadísticas robustas (mediana, percentiles, desviación e IC al 95%).
+
+    Con track_memory añade el perfil de memoria de una llamada adicional,
+    hecha fuera de las muestras para que tracemalloc no altere los tiempos.
+    """
+
+    def __init__(self, samples=30, warmup_rounds=5, min_sample_ns=200_000,
+                 max_inner_iterations=1_000_000, cpu=None, track_memory=True):
+        self.samples = max(3, int(samples))
+        self.warmup_rounds = max(0, int(warmup_rounds))
+        self.min_sample_ns = min_sample_ns
+        self.max_inner_iterations = max_inner_iterations
+        self.cpu = cpu
+        self.track_memory = track_memory
+
+    def measure(self, func, payload_bytes=0):
+        """
+        Mide func() y devuelve las estadísticas por operación
+
+        Args:
+            func: Operación sin argumentos a medir
+            payload_bytes: Bytes procesados por operación (para MB/s)
+        """
+        with pinned_cpu(self.cpu) as pinned:
+            for _ in range(self.warmup_rounds):
+                func()
+
+            inner = self._calibrate(func)
+            timings = []
+            for _ in range(self.samples):
+                start = time.perf_counter_ns()
+                for _ in range(inner):
+                    func()
+                timings.append((time.perf_counter_ns() - start) / inner)
+
+        stats = BenchmarkHarness.summarize(timings, payload_bytes)
+        stats['iterations_per_sample'] = inner
+        stats['warmup_rounds'] = self.warmup_rounds
+        stats['pinned_cpu'] = self.cpu if pinned else None
+        stats['memory'] = measure_memory(func, payload_bytes) if self.track_memory else None
+        return stats
+
+    def _calibrate(self, func):
+        """Duplica las iteraciones internas hasta que una muestra dure lo suficiente"""
+        inner = 1
+        while inner < self.max_inner_iterations:
+            start = time.perf_counter_ns()
+            for _ in range(inner):
+                func()
+            if time.perf_counter_ns() - start >= self.min_sample_ns:
+                break
+            inner *= 2
+        return inner
+
+    @staticmethod
+    def summarize(timings_ns, payload_bytes=0):
+        """Estadísticas de una lista de tiempos por operación en nanosegundos"""
+        ordered = sorted(timings_ns)
+
+        # Valores atípicos por criterio de Tukey (1.5 * IQR)
+        q1 = _percentile(ordered, 25)
+        q3 = _percentile(ordered, 75)
+        fence = 1.5 * (q3 - q1)
+        kept = [t for t in ordered if q1 - fence <= t <= q3 + fence] or ordered
+
+        mean = statistics.fmean(kept)
+        stddev = statistics.stdev(kept) if len(kept) > 1 else 0
+        margin = t_critical(len(kept) - 1) * stddev / math.sqrt(len(kept)) if len(kept) > 1 else 0
+        median = _percentile(ordered, 50)
+
+        stats = {
+            'samples': len(ordered),
+            'outliers': len(ordered) - len(kept),
+            'mean_ms': mean / 1e6,
+            'median_ms': median / 1e6,
+            'p95_ms': _percentile(ordered, 95) / 1e6,
+            'p99_ms': _percentile(ordered, 99) / 1e6,
+            'min_ms': ordered[0] / 1e6,
+            'max_ms': ordered[-1] / 1e6,
+            'stddev_ms': stddev / 1e6,
+            'ci95_ms': [(mean - margin) / 1e6, (mean + margin) / 1e6],
+            'ops_per_s': 1e9 / median if median > 0 else 0,
+            'mb_per_s': (payload_bytes / 1e6) / (median / 1e9) if median > 0 and payload_bytes else 0
+        }
+        return stats
@@ -0,0 +1,255 @@
+"""
+Histórico de resultados de benchmarks en SQLite con detección de regresiones
+"""
+
+from contextlib import closing
+from datetime import datetime
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+
+from modules.benchmark import data_path, welch_t_test
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    python_version TEXT NOT NULL,
+    crypto_version TEXT NOT NULL,
+    git_revision TEXT NOT NULL,
+    params TEXT
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    median_ms REAL NOT NULL,
+    mean_ms REAL NOT NULL,
+    stddev_ms REAL NOT NULL,
+    p95_ms REAL,
+    samples INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS baselines (
+    suite TEXT NOT NULL,
+    machine TEXT NOT NULL,
+    workload TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    PRIMARY KEY (suite, machine, workload)
+);
+CREATE INDEX IF NOT EXISTS idx_runs_suite_machine ON runs(suite, machine);
+CREATE INDEX IF NOT EXISTS idx_measurements_name ON measurements(name, run_id);
+"""
+
+
+def environment_info():
+    """Huella de la máquina y versiones que identifican un resultado"""
+    fingerprint_source = '|'.join([
+        platform.node(), platform.machine(), platform.processor(),
+        platform.system(), str(os.cpu_count())
+    ])
+
+    try:
+        import Crypto
+        crypto_version = Crypto.__version__
+    except Exception:
+        crypto_version = 'desconocida'
+
+    git_revision = os.environ.get('GIT_REVISION')
+    if not git_revision:
+        try:
+            git_revision = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                capture_output=True, text=True, timeout=5
+            ).stdout.strip()
+        except Exception:
+            git_revision = ''
+
+    return {
+        'machine': hashlib.sha256(fingerprint_source.encode('utf-8')).hexdigest()[:16],
+        'python_version': platform.python_version(),
+        'crypto_version': crypto_version,
+        'git_revision': git_revision or 'desconocida'
+    }
+
+
+def workload_key(params):
+    """Huella de los parámetros de carga de una ejecución (tamaño, iteraciones...)"""
+    if isinstance(params, str):
+        params = json.loads(params or '{}')
+    source = json.dumps(params or {}, sort_keys=True)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:16]
+
+
+class BenchmarkHistory:
+    """
+    Almacena ejecuciones de benchmarks y las compara con una línea base
+
+    Hay una línea base por suite, máquina y carga de trabajo: solo se
+    comparan ejecuciones con los mismos parámetros.
+    """
+
+    _environment = None
+
+    def __init__(self, path=None):
+        self.path = path or data_path('benchmark_history.sqlite3')
+        with closing(self._connect()) as conn:
+            # Las bases antiguas no distinguían la carga de trabajo: se descartan
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(baselines)')]
+            if columns and 'workload' not in columns:
+                conn.execute('DROP TABLE baselines')
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    @classmethod
+    def environment(cls):
+        """Información del entorno, calculada una vez por proceso"""
+        if cls._environment is None:
+            cls._environment = environment_info()
+        return cls._environment
+
+    @staticmethod
+    def measurements_from_results(prefix, results):
+        """
+        Convierte la salida de AESCrypto/RSACrypto.benchmark en mediciones
+
+        Genera nombres como 'aes-256/encrypt' o 'rsa-2048/decrypt'.
+        """
+        measurements = []
+        for result in results:
+            for operation in ('encrypt', 'decrypt'):
+                stats = result.get(f'{operation}_stats')
+                if stats:
+                    measurements.append({
+                        'name': f"{prefix}-{result['key_size']}/{operation}",
+                        'stats': stats
+                    })
+        return measurements
+
+    def record(self, suite, measurements, params=None, set_baseline_if_missing=True):
+        """
+        Guarda una ejecución y devuelve su id
+
+        Args:
+            suite: Nombre del grupo de benchmarks ('aes', 'rsa', ...)
+            measurements: Lista de {'name', 'stats'} con stats del BenchmarkHarness
+            params: Parámetros de la ejecución (se guardan como JSON)
+        """
+        env = BenchmarkHistory.environment()
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                'INSERT INTO runs (created_at, suite, machine, python_version, crypto_version, git_revision, params) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (datetime.now().isoformat(timespec='seconds'), suite, env['machine'],
+                 env['python_version'], env['crypto_version'], env['git_revision'],
+                 json.dumps(params or {}))
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                'INSERT INTO measurements (run_id, name, median_ms, mean_ms, stddev_ms, p95_ms, samples) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                # Media y desviación se calculan sin outliers: samples también
+                [(run_id, m['name'], m['stats']['median_ms'], m['stats']['mean_ms'],
+                  m['stats']['stddev_ms'], m['stats'].get('p95_ms'),
+                  m['stats']['samples'] - m['stats'].get('outliers', 0))
+                 for m in measurements]
+            )
+            if set_baseline_if_missing:
+                conn.execute(
+                    'INSERT OR IGNORE INTO baselines (suite, machine, workload, run_id) VALUES (?, ?, ?, ?)',
+                    (suite, env['machine'], workload_key(params), run_id)
+                )
+        return run_id
+
+    def set_baseline(self, run_id):
+        """Marca una ejecución como línea base de su suite, máquina y carga de trabajo"""
+        with closing(self._connect()) as conn, conn:
+            run = conn.execute('SELECT suite, machine, params FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if run is None:
+                raise ValueError(f'No existe la ejecución {run_id}')
+            workload = workload_key(run['params'])
+            conn.execute(
+                'INSERT OR REPLACE INTO baselines (suite, machine, workload, run_id) VALUES (?, ?, ?, ?)',
+                (run['suite'], run['machine'], workload, run_id)
+            )
+        return {'suite': run['suite'], 'machine': run['machine'], 'workload': workload, 'run_id': run_id}
+
+    def runs(self, suite=None, limit=50):
+        """Últimas ejecuciones guardadas"""
+        query = 'SELECT * FROM runs'
+        args = []
+        if suite:
+            query += ' WHERE suite = ?'
+            args.append(suite)
+        query += ' ORDER BY id DESC LIMIT ?'
+        args.append(int(limit))
+
+        with closing(self._connect()) as conn:
+            return [dict(row, params=json.loads(row['params'] or '{}')) for row in conn.execute(query, args)]
+
+    def trend(self, name, machine=None, limit=100):
+        """Serie temporal de una medición (por defecto en esta máquina)"""
+        machine = machine or BenchmarkHistory.environment()['machine']
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                'SELECT r.id AS run_id, r.created_at, r.git_revision, r.crypto_version, r.python_version, '
+                'm.median_ms, m.mean_ms, m.stddev_ms, m.p95_ms, m.samples '
+                'FROM measurements m JOIN runs r ON r.id = m.run_id '
+                'WHERE m.name = ? AND r.machine = ? ORDER BY r.id DESC LIMIT ?',
+                (name, machine, int(limit))
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def check_regressions(self, run_id, threshold=0.05):
+        """
+        Compara una ejecución con la línea base de su suite, máquina y carga de trabajo
+
+        Una medición es regresión si es más lenta que la base en más de
+        `threshold` (relativo) y la diferencia de medias es significativa
+        según la prueba t de Welch al 95%.
+        """
+        with closing(self._connect()) as conn:
+            run = conn.execute('SELECT suite, machine, params FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if run is None:
+                raise ValueError(f'No existe la ejecución {run_id}')
+            baseline = conn.execute(
+                'SELECT run_id FROM baselines WHERE suite = ? AND machine = ? AND workload = ?',
+                (run['suite'], run['machine'], workload_key(run['params']))
+            ).fetchone()
+            if baseline is None or baseline['run_id'] == run_id:
+                return {'baseline_run_id': baseline['run_id'] if baseline else None, 'regressions': [], 'compared': 0}
+
+            current = {row['name']: row for row in conn.execute('SELECT * FROM measurements WHERE run_id = ?', (run_id,))}
+            base = {row['name']: row for row in conn.execute('SELECT * FROM measurements WHERE run_id = ?', (baseline['run_id'],))}
+
+        regressions = []
+        compared = 0
+        for name, now in current.items():
+            before = base.get(name)
+            if before is None or before['mean_ms'] <= 0:
+                continue
+            compared += 1
+
+            slowdown = (now['mean_ms'] - before['mean_ms']) / before['mean_ms']
+            significant, t_value = welch_t_test(before, now)
+            if slowdown > threshold and significant:
+                regressions.append({
+                    'name': name,
+                    'baseline_mean_ms': before['mean_ms'],
+                    'current_mean_ms': now['mean_ms'],
+                    'slowdown_percent': slowdown * 100,
+                    't_value': t_value
+                })
+
+        regressions.sort(key=lambda r: r['slowdown_percent'], reverse=True)
+        return {'baseline_run_id': baseline['run_id'], 'regressions': regressions, 'compared': compared}
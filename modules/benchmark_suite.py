@@ -0,0 +1,433 @@
+"""
+Suite registrada de benchmarks sobre todos los módulos (sin servidor)
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from fnmatch import fnmatch
+import math
+import os
+import statistics
+import time
+
+from modules.benchmark import BenchmarkHarness
+
+
+# Texto base en español para que los ataques por frecuencia tengan sentido
+SAMPLE_TEXT = (
+    'En un lugar de la Mancha de cuyo nombre no quiero acordarme no ha mucho tiempo '
+    'que vivia un hidalgo de los de lanza en astillero adarga antigua rocin flaco y '
+    'galgo corredor. Una olla de algo mas vaca que carnero salpicon las mas noches '
+    'duelos y quebrantos los sabados lentejas los viernes algun palomino de anadidura '
+    'los domingos consumian las tres partes de su hacienda. '
+)
+
+DEFAULT_SIZES = [1000, 10000]
+
+# Longitudes de texto para las curvas de complejidad
+COMPLEXITY_SIZES = [100, 1000, 10000, 50000]
+MAX_COMPLEXITY_SIZE = 200000
+
+# Cargas para el benchmark de escalado: nombre -> (benchmark registrado, tamaño)
+SCALING_WORKLOADS = {
+    'aes': ('modern/aes-cbc-encrypt', 65536),
+    'rsa': ('modern/rsa-2048-decrypt', None),
+    'cryptanalysis': ('cryptanalysis/vigenere-key-length', 10000)
+}
+MAX_SCALING_WORKERS = 32
+
+# Registro: nombre -> {'setup', 'sizes', 'sized', 'group'}
+BENCHMARKS = {}
+
+
+def register(name, sizes=None):
+    """
+    Registra un benchmark
+
+    La función decorada recibe el tamaño de entrada y devuelve
+    (operación sin argumentos, bytes procesados por operación).
+    Si sizes es None el benchmark no depende del tamaño.
+    """
+    def decorator(setup):
+        BENCHMARKS[name] = {
+            'setup': setup,
+            'sizes': sizes or [None],
+            'sized': sizes is not None,
+            'group': name.split('/')[0]
+        }
+        return setup
+    return decorator
+
+
+def sample_text(size):
+    """Texto de prueba de exactamente `size` caracteres"""
+    repeats = size // len(SAMPLE_TEXT) + 1
+    return (SAMPLE_TEXT * repeats)[:size]
+
+
+def sample_findings(count):
+    """Datos de análisis con `count` vulnerabilidades para los reportes"""
+    severities = ['CRÍTICA', 'ALTA', 'MEDIA', 'BAJA']
+    types = ['Modo ECB No Seguro', 'Clave Demasiado Corta', 'Sin Autenticación', 'Reutilización de IV/Nonce']
+    return {
+        'algorithm': 'AES',
+        'vulnerabilities': [
+            {
+                'type': types[i % len(types)],
+                'severity': severities[i % len(severities)],
+                'description': f'Hallazgo de prueba número {i}',
+                'impact': 'Impacto de prueba',
+                'recommendation': 'Recomendación de prueba'
+            }
+            for i in range(count)
+        ]
+    }
+
+
+# ============================================
+# CIFRADOS CLÁSICOS
+# ============================================
+@register('classic/caesar-encrypt', DEFAULT_SIZES)
+def _caesar_encrypt(size):
+    from modules.classic_ciphers import CaesarCipher
+    text = sample_text(size)
+    return lambda: CaesarCipher.encrypt(text, 3), size
+
+
+@register('classic/vigenere-encrypt', DEFAULT_SIZES)
+def _vigenere_encrypt(size):
+    from modules.classic_ciphers import VigenereCipher
+    text = sample_text(size)
+    return lambda: VigenereCipher.encrypt(text, 'CLAVE'), size
+
+
+@register('classic/vigenere-decrypt', DEFAULT_SIZES)
+def _vigenere_decrypt(size):
+    from modules.classic_ciphers import VigenereCipher
+    ciphertext = VigenereCipher.encrypt(sample_text(size), 'CLAVE')
+    return lambda: VigenereCipher.decrypt(ciphertext, 'CLAVE'), size
+
+
+@register('classic/playfair-encrypt', DEFAULT_SIZES)
+def _playfair_encrypt(size):
+    from modules.classic_ciphers import PlayfairCipher
+    text = sample_text(size)
+    return lambda: PlayfairCipher.encrypt(text, 'MONARQUIA'), size
+
+
+@register('classic/playfair-decrypt', DEFAULT_SIZES)
+def _playfair_decrypt(size):
+    from modules.classic_ciphers import PlayfairCipher
+    ciphertext = PlayfairCipher.encrypt(sample_text(size), 'MONARQUIA')
+    return lambda: PlayfairCipher.decrypt(ciphertext, 'MONARQUIA'), size
+
+
+# ============================================
+# CRIPTOANÁLISIS
+# ============================================
+@register('cryptanalysis/frequency', DEFAULT_SIZES)
+def _frequency(size):
+    from modules.cryptanalysis import FrequencyAnalysis
+    text = sample_text(size)
+    return lambda: FrequencyAnalysis.calculate_chi_squared(FrequencyAnalysis.analyze(text)), size
+
+
+@register('cryptanalysis/index-of-coincidence', DEFAULT_SIZES)
+def _index_of_coincidence(size):
+    from modules.cryptanalysis import BruteForce
+    text = ''.join(c for c in sample_text(size).upper() if c.isalpha())
+    return lambda: BruteForce._calculate_ic(text), size
+
+
+@register('cryptanalysis/caesar-bruteforce', DEFAULT_SIZES)
+def _caesar_bruteforce(size):
+    from modules.classic_ciphers import CaesarCipher
+    from modules.cryptanalysis import BruteForce
+    ciphertext = CaesarCipher.encrypt(sample_text(size), 7)
+    return lambda: BruteForce.caesar_attack(ciphertext), size
+
+
+@register('cryptanalysis/vigenere-key-length', DEFAULT_SIZES)
+def _vigenere_key_length(size):
+    from modules.classic_ciphers import VigenereCipher
+    from modules.cryptanalysis import BruteForce
+    ciphertext = VigenereCipher.encrypt(sample_text(size), 'CLAVE')
+    return lambda: BruteForce.vigenere_key_length(ciphertext), size
+
+
+@register('cryptanalysis/vigenere-estimate-key', DEFAULT_SIZES)
+def _vigenere_estimate_key(size):
+    from modules.classic_ciphers import VigenereCipher
+    from modules.cryptanalysis import BruteForce
+    ciphertext = VigenereCipher.encrypt(sample_text(size), 'CLAVE')
+    return lambda: BruteForce.estimate_vigenere_key(ciphertext, 5), size
+
+
+# ============================================
+# CRIPTOGRAFÍA MODERNA
+# ============================================
+@register('modern/aes-cbc-encrypt', [1024, 65536, 1024 * 1024])
+def _aes_cbc_encrypt(size):
+    from modules.modern_crypto import AESCrypto
+    key = AESCrypto.generate_key(256)
+    data = b'\x00' * size
+    return lambda: AESCrypto.encrypt(data, key, mode='CBC'), size
+
+
+@register('modern/aes-cbc-decrypt', [1024, 65536, 1024 * 1024])
+def _aes_cbc_decrypt(size):
+    from modules.modern_crypto import AESCrypto
+    key = AESCrypto.generate_key(256)
+    encrypted = AESCrypto.encrypt(sample_text(size), key, mode='CBC')
+    return lambda: AESCrypto.decrypt(encrypted['ciphertext'], key, mode='CBC', iv=encrypted['iv']), size
+
+
+@register('modern/rsa-2048-encrypt')
+def _rsa_encrypt(size):
+    from modules.modern_crypto import RSACrypto
+    keypair = RSACrypto.benchmark_keypair(2048)
+    return lambda: RSACrypto.encrypt('mensaje de prueba', keypair['public_key']), 17
+
+
+@register('modern/rsa-2048-decrypt')
+def _rsa_decrypt(size):
+    from modules.modern_crypto import RSACrypto
+    keypair = RSACrypto.benchmark_keypair(2048)
+    ciphertext = RSACrypto.encrypt('mensaje de prueba', keypair['public_key'])
+    return lambda: RSACrypto.decrypt(ciphertext, keypair['private_key']), 17
+
+
+@register('modern/hybrid-envelope', [1024, 1024 * 1024])
+def _hybrid_envelope(size):
+    from modules.modern_crypto import RSACrypto, HybridCrypto
+    keypair = RSACrypto.benchmark_keypair(2048)
+    data = b'\x00' * size
+    return lambda: HybridCrypto.encrypt_envelope(data, keypair['public_key']), size
+
+
+# ============================================
+# REPORTES (el tamaño es el número de hallazgos)
+# ============================================
+@register('reports/full-report', [10, 1000])
+def _full_report(size):
+    from modules.reports import ReportGenerator
+    analysis = sample_findings(size)
+    return lambda: ReportGenerator.generate_full_report(analysis), 0
+
+
+@register('reports/html', [10, 1000])
+def _html_report(size):
+    from modules.reports import ReportGenerator
+    report = ReportGenerator.generate_full_report(sample_findings(size))
+    return lambda: ReportGenerator.format_html_report(report), 0
+
+
+@register('reports/json', [10, 1000])
+def _json_report(size):
+    from modules.reports import ReportGenerator
+    report = ReportGenerator.generate_full_report(sample_findings(size))
+    return lambda: ReportGenerator.export_json(report), 0
+
+
+def select(patterns=None):
+    """Nombres registrados que coinciden con algún patrón (glob o subcadena)"""
+    if not patterns:
+        return sorted(BENCHMARKS)
+    return sorted(
+        name for name in BENCHMARKS
+        if any(fnmatch(name, pattern) or pattern in name for pattern in patterns)
+    )
+
+
+def complexity_exponent(points):
+    """Exponente k estimado de tiempo ~ n^k (pendiente en escala log-log)"""
+    pairs = [(math.log(p['size']), math.log(p['median_ms'])) for p in points if p['size'] and p['median_ms'] > 0]
+    if len(pairs) < 2:
+        return None
+    mean_x = sum(x for x, _ in pairs) / len(pairs)
+    mean_y = sum(y for _, y in pairs) / len(pairs)
+    var_x = sum((x - mean_x) ** 2 for x, _ in pairs)
+    if var_x == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in pairs) / var_x
+
+
+def run_complexity(group, sizes=None, samples=5, cpu=None):
+    """
+    Curva de rendimiento y memoria frente a la longitud del texto
+
+    Ejecuta cada benchmark del grupo ('classic' o 'cryptanalysis') para cada
+    longitud y estima el exponente de complejidad. La memoria es el perfil
+    de tracemalloc que añade el BenchmarkHarness.
+    """
+    sizes = sorted(int(s) for s in (sizes or COMPLEXITY_SIZES))
+    if sizes[-1] > MAX_COMPLEXITY_SIZE:
+        raise ValueError(f'La longitud máxima es {MAX_COMPLEXITY_SIZE} caracteres')
+
+    harness = BenchmarkHarness(samples=samples, warmup_rounds=1, cpu=cpu)
+    results = []
+
+    for name in select([f'{group}/*']):
+        points = []
+        for size in sizes:
+            operation, payload_bytes = BENCHMARKS[name]['setup'](size)
+            stats = harness.measure(operation, payload_bytes)
+            memory = stats['memory']
+            points.append({
+                'size': size,
+                'median_ms': stats['median_ms'],
+                'p95_ms': stats['p95_ms'],
+                'chars_per_s': size / (stats['median_ms'] / 1000) if stats['median_ms'] > 0 else 0,
+                'peak_memory_bytes': memory['peak_bytes'],
+                'memory_per_char': memory['peak_bytes'] / size if size else 0,
+                'retained_blocks': memory['retained_blocks']
+            })
+        results.append({
+            'name': name,
+            'points': points,
+            'complexity_exponent': complexity_exponent(points)
+        })
+
+    return results
+
+
+_scaling_operation = None
+
+
+def _run_iterations(operation, iterations):
+    for _ in range(iterations):
+        operation()
+    return iterations
+
+
+def _scaling_worker_init(name, size):
+    """Prepara la operación una vez por proceso del pool"""
+    global _scaling_operation
+    _scaling_operation = BENCHMARKS[name]['setup'](size)[0]
+
+
+def _scaling_worker_run(iterations):
+    return _run_iterations(_scaling_operation, iterations)
+
+
+def _scaling_round(executor, submit, workers, iterations):
+    """Tiempo de pared (s) de `workers` tareas simultáneas de `iterations` operaciones"""
+    start = time.perf_counter()
+    futures = [submit(executor, iterations) for _ in range(workers)]
+    for future in futures:
+        future.result()
+    return time.perf_counter() - start
+
+
+def worker_counts(max_workers):
+    """1, 2, 4, ... hasta max_workers (incluido)"""
+    counts = []
+    count = 1
+    while count < max_workers:
+        counts.append(count)
+        count *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def run_scaling(workloads=None, max_workers=None, target_seconds=0.2, repeats=3):
+    """
+    Escalado de las cargas AES, RSA y de criptoanálisis con 1..N hilos y procesos
+
+    Cada trabajador ejecuta el mismo número de operaciones (calibrado para
+    durar unos target_seconds en un solo hilo). El rendimiento agregado se
+    compara con el de un trabajador del mismo tipo: eficiencia = speedup / N.
+    Si los hilos escalan, la operación libera el GIL; si solo escalan los
+    procesos, esa ruta necesita un pool de procesos.
+    """
+    # Nunca más trabajadores que núcleos (ni que MAX_SCALING_WORKERS)
+    cpu_count = os.cpu_count() or 1
+    max_workers = min(int(max_workers or cpu_count), cpu_count, MAX_SCALING_WORKERS)
+    counts = worker_counts(max(1, max_workers))
+    results = []
+
+    for workload in (workloads or list(SCALING_WORKLOADS)):
+        if workload not in SCALING_WORKLOADS:
+            raise ValueError(f'Carga desconocida: {workload}')
+        name, size = SCALING_WORKLOADS[workload]
+        operation = BENCHMARKS[name]['setup'](size)[0]
+
+        single = BenchmarkHarness(samples=5, warmup_rounds=2, track_memory=False).measure(operation)
+        iterations = max(1, int(target_seconds * 1000 / single['median_ms'])) if single['median_ms'] > 0 else 1
+
+        executors = {
+            'threads': (
+                lambda n: ThreadPoolExecutor(max_workers=n),
+                lambda executor, k: executor.submit(_run_iterations, operation, k)
+            ),
+            'processes': (
+                lambda n: ProcessPoolExecutor(max_workers=n, initializer=_scaling_worker_init, initargs=(name, size)),
+                lambda executor, k: executor.submit(_scaling_worker_run, k)
+            )
+        }
+
+        entry = {
+            'workload': workload,
+            'name': name,
+            'size': size,
+            'single_op_ms': single['median_ms'],
+            'iterations_per_worker': iterations
+        }
+
+        for kind, (create, submit) in executors.items():
+            points = []
+            base_throughput = None
+            for workers in counts:
+                with create(workers) as executor:
+                    # Arranca los trabajadores (y prepara la operación en cada proceso)
+                    _scaling_round(executor, submit, workers, 1)
+                    wall = statistics.median(
+                        _scaling_round(executor, submit, workers, iterations) for _ in range(repeats)
+                    )
+
+                throughput = workers * iterations / wall
+                if base_throughput is None:
+                    base_throughput = throughput
+                speedup = throughput / base_throughput
+                points.append({
+                    'workers': workers,
+                    'wall_s': wall,
+                    'throughput_ops_s': throughput,
+                    'speedup': speedup,
+                    'efficiency': speedup / workers
+                })
+            entry[kind] = points
+
+        # Con dos o más CPUs, hilos que escalan al 75% indican que se libera el GIL
+        two_threads = next((p for p in entry['threads'] if p['workers'] == 2), None)
+        entry['releases_gil'] = two_threads['efficiency'] >= 0.75 if two_threads and cpu_count >= 2 else None
+        results.append(entry)
+
+    return {'cpu_count': cpu_count, 'worker_counts': counts, 'results': results}
+
+
+def run_suite(patterns=None, sizes=None, samples=10, cpu=None, progress=None):
+    """
+    Ejecuta los benchmarks seleccionados
+
+    Args:
+        patterns: Filtros por nombre (glob o subcadena)
+        sizes: Tamaños que sustituyen a los de cada benchmark dependiente del tamaño
+        progress: Función opcional llamada con cada resultado al terminar
+
+    Returns:
+        Lista de resultados con nombre, tamaño y estadísticas
+    """
+    harness = BenchmarkHarness(samples=samples, cpu=cpu)
+    results = []
+
+    for name in select(patterns):
+        entry = BENCHMARKS[name]
+        for size in (sizes if sizes and entry['sized'] else entry['sizes']):
+            operation, payload_bytes = entry['setup'](size)
+            stats = harness.measure(operation, payload_bytes)
+            result = dict(stats, name=name, group=entry['group'], size=size)
+            results.append(result)
+            if progress:
+                progress(result)
+
+    return results
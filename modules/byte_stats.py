@@ -0,0 +1,286 @@
+"""
+Núcleo de estadísticas de bytes con NumPy para el análisis de textos cifrados
+"""
+
+import base64
+import math
+import os
+import tempfile
+
+import numpy as np
+
+from modules.benchmark import DATA_DIR
+
+
+def as_buffer(data):
+    """bytes/bytearray/memoryview tal cual; las cadenas se decodifican como base64"""
+    if isinstance(data, str):
+        return base64.b64decode(data)
+    return data
+
+
+def byte_statistics(data, block_size=16):
+    """
+    Estadísticas de un texto cifrado en una sola pasada
+
+    Un único bincount sobre la vista np.frombuffer (sin copiar los datos)
+    da la entropía, el chi-cuadrado y la uniformidad; la repetición de
+    bloques se calcula sobre la misma vista. Con block_size=None se omite.
+
+    Args:
+        data: bytes, bytearray, memoryview o cadena base64
+        block_size: Tamaño de bloque para detectar repeticiones (ECB)
+    """
+    array = np.frombuffer(as_buffer(data), dtype=np.uint8)
+    total_bytes = int(array.size)
+
+    counts = np.bincount(array, minlength=256)
+    present = counts[counts > 0]
+
+    if total_bytes:
+        probabilities = present / total_bytes
+        entropy = float(-(probabilities * np.log2(probabilities)).sum())
+        # Igual que el cálculo original: solo se suman los bytes observados
+        expected = total_bytes / 256
+        chi_squared = float(((present - expected) ** 2 / expected).sum())
+    else:
+        entropy = 0
+        chi_squared = 0
+
+    stats = {
+        'total_bytes': total_bytes,
+        'unique_bytes': int(present.size),
+        'entropy': entropy,
+        'chi_squared': chi_squared,
+        'uniformity': present.size / 256 * 100,
+        'blocks': block_repetition(array, block_size) if block_size else None
+    }
+    return stats
+
+
+def block_matrix(array, block_size=16):
+    """
+    Bloques completos como matriz (n, columnas)
+
+    Con tamaños múltiplos de 8 cada bloque son block_size/8 columnas uint64
+    (16 bytes -> (n, 2)), así las comparaciones son de enteros y no de
+    objetos bytes. En otro caso se usan columnas uint8.
+    """
+    full_blocks = array.size // block_size
+    data = array[:full_blocks * block_size]
+    if block_size % 8 == 0:
+        return data.view('<u8').reshape(full_blocks, block_size // 8)
+    return data.reshape(full_blocks, block_size)
+
+
+def _row_groups(matrix):
+    """Orden lexicográfico estable de las filas y posición donde empieza cada grupo de filas iguales"""
+    order = np.lexsort(matrix.T[::-1])
+    ordered = matrix[order]
+    same_as_previous = (ordered[1:] == ordered[:-1]).all(axis=1)
+    return order, np.flatnonzero(np.concatenate([[True], ~same_as_previous]))
+
+
+def duplicate_groups(matrix):
+    """
+    Filas idénticas de una matriz ordenándola lexicográficamente
+
+    Returns:
+        (filas únicas, [(repeticiones, índices de fila ordenados), ...])
+    """
+    rows = matrix.shape[0]
+    if rows == 0:
+        return 0, []
+
+    order, starts = _row_groups(matrix)
+    counts = np.diff(np.append(starts, rows))
+
+    groups = [
+        (int(counts[g]), np.sort(order[starts[g]:starts[g] + counts[g]]))
+        for g in np.flatnonzero(counts > 1)
+    ]
+    return int(starts.size), groups
+
+
+def repeated_groups(matrix, limit, counts=None, positions=None):
+    """
+    Como duplicate_groups, pero solo crea los arrays de índices de los
+    `limit` grupos más repetidos (con datos ECB puede haber millones)
+
+    Args:
+        counts: Repeticiones de cada fila (por defecto 1), para agrupar
+            filas ya colapsadas; las filas con 0 solo aportan su posición
+        positions: Posición de cada fila (por defecto su índice)
+
+    Returns:
+        (filas únicas, grupos repetidos, [(repeticiones, posiciones ordenadas), ...])
+    """
+    rows = matrix.shape[0]
+    if rows == 0:
+        return 0, 0, []
+
+    counts = np.ones(rows, dtype=np.int64) if counts is None else counts.astype(np.int64)
+    positions = np.arange(rows) if positions is None else positions
+
+    order, starts = _row_groups(matrix)
+    totals = np.add.reduceat(counts[order], starts)
+    firsts = np.minimum.reduceat(positions[order], starts)
+    ends = np.append(starts[1:], rows)
+
+    repeated = np.flatnonzero(totals > 1)
+    top = repeated[np.lexsort((firsts[repeated], -totals[repeated]))][:limit]
+    groups = [(int(totals[g]), np.sort(positions[order[starts[g]:ends[g]]])) for g in top]
+    return int(starts.size), int(repeated.size), groups
+
+
+def _collapse_chunk(matrix, max_positions):
+    """
+    Filas de un trozo sin repeticiones más allá de max_positions
+
+    De cada grupo de bloques iguales quedan sus max_positions primeras
+    apariciones; la primera lleva el total del grupo y el resto 0.
+
+    Returns:
+        (índices de fila conservados, repeticiones de cada uno)
+    """
+    rows = matrix.shape[0]
+    order, starts = _row_groups(matrix)
+    sizes = np.diff(np.append(starts, rows))
+    rank = np.arange(rows) - np.repeat(starts, sizes)
+    keep = rank < max_positions
+
+    counts = np.zeros(rows, dtype=np.uint64)
+    counts[starts] = sizes
+    return order[keep], counts[keep]
+
+
+def _repetition_summary(total_blocks, unique_blocks, repeated, groups, block_size, max_groups, max_positions):
+    groups = sorted(groups, key=lambda group: (-group[0], int(group[1][0])))[:max_groups]
+    return {
+        'total_blocks': total_blocks,
+        'unique_blocks': unique_blocks,
+        'repeated_blocks': repeated,
+        'repetition_rate': (total_blocks - unique_blocks) / total_blocks * 100 if total_blocks > 0 else 0,
+        'repeats': [
+            {
+                'count': count,
+                'offsets': [int(i) * block_size for i in positions[:max_positions]]
+            }
+            for count, positions in groups
+        ]
+    }
+
+
+def block_repetition(array, block_size=16, max_groups=20, max_positions=20):
+    """
+    Bloques totales, únicos y repetidos de un array uint8
+
+    'repeats' lista los bloques más repetidos con los desplazamientos (en
+    bytes) de sus apariciones, limitados a max_groups y max_positions.
+    """
+    if block_size <= 0:
+        raise ValueError('block_size debe ser mayor que 0')
+    partial = 1 if array.size % block_size else 0
+    unique_full, repeated, groups = repeated_groups(block_matrix(array, block_size), max_groups)
+
+    # Un bloque final incompleto nunca coincide con uno completo
+    return _repetition_summary(
+        array.size // block_size + partial, unique_full + partial, repeated,
+        groups, block_size, max_groups, max_positions
+    )
+
+
+# Constantes de mezcla para repartir bloques entre particiones en disco
+_HASH_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0x27D4EB2F165667C5],
+    dtype=np.uint64
+)
+
+
+def _block_hash(matrix):
+    hashes = np.zeros(matrix.shape[0], dtype=np.uint64)
+    for column in range(matrix.shape[1]):
+        hashes ^= matrix[:, column].astype(np.uint64) * _HASH_MULTIPLIERS[column % len(_HASH_MULTIPLIERS)]
+        hashes ^= hashes >> np.uint64(29)
+    return hashes
+
+
+def block_repetition_file(path, block_size=16, memory_limit=256 * 1024 * 1024,
+                          max_groups=20, max_positions=20, temp_dir=None):
+    """
+    Repetición de bloques de un fichero, aunque no quepa en memoria
+
+    Si el fichero cabe en memory_limit se analiza de una vez. Si no, los
+    bloques se reparten por hash en particiones temporales en disco (cada
+    bloque con su índice) y cada partición se analiza por separado: los
+    bloques iguales siempre caen en la misma partición, así que el
+    resultado es exacto. Antes de repartir, cada trozo colapsa sus bloques
+    repetidos (recuento y primeras max_positions apariciones), para que un
+    bloque muy repetido (sectores a cero, imágenes en ECB) no llene una
+    sola partición. Las particiones van a temp_dir (por defecto DATA_DIR,
+    no /tmp, que puede estar en memoria).
+    """
+    if block_size <= 0:
+        raise ValueError('block_size debe ser mayor que 0')
+    size = os.path.getsize(path)
+    full_blocks = size // block_size
+    partial = 1 if size % block_size else 0
+    record_size = block_size + 16
+    # Ordenar una partición necesita unas tres veces su tamaño
+    working_set = full_blocks * record_size * 3
+
+    if working_set <= memory_limit:
+        return block_repetition(np.fromfile(path, dtype=np.uint8), block_size, max_groups, max_positions)
+
+    partitions = int(math.ceil(working_set / memory_limit))
+    chunk_blocks = max(1, min(memory_limit // 4, 64 * 1024 * 1024) // block_size)
+    sample = block_matrix(np.zeros(block_size, dtype=np.uint8), block_size)
+    record = np.dtype([('block', sample.dtype, (sample.shape[1],)), ('index', '<u8'), ('count', '<u8')])
+
+    temp_dir = temp_dir or DATA_DIR
+    os.makedirs(temp_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory(prefix='blocks-', dir=temp_dir) as workdir:
+        bucket = lambda p: os.path.join(workdir, f'{p}.bin')
+
+        # 1. Colapsar repeticiones de cada trozo y repartir por hash
+        with open(path, 'rb') as source:
+            first_index = 0
+            while first_index < full_blocks:
+                count = min(chunk_blocks, full_blocks - first_index)
+                matrix = block_matrix(np.fromfile(source, dtype=np.uint8, count=count * block_size), block_size)
+                kept, kept_counts = _collapse_chunk(matrix, max_positions)
+                parts = _block_hash(matrix[kept]) % np.uint64(partitions)
+                order = np.argsort(parts, kind='stable')
+                bounds = np.searchsorted(parts[order], np.arange(partitions + 1))
+
+                records = np.empty(kept.size, dtype=record)
+                records['block'] = matrix[kept[order]]
+                records['index'] = kept[order] + first_index
+                records['count'] = kept_counts[order]
+                for p in range(partitions):
+                    if bounds[p] < bounds[p + 1]:
+                        with open(bucket(p), 'ab') as f:
+                            records[bounds[p]:bounds[p + 1]].tofile(f)
+                first_index += count
+
+        # 2. Analizar cada partición en memoria
+        unique_full = 0
+        repeated = 0
+        top_groups = []
+        for p in range(partitions):
+            if not os.path.exists(bucket(p)):
+                continue
+            records = np.fromfile(bucket(p), dtype=record)
+            unique, partition_repeated, groups = repeated_groups(
+                records['block'], max_groups, records['count'], records['index']
+            )
+            unique_full += unique
+            repeated += partition_repeated
+            top_groups.extend((count, positions[:max_positions]) for count, positions in groups)
+            top_groups = sorted(top_groups, key=lambda group: (-group[0], int(group[1][0])))[:max_groups]
+
+    return _repetition_summary(
+        full_blocks + partial, unique_full + partial, repeated,
+        top_groups, block_size, max_groups, max_positions
+    )
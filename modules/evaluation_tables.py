@@ -0,0 +1,93 @@
+"""
+Tablas precalculadas de AESEvaluator y RSAEvaluator
+
+El espacio de entradas es pequeño (tamaños de clave x modos o paddings),
+así que cada evaluación se calcula una sola vez y se guarda ya serializada
+en JSON junto con su ETag (SHA-256 del contenido). El contenido solo
+depende del código, de modo que el ETag es el mismo en todas las
+instancias y una CDN puede cachearlo.
+"""
+
+import hashlib
+import json
+import threading
+
+from modules.modern_crypto import AESEvaluator, RSAEvaluator
+
+
+AES_KEY_SIZES = (128, 192, 256)
+AES_MODES = ('ECB', 'CBC', 'CFB', 'OFB', 'CTR')
+
+RSA_KEY_SIZES = (1024, 2048, 4096)
+RSA_PADDINGS = ('OAEP', 'PKCS1v15', 'None')
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class CachedBody:
+    """Cuerpo JSON ya serializado con su ETag fuerte"""
+
+    def __init__(self, data):
+        self.body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+
+
+def _build_tables():
+    aes = {
+        (key_size, mode): AESEvaluator.evaluate(key_size, mode)
+        for key_size in AES_KEY_SIZES for mode in AES_MODES
+    }
+    rsa = {
+        (key_size, padding): RSAEvaluator.evaluate(key_size, padding)
+        for key_size in RSA_KEY_SIZES for padding in RSA_PADDINGS
+    }
+
+    def table(kind, entries, options):
+        return {'kind': kind, 'options': options, 'entries': list(entries.values())}
+
+    aes_table = table('aes', aes, {'key_sizes': AES_KEY_SIZES, 'modes': AES_MODES})
+    rsa_table = table('rsa', rsa, {'key_sizes': RSA_KEY_SIZES, 'paddings': RSA_PADDINGS})
+
+    # Mismo formato que el resto de la API: {'success': True, ...}
+    tables = {('aes', key): CachedBody({'success': True, 'evaluation': entry}) for key, entry in aes.items()}
+    tables.update({('rsa', key): CachedBody({'success': True, 'evaluation': entry}) for key, entry in rsa.items()})
+    tables['aes'] = CachedBody({'success': True, 'table': aes_table})
+    tables['rsa'] = CachedBody({'success': True, 'table': rsa_table})
+    tables['all'] = CachedBody({'success': True, 'tables': {'aes': aes_table, 'rsa': rsa_table}})
+    return tables
+
+
+def warm():
+    """Calcula todas las tablas (idempotente)"""
+    with _tables_lock:
+        if not _tables:
+            _tables.update(_build_tables())
+
+
+def cached_evaluation(kind, key_size=None, option=None):
+    """
+    Cuerpo precalculado de una evaluación o de una tabla completa
+
+    Args:
+        kind: 'aes', 'rsa' o 'all'
+        key_size, option: Tamaño de clave y modo (AES) o padding (RSA);
+            sin ellos se devuelve la tabla completa de kind
+
+    Returns:
+        CachedBody; ValueError si la combinación no está en la tabla
+    """
+    warm()
+    if kind not in ('aes', 'rsa', 'all'):
+        raise ValueError(f'Tipo no soportado: {kind}')
+    if key_size is None and option is None:
+        return _tables[kind]
+    if kind == 'all':
+        raise ValueError('La tabla completa no admite filtros')
+
+    entry = _tables.get((kind, (key_size, option)))
+    if entry is None:
+        if kind == 'aes':
+            raise ValueError(f'Combinación no soportada: key_size en {list(AES_KEY_SIZES)}, mode en {list(AES_MODES)}')
+        raise ValueError(f'Combinación no soportada: key_size en {list(RSA_KEY_SIZES)}, padding en {list(RSA_PADDINGS)}')
+    return entry
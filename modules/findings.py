@@ -0,0 +1,139 @@
+"""
+Colección indexada de hallazgos para los reportes
+
+Los contadores por severidad y por tipo, los índices de posiciones y la
+puntuación de riesgo se actualizan al añadir cada hallazgo, de modo que el
+resumen ejecutivo, la evaluación de riesgos y las recomendaciones son
+consultas directas. Varias colecciones (una por análisis) se pueden fusionar
+para generar reportes consolidados.
+"""
+
+from collections import Counter
+
+
+RISK_SCORES = {
+    'CRÍTICA': 10,
+    'ALTA': 7,
+    'MEDIA': 4,
+    'BAJA': 1
+}
+
+
+class Finding:
+    """
+    Hallazgo de un análisis (registro compacto con __slots__)
+
+    Los campos que no son de la ficha común (cve, location...) se guardan
+    en extra y se devuelven tal cual en to_dict().
+    """
+
+    __slots__ = ('type', 'severity', 'description', 'impact', 'recommendation', 'source', 'extra')
+
+    FIELDS = ('type', 'severity', 'description', 'impact', 'recommendation', 'source')
+
+    def __init__(self, type, severity, description='', impact='', recommendation='', source=None, extra=None):
+        self.type = type
+        self.severity = severity
+        self.description = description
+        self.impact = impact
+        self.recommendation = recommendation
+        self.source = source
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data, source=None):
+        """Hallazgo a partir de un diccionario de vulnerabilidad"""
+        extra = {key: value for key, value in data.items() if key not in cls.FIELDS}
+        return cls(
+            data['type'],
+            data['severity'],
+            data.get('description', ''),
+            data.get('impact', ''),
+            data.get('recommendation', ''),
+            data.get('source', source),
+            extra or None
+        )
+
+    def to_dict(self):
+        data = {
+            'type': self.type,
+            'severity': self.severity,
+            'description': self.description,
+            'impact': self.impact,
+            'recommendation': self.recommendation
+        }
+        if self.source is not None:
+            data['source'] = self.source
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class FindingsCollection:
+    """Hallazgos con contadores e índices por severidad y por tipo"""
+
+    def __init__(self, findings=(), source=None):
+        self._findings = []
+        self.by_severity = Counter()
+        self.by_type = Counter()
+        self._positions_by_severity = {}
+        self._positions_by_type = {}
+        self.risk_score = 0
+        self.extend(findings, source)
+
+    def add(self, finding, source=None):
+        """Añade un hallazgo (Finding o diccionario) y actualiza los índices"""
+        if not isinstance(finding, Finding):
+            finding = Finding.from_dict(finding, source)
+        position = len(self._findings)
+        self._findings.append(finding)
+        self.by_severity[finding.severity] += 1
+        self.by_type[finding.type] += 1
+        self._positions_by_severity.setdefault(finding.severity, []).append(position)
+        self._positions_by_type.setdefault(finding.type, []).append(position)
+        self.risk_score += RISK_SCORES.get(finding.severity, 0)
+        return finding
+
+    def extend(self, findings, source=None):
+        for finding in findings:
+            self.add(finding, source)
+
+    def merge(self, other):
+        """
+        Incorpora los hallazgos de otra colección sin recorrerlos uno a uno
+        para los contadores (solo se desplazan sus índices de posición)
+        """
+        if other is self:
+            # Se recorrerían las mismas listas que se están ampliando
+            other = FindingsCollection(self._findings)
+        offset = len(self._findings)
+        self._findings.extend(other._findings)
+        self.by_severity.update(other.by_severity)
+        self.by_type.update(other.by_type)
+        for own, theirs in ((self._positions_by_severity, other._positions_by_severity),
+                            (self._positions_by_type, other._positions_by_type)):
+            for key, positions in theirs.items():
+                own.setdefault(key, []).extend(position + offset for position in positions)
+        self.risk_score += other.risk_score
+        return self
+
+    def __len__(self):
+        return len(self._findings)
+
+    def __iter__(self):
+        return iter(self._findings)
+
+    def count(self, severity):
+        return self.by_severity[severity]
+
+    def has_type(self, finding_type):
+        return finding_type in self._positions_by_type
+
+    def of_severity(self, severity):
+        return [self._findings[i] for i in self._positions_by_severity.get(severity, [])]
+
+    def of_type(self, finding_type):
+        return [self._findings[i] for i in self._positions_by_type.get(finding_type, [])]
+
+    def to_dicts(self):
+        return [finding.to_dict() for finding in self._findings]
@@ -0,0 +1,229 @@
+"""
+Análisis masivo de material de claves simétricas
+
+Carga un volcado de claves en una matriz (n_claves, longitud) uint8 y
+calcula con NumPy, para todas a la vez, lo mismo que
+VulnerabilityDetector.analyze_key_strength para una: entropía, bytes
+únicos y patrones (constante, secuencial, periódica). Además detecta claves
+duplicadas en el conjunto y sesgos en la distribución de bytes, tanto
+global como por posición.
+"""
+
+import base64
+import binascii
+
+import numpy as np
+
+from modules.byte_stats import block_matrix, duplicate_groups
+from modules.randomness import ALPHA, igamc
+
+
+# Claves por bloque para la matriz de recuentos (claves x 256 enteros)
+COUNT_CHUNK_KEYS = 16384
+
+# Periodos que se buscan además de la clave constante (periodo 1)
+PATTERN_PERIODS = (2, 4, 8)
+
+# Claves señaladas y grupos de duplicados incluidos en el informe
+MAX_REPORTED = 100
+
+SEVERITY_NAMES = {0: 'SEGURO', 1: 'MEDIO', 2: 'CRÍTICO'}
+
+
+def _decode(line, encoding):
+    if encoding == 'hex':
+        return bytes.fromhex(line)
+    if encoding == 'base64':
+        return base64.b64decode(line, validate=True)
+    # auto: hex si solo tiene dígitos hexadecimales, base64 si no
+    try:
+        return bytes.fromhex(line)
+    except ValueError:
+        return base64.b64decode(line, validate=True)
+
+
+def load_keys(path, encoding='auto', key_length=None):
+    """
+    Claves de un fichero agrupadas por longitud
+
+    Args:
+        encoding: 'auto', 'hex' o 'base64' (una clave por línea) o 'raw'
+            (volcado binario de claves de key_length bytes seguidas)
+
+    Returns:
+        ({longitud: (números de línea, matriz uint8)}, líneas inválidas)
+    """
+    if encoding == 'raw':
+        if not key_length:
+            raise ValueError('Se requiere key_length para volcados binarios')
+        data = np.fromfile(path, dtype=np.uint8)
+        rows = data.size // key_length
+        return {key_length: (np.arange(1, rows + 1), data[:rows * key_length].reshape(rows, key_length))}, []
+
+    by_length = {}
+    invalid = []
+    with open(path, encoding='ascii', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                key = _decode(line, encoding)
+            except (ValueError, binascii.Error):
+                invalid.append(number)
+                continue
+            if key and (key_length is None or len(key) == key_length):
+                numbers, keys = by_length.setdefault(len(key), ([], []))
+                numbers.append(number)
+                keys.append(key)
+            else:
+                invalid.append(number)
+
+    return {
+        length: (np.array(numbers), np.frombuffer(b''.join(keys), dtype=np.uint8).reshape(-1, length))
+        for length, (numbers, keys) in by_length.items()
+    }, invalid
+
+
+def byte_counts(keys):
+    """Recuentos (n, 256) de cada valor de byte en cada clave, por bloques"""
+    rows = keys.shape[0]
+    for start in range(0, rows, COUNT_CHUNK_KEYS):
+        chunk = keys[start:start + COUNT_CHUNK_KEYS]
+        offsets = np.arange(chunk.shape[0], dtype=np.int64)[:, None] * 256
+        yield start, np.bincount((chunk + offsets).ravel(), minlength=chunk.shape[0] * 256).reshape(-1, 256)
+
+
+def key_metrics(keys):
+    """Entropía, bytes únicos y patrones de todas las claves de una matriz"""
+    rows, length = keys.shape
+    entropy = np.empty(rows)
+    unique = np.empty(rows, dtype=np.int64)
+
+    for start, counts in byte_counts(keys):
+        p = counts / length
+        with np.errstate(divide='ignore', invalid='ignore'):
+            terms = np.where(counts > 0, p * np.log2(p), 0.0)
+        entropy[start:start + counts.shape[0]] = 0.0 - terms.sum(axis=1)
+        unique[start:start + counts.shape[0]] = (counts > 0).sum(axis=1)
+
+    steps = np.diff(keys.astype(np.int16), axis=1)
+    constant = unique == 1
+    incremental = (steps == 1).all(axis=1) if length > 1 else np.zeros(rows, dtype=bool)
+    decremental = (steps == -1).all(axis=1) if length > 1 else np.zeros(rows, dtype=bool)
+    periodic = np.zeros(rows, dtype=bool)
+    for period in PATTERN_PERIODS:
+        if length > period:
+            periodic |= (keys[:, period:] == keys[:, :-period]).all(axis=1)
+    periodic &= ~constant
+
+    return {
+        'entropy': entropy,
+        'unique_bytes': unique,
+        'constant': constant,
+        'incremental': incremental,
+        'decremental': decremental,
+        'periodic': periodic
+    }
+
+
+def _chi_squared(counts, expected):
+    chi2 = float(((counts - expected) ** 2 / expected).sum())
+    return chi2, igamc((counts.size - 1) / 2, chi2 / 2)
+
+
+def byte_distribution(keys):
+    """Chi-cuadrado global y por posición de los bytes de todas las claves"""
+    rows, length = keys.shape
+    overall = np.bincount(keys.ravel(), minlength=256)
+    chi2, p_value = _chi_squared(overall, keys.size / 256)
+
+    positional = np.bincount(
+        (keys.astype(np.int64) + np.arange(length) * 256).ravel(), minlength=length * 256
+    ).reshape(length, 256)
+    biased = []
+    for position in range(length):
+        position_chi2, position_p = _chi_squared(positional[position], rows / 256)
+        if position_p < ALPHA:
+            biased.append({
+                'position': position,
+                'chi_squared': position_chi2,
+                'p_value': position_p,
+                'most_common_byte': int(positional[position].argmax())
+            })
+
+    return {
+        'chi_squared': chi2,
+        'p_value': p_value,
+        'uniform': p_value >= ALPHA,
+        # Con menos de ~5 claves por valor de byte el chi-cuadrado no es fiable
+        'reliable': rows >= 5 * 256,
+        'unique_bytes': int((overall > 0).sum()),
+        'biased_positions': biased
+    }
+
+
+def analyze_key_matrix(keys, numbers=None):
+    """
+    Análisis de una matriz (n_claves, longitud) uint8
+
+    La severidad de cada clave sigue el criterio de analyze_key_strength:
+    patrón -> CRÍTICO, entropía < 90% de 8 bits -> MEDIO, si no SEGURO.
+    """
+    rows, length = keys.shape
+    numbers = np.arange(1, rows + 1) if numbers is None else numbers
+    metrics = key_metrics(keys)
+
+    pattern = metrics['constant'] | metrics['incremental'] | metrics['decremental'] | metrics['periodic']
+    severity = np.where(pattern, 2, np.where(metrics['entropy'] < 8.0 * 0.9, 1, 0))
+
+    keys = np.ascontiguousarray(keys)
+    unique_keys, groups = duplicate_groups(block_matrix(keys.reshape(-1), length))
+    groups.sort(key=lambda group: -group[0])
+
+    flagged = np.flatnonzero(pattern)
+    return {
+        'key_length': length,
+        'keys': rows,
+        'unique_keys': unique_keys,
+        'duplicate_groups': len(groups),
+        'duplicated_keys': int(sum(count for count, _ in groups)),
+        'duplicates': [
+            {'count': count, 'lines': numbers[indices][:MAX_REPORTED].tolist()}
+            for count, indices in groups[:MAX_REPORTED]
+        ],
+        'entropy': {
+            'mean': float(metrics['entropy'].mean()),
+            'min': float(metrics['entropy'].min()),
+            'max_possible': float(np.log2(min(length, 256)))
+        },
+        'mean_unique_bytes': float(metrics['unique_bytes'].mean()),
+        'patterns': {
+            name: int(metrics[name].sum()) for name in ('constant', 'incremental', 'decremental', 'periodic')
+        },
+        'severities': {
+            SEVERITY_NAMES[level]: int(count) for level, count in zip(*np.unique(severity, return_counts=True))
+        },
+        'flagged': [
+            {
+                'line': int(numbers[i]),
+                'entropy': float(metrics['entropy'][i]),
+                'unique_bytes': int(metrics['unique_bytes'][i]),
+                'patterns': [name for name in ('constant', 'incremental', 'decremental', 'periodic') if metrics[name][i]]
+            }
+            for i in flagged[:MAX_REPORTED]
+        ],
+        'byte_distribution': byte_distribution(keys)
+    }
+
+
+def audit_key_file(path, encoding='auto', key_length=None):
+    """Análisis de todas las claves de un fichero, separado por longitud de clave"""
+    groups, invalid = load_keys(path, encoding, key_length)
+    return {
+        'path': path,
+        'keys': int(sum(keys.shape[0] for _, keys in groups.values())),
+        'invalid_lines': len(invalid),
+        'invalid_sample': invalid[:MAX_REPORTED],
+        'by_length': [analyze_key_matrix(keys, numbers) for _, (numbers, keys) in sorted(groups.items())]
+    }
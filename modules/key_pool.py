@@ -0,0 +1,243 @@
+"""
+Pool de pares de claves RSA pre-generados en procesos de fondo
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+import atexit
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def _generate_keypair(key_size):
+    """Genera un par de claves en un proceso trabajador"""
+    from modules.modern_crypto import RSACrypto
+
+    start = time.perf_counter()
+    keypair = RSACrypto.generate_keypair(key_size)
+    return keypair, time.perf_counter() - start
+
+
+class RSAKeyPool:
+    """
+    Mantiene un número configurable de pares de claves RSA listos para cada
+    tamaño. Las claves se entregan una sola vez y el pool se rellena de forma
+    asíncrona en un ProcessPoolExecutor.
+    """
+
+    # Número de muestras que se conservan para métricas de espera/generación
+    METRICS_WINDOW = 100
+
+    # Fallos seguidos tras los que un tamaño deja de rellenarse en segundo plano
+    MAX_CONSECUTIVE_ERRORS = 3
+
+    def __init__(self, key_sizes=(1024, 2048, 4096), depth=3, workers=None, max_wait=30.0):
+        self.key_sizes = tuple(int(size) for size in key_sizes)
+        self.depth = max(1, int(depth))
+        self.workers = workers or max(1, min(len(self.key_sizes) * self.depth, os.cpu_count() or 1))
+        self.max_wait = max_wait
+
+        self._executor = None
+        self._lock = threading.RLock()
+        self._available = threading.Condition(self._lock)
+        self._ready = {size: deque() for size in self.key_sizes}
+        self._pending = {size: 0 for size in self.key_sizes}
+        self._consecutive_errors = {size: 0 for size in self.key_sizes}
+        self._stats = {
+            size: {
+                'served': 0,
+                'pool_hits': 0,
+                'pool_misses': 0,
+                'generated': 0,
+                'errors': 0,
+                'wait_times': deque(maxlen=self.METRICS_WINDOW),
+                'generation_times': deque(maxlen=self.METRICS_WINDOW),
+                'completed_at': deque(maxlen=self.METRICS_WINDOW)
+            }
+            for size in self.key_sizes
+        }
+        self._started_at = None
+        self._closed = False
+
+    @classmethod
+    def from_env(cls):
+        """Crea el pool a partir de variables de entorno"""
+        sizes = os.environ.get('RSA_POOL_SIZES', '1024,2048,4096')
+        key_sizes = [int(size) for size in sizes.split(',') if size.strip()]
+        depth = int(os.environ.get('RSA_POOL_DEPTH', 3))
+        workers = int(os.environ.get('RSA_POOL_WORKERS', 0)) or None
+        max_wait = float(os.environ.get('RSA_POOL_MAX_WAIT', 30))
+        return cls(key_sizes=key_sizes, depth=depth, workers=workers, max_wait=max_wait)
+
+    def start(self):
+        """Arranca los procesos trabajadores y llena el pool"""
+        with self._lock:
+            if self._executor is not None or self._closed:
+                return self
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._started_at = time.time()
+            for size in self.key_sizes:
+                self._refill_locked(size)
+        return self
+
+    def shutdown(self):
+        """Detiene los procesos trabajadores sin esperar claves pendientes"""
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+            self._available.notify_all()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def acquire(self, key_size, timeout=None):
+        """
+        Entrega un par de claves nuevo del tamaño pedido.
+
+        Cada par se retira del pool al entregarse, por lo que nunca se
+        reutiliza. Si el tamaño no está en el pool, o la espera supera el
+        tiempo máximo, se genera de forma síncrona.
+        """
+        key_size = int(key_size)
+        if key_size not in self._ready or self._executor is None or self._failing(key_size):
+            return self._generate_sync(key_size)
+
+        timeout = self.max_wait if timeout is None else timeout
+        start = time.perf_counter()
+
+        with self._lock:
+            stats = self._stats[key_size]
+            hit = bool(self._ready[key_size])
+            deadline = start + timeout if timeout is not None else None
+            errors = stats['errors']
+
+            while not self._ready[key_size] and not self._closed:
+                # Si falla una generación mientras se espera, se genera en síncrono
+                if stats['errors'] != errors:
+                    break
+                self._refill_locked(key_size)
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self._available.wait(remaining)
+
+            if self._ready[key_size]:
+                keypair = self._ready[key_size].popleft()
+                waited = time.perf_counter() - start
+                stats['served'] += 1
+                stats['pool_hits' if hit else 'pool_misses'] += 1
+                stats['wait_times'].append(waited)
+                self._refill_locked(key_size)
+                return dict(keypair, source='pool', wait_ms=waited * 1000)
+
+            stats['pool_misses'] += 1
+
+        return self._generate_sync(key_size)
+
+    def metrics(self):
+        """Profundidad del pool, ritmo de relleno y tiempos de espera"""
+        with self._lock:
+            sizes = {}
+            for size in self.key_sizes:
+                stats = self._stats[size]
+                wait_times = sorted(stats['wait_times'])
+                generation_times = list(stats['generation_times'])
+                completed = list(stats['completed_at'])
+
+                refill_rate = 0
+                if len(completed) > 1 and completed[-1] > completed[0]:
+                    refill_rate = (len(completed) - 1) / (completed[-1] - completed[0])
+
+                sizes[str(size)] = {
+                    'depth': len(self._ready[size]),
+                    'target_depth': self.depth,
+                    'pending': self._pending[size],
+                    'served': stats['served'],
+                    'pool_hits': stats['pool_hits'],
+                    'pool_misses': stats['pool_misses'],
+                    'generated': stats['generated'],
+                    'errors': stats['errors'],
+                    'refill_disabled': self._failing(size),
+                    'refill_rate_per_s': refill_rate,
+                    'avg_generation_ms': (sum(generation_times) / len(generation_times) * 1000) if generation_times else 0,
+                    'avg_wait_ms': (sum(wait_times) / len(wait_times) * 1000) if wait_times else 0,
+                    'p95_wait_ms': wait_times[int(0.95 * (len(wait_times) - 1))] * 1000 if wait_times else 0,
+                    'max_wait_ms': wait_times[-1] * 1000 if wait_times else 0
+                }
+
+            return {
+                'running': self._executor is not None,
+                'workers': self.workers,
+                'uptime_s': time.time() - self._started_at if self._started_at else 0,
+                'key_sizes': sizes
+            }
+
+    def _failing(self, key_size):
+        return self._consecutive_errors[key_size] >= self.MAX_CONSECUTIVE_ERRORS
+
+    def _refill_locked(self, key_size):
+        """Encola generaciones hasta alcanzar la profundidad objetivo"""
+        if self._executor is None or self._closed or self._failing(key_size):
+            return
+        missing = self.depth - len(self._ready[key_size]) - self._pending[key_size]
+        for _ in range(missing):
+            future = self._executor.submit(_generate_keypair, key_size)
+            self._pending[key_size] += 1
+            future.add_done_callback(lambda f, size=key_size: self._on_generated(size, f))
+
+    def _on_generated(self, key_size, future):
+        """Recibe un par generado en segundo plano"""
+        with self._lock:
+            self._pending[key_size] -= 1
+            stats = self._stats[key_size]
+            if future.cancelled():
+                return
+            error = future.exception()
+            if error is not None:
+                stats['errors'] += 1
+                self._consecutive_errors[key_size] += 1
+                logger.warning('Error generando clave RSA-%d en el pool: %r', key_size, error)
+                if self._failing(key_size):
+                    logger.error('RSA-%d: %d fallos seguidos, se deja de rellenar en segundo plano',
+                                 key_size, self._consecutive_errors[key_size])
+                if isinstance(error, BrokenProcessPool):
+                    # El executor ya no admite trabajos: se sirve en síncrono
+                    self._executor = None
+                else:
+                    self._refill_locked(key_size)
+                self._available.notify_all()
+                return
+            keypair, elapsed = future.result()
+            self._consecutive_errors[key_size] = 0
+            self._ready[key_size].append(keypair)
+            stats['generated'] += 1
+            stats['generation_times'].append(elapsed)
+            stats['completed_at'].append(time.perf_counter())
+            self._available.notify_all()
+
+    def _generate_sync(self, key_size):
+        """Generación directa cuando el pool no puede atender la petición"""
+        from modules.modern_crypto import RSACrypto
+
+        start = time.perf_counter()
+        keypair = RSACrypto.generate_keypair(key_size)
+        return dict(keypair, source='sync', wait_ms=(time.perf_counter() - start) * 1000)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """Devuelve el pool global, arrancándolo en el primer uso"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = RSAKeyPool.from_env().start()
+            atexit.register(_pool.shutdown)
+        return _pool
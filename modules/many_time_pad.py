@@ -0,0 +1,303 @@
+"""
+Recuperación de textos planos cifrados con el mismo flujo de clave
+
+Cuando se reutiliza clave+nonce en CTR u OFB (o se reutiliza un one-time
+pad), todos los mensajes son P_i XOR K. El motor recupera K columna a
+columna puntuando con un modelo de lenguaje todos los bytes de clave a la
+vez, y permite arrastrar cribs sobre los XOR de todos los pares de
+mensajes en todas las posiciones a la vez.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from modules.cryptanalysis import FrequencyAnalysis
+
+
+# Memoria aproximada de los arrays temporales por bloque de trabajo
+WORK_BYTES = 32 * 1024 * 1024
+
+# Límites de entrada: los pares crecen con el cuadrado del número de mensajes.
+# Con MAX_MESSAGE_BYTES una fila (un par en todas las posiciones, o un
+# candidato sobre todos los mensajes) cabe siempre en WORK_BYTES
+MAX_MESSAGES = 1000
+MAX_MESSAGE_BYTES = 4096
+MAX_TOTAL_BYTES = 1024 * 1024
+MAX_TOP = 100
+
+
+def check_input_size(lengths):
+    """Comprueba número, longitud y total de los mensajes (ValueError si se pasan)"""
+    lengths = list(lengths)
+    if len(lengths) > MAX_MESSAGES:
+        raise ValueError(f'Como máximo {MAX_MESSAGES} textos cifrados')
+    if lengths and max(lengths) > MAX_MESSAGE_BYTES:
+        raise ValueError(f'Cada texto cifrado admite como máximo {MAX_MESSAGE_BYTES} bytes')
+    if sum(lengths) > MAX_TOTAL_BYTES:
+        raise ValueError(f'Los textos cifrados suman más de {MAX_TOTAL_BYTES} bytes')
+
+
+def _language_model():
+    """Log-probabilidad de cada byte en texto español en UTF-8"""
+    weights = np.full(256, 1e-6)
+
+    letters = FrequencyAnalysis.SPANISH_FREQ
+    for letter, percent in letters.items():
+        if letter.isascii():
+            weights[ord(letter.lower())] = percent / 100 * 0.78 * 0.96
+            weights[ord(letter)] = percent / 100 * 0.78 * 0.04
+
+    weights[ord(' ')] = 0.16
+    punctuation = {'.': 0.008, ',': 0.01, ';': 0.0005, ':': 0.0005, '\n': 0.002,
+                   '-': 0.001, '"': 0.001, "'": 0.0005, '(': 0.0003, ')': 0.0003}
+    for char, weight in punctuation.items():
+        weights[ord(char)] = weight
+    for digit in '0123456789':
+        weights[ord(digit)] = 0.0005
+    for char in '!?%&/=+*#@_':
+        weights[ord(char)] = 0.0001
+
+    # Acentos, ñ y ¿¡ en UTF-8: prefijo 0xC3/0xC2 y segundo byte
+    weights[0xC3] = 0.01
+    weights[0xC2] = 0.0005
+    for char in 'áéíóúñüÁÉÍÓÚÑ¿¡':
+        weights[char.encode('utf-8')[1]] += 0.01 / 16
+
+    return np.log(weights / weights.sum()).astype(np.float32)
+
+
+LOG_PROBABILITY = _language_model()
+
+
+def _pair_blocks(messages, size):
+    """Pares (i < j) en bloques de unos `size` pares, sin crear todos a la vez"""
+    block = []
+    count = 0
+    for i in range(messages - 1):
+        for start in range(i + 1, messages, size):
+            others = np.arange(start, min(start + size, messages))
+            block.append(np.column_stack((np.full(others.size, i), others)))
+            count += others.size
+            if count >= size:
+                yield np.concatenate(block)
+                block = []
+                count = 0
+    if block:
+        yield np.concatenate(block)
+
+
+def score_bytes(values, axis=-1, mask=None):
+    """Suma de log-probabilidades de un array de bytes (con máscara opcional)"""
+    scores = LOG_PROBABILITY[values]
+    if mask is not None:
+        scores = scores * mask
+    return scores.sum(axis=axis)
+
+
+class ManyTimePad:
+    """
+    Motor de recuperación para mensajes cifrados con el mismo flujo de clave
+
+    Los mensajes se alinean desde el byte 0 en una matriz (m, L) con
+    máscara de validez. keystream guarda la mejor estimación de K y fixed
+    las posiciones confirmadas con cribs, que no se recalculan.
+    """
+
+    def __init__(self, ciphertexts):
+        if len(ciphertexts) < 2:
+            raise ValueError('Se necesitan al menos dos textos cifrados con el mismo flujo de clave')
+        check_input_size(len(c) for c in ciphertexts)
+
+        self.lengths = np.array([len(c) for c in ciphertexts])
+        self.width = int(self.lengths.max())
+        self.matrix = np.zeros((len(ciphertexts), self.width), dtype=np.uint8)
+        for i, ciphertext in enumerate(ciphertexts):
+            self.matrix[i, :len(ciphertext)] = np.frombuffer(bytes(ciphertext), dtype=np.uint8)
+        self.mask = np.arange(self.width)[None, :] < self.lengths[:, None]
+
+        self.keystream = np.zeros(self.width, dtype=np.uint8)
+        self.fixed = np.zeros(self.width, dtype=bool)
+        self.confidence = np.zeros(self.width, dtype=np.float32)
+
+    @property
+    def messages(self):
+        return self.matrix.shape[0]
+
+    def recover_keystream(self):
+        """
+        Estima todos los bytes de K no confirmados
+
+        Para cada columna prueba los 256 valores de clave sobre todos los
+        mensajes a la vez y se queda con el de mayor log-probabilidad. La
+        confianza es la diferencia con el segundo mejor, por mensaje.
+        """
+        candidates = np.arange(256, dtype=np.uint8)[:, None, None]
+        columns = max(1, WORK_BYTES // (256 * self.messages * 4))
+        rows_per_column = self.mask.sum(axis=0)
+
+        for start in range(0, self.width, columns):
+            end = min(start + columns, self.width)
+            block = self.matrix[None, :, start:end] ^ candidates
+            scores = score_bytes(block, axis=1, mask=self.mask[None, :, start:end])
+
+            best = np.argmax(scores, axis=0)
+            ordered = np.sort(scores, axis=0)
+            margin = (ordered[-1] - ordered[-2]) / np.maximum(rows_per_column[start:end], 1)
+
+            free = ~self.fixed[start:end]
+            self.keystream[start:end][free] = best[free]
+            self.confidence[start:end][free] = margin[free]
+
+        return self.keystream
+
+    def pair_xor(self, pairs=None):
+        """XOR de los pares de mensajes (i < j): P_i XOR P_j, con su máscara"""
+        if pairs is None:
+            pairs = np.array(np.triu_indices(self.messages, k=1)).T
+        first, second = pairs[:, 0], pairs[:, 1]
+        return self.matrix[first] ^ self.matrix[second], self.mask[first] & self.mask[second], pairs
+
+    def drag_crib(self, crib, top=20):
+        """
+        Desliza un crib por todas las posiciones de todos los pares a la vez
+
+        Si el crib está en el mensaje i en la posición p, (C_i XOR C_j)[p:p+n]
+        XOR crib es el texto de j en esa posición. Cada acierto se valida
+        descifrando todos los mensajes con el flujo de clave implicado.
+
+        Returns:
+            Lista de {'message', 'position', 'score', 'fragments'} ordenada
+        """
+        crib = np.frombuffer(crib.encode('utf-8') if isinstance(crib, str) else bytes(crib), dtype=np.uint8)
+        length = crib.size
+        if length == 0 or length > self.width:
+            return []
+
+        top = max(1, min(int(top), MAX_TOP))
+        positions = self.width - length + 1
+        # positions * length * 4 <= WORK_BYTES por MAX_MESSAGE_BYTES, así que el
+        # mínimo de un par por bloque no supera el presupuesto
+        pairs_per_block = max(1, WORK_BYTES // (positions * length * 4))
+
+        # 1. Puntuación por par y posición de lo que revela el crib en el otro mensaje;
+        # solo se conservan los mejores top * 8 candidatos entre bloques
+        hits = {}
+        for pairs in _pair_blocks(self.messages, pairs_per_block):
+            xored, valid, pairs = self.pair_xor(pairs)
+            windows = sliding_window_view(xored, length, axis=1) ^ crib
+            valid_windows = sliding_window_view(valid, length, axis=1).all(axis=2)
+            scores = np.where(valid_windows, score_bytes(windows) / length, -np.inf)
+
+            keep = min(top * 4, scores.size)
+            flat = np.argpartition(scores.ravel(), -keep)[-keep:]
+            for index in flat:
+                pair, position = divmod(int(index), positions)
+                score = float(scores[pair, position])
+                if not np.isfinite(score):
+                    continue
+                # El crib puede estar en cualquiera de los dos mensajes del par
+                for message in pairs[pair]:
+                    hit = (int(message), position)
+                    hits[hit] = max(hits.get(hit, score), score)
+            if len(hits) > top * 16:
+                hits = dict(sorted(hits.items(), key=lambda item: -item[1])[:top * 8])
+
+        if not hits:
+            return []
+
+        # 2. Validación por bloques de candidatos: descifrar todos los mensajes
+        # con el flujo implicado
+        candidates = np.array(list(hits))
+        messages, starts = candidates[:, 0], candidates[:, 1]
+        scores = np.empty(len(candidates))
+        hits_per_block = max(1, WORK_BYTES // (self.messages * length * 4))
+        for start in range(0, len(candidates), hits_per_block):
+            end = start + hits_per_block
+            decrypted, valid = self._crib_decrypt(crib, messages[start:end], starts[start:end])
+            covered = np.maximum(valid.sum(axis=(0, 2)), 1)
+            scores[start:end] = score_bytes(decrypted, mask=valid).sum(axis=0) / covered
+
+        order = np.argsort(scores)[::-1][:top]
+        decrypted, valid = self._crib_decrypt(crib, messages[order], starts[order])
+        return [
+            {
+                'message': int(messages[i]),
+                'position': int(starts[i]),
+                'score': float(scores[i]),
+                'fragments': [
+                    _printable(decrypted[row, k]) for row in range(self.messages) if valid[row, k].all()
+                ][:10]
+            }
+            for k, i in enumerate(order)
+        ]
+
+    def _crib_decrypt(self, crib, messages, starts):
+        """Todos los mensajes descifrados con el flujo que implica el crib en cada (mensaje, posición)"""
+        offsets = starts[:, None] + np.arange(crib.size)
+        keystreams = self.matrix[messages[:, None], offsets] ^ crib
+        return self.matrix[:, offsets] ^ keystreams[None], self.mask[:, offsets]
+
+    def apply_crib(self, message, position, crib):
+        """Fija K en las posiciones del crib suponiendo que está en `message`"""
+        crib = np.frombuffer(crib.encode('utf-8') if isinstance(crib, str) else bytes(crib), dtype=np.uint8)
+        end = position + crib.size
+        if end > self.lengths[message]:
+            raise ValueError('El crib sobrepasa el final del mensaje')
+        self.keystream[position:end] = self.matrix[message, position:end] ^ crib
+        self.fixed[position:end] = True
+        self.confidence[position:end] = np.inf
+        return self.keystream
+
+    def plaintexts(self):
+        """Textos planos con el flujo de clave actual"""
+        decrypted = self.matrix ^ self.keystream[None, :]
+        return [bytes(decrypted[i, :self.lengths[i]]) for i in range(self.messages)]
+
+    def score(self):
+        """Log-probabilidad media por byte de los textos planos actuales"""
+        decrypted = self.matrix ^ self.keystream[None, :]
+        return float(score_bytes(decrypted, axis=None, mask=self.mask) / self.mask.sum())
+
+
+def _printable(values):
+    return ''.join(chr(v) if 32 <= v < 127 else '·' for v in values.tolist())
+
+
+def recover_plaintexts(ciphertexts, cribs=(), auto_apply=True, top=10):
+    """
+    Recupera los textos planos de mensajes que comparten flujo de clave
+
+    Args:
+        ciphertexts: Lista de bytes cifrados con la misma clave y nonce
+        cribs: Fragmentos de texto plano supuestos (p. ej. cabeceras conocidas)
+        auto_apply: Fijar K con el mejor acierto de cada crib (el crib manda sobre
+            la estimación por columnas, que maximiza la puntuación por construcción)
+
+    Returns:
+        Textos planos, flujo de clave, confianza y aciertos de cada crib
+    """
+    engine = ManyTimePad(ciphertexts)
+    engine.recover_keystream()
+    baseline = engine.score()
+
+    crib_results = []
+    for crib in cribs:
+        hits = engine.drag_crib(crib, top=top)
+        applied = None
+        if auto_apply and hits:
+            best = hits[0]
+            engine.apply_crib(best['message'], best['position'], crib)
+            applied = {'message': best['message'], 'position': best['position']}
+        crib_results.append({'crib': crib, 'hits': hits, 'applied': applied})
+
+    return {
+        'messages': engine.messages,
+        'max_length': engine.width,
+        'plaintexts': [p.decode('utf-8', errors='replace') for p in engine.plaintexts()],
+        'keystream': bytes(engine.keystream).hex(),
+        'confidence': np.where(np.isinf(engine.confidence), -1, engine.confidence).round(3).tolist(),
+        'fixed_positions': int(engine.fixed.sum()),
+        'score_before_cribs': baseline,
+        'score': engine.score(),
+        'cribs': crib_results
+    }
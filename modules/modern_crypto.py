@@ -7,12 +7,21 @@ from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
 from Crypto.Random import get_random_bytes
 from Crypto.Util.Padding import pad, unpad
+from Crypto.Signature import pss
+from Crypto.Hash import SHA256
+from concurrent.futures import ProcessPoolExecutor
 import base64
 import time
 import hashlib
 import os
-from collections import Counter
+import struct
+import threading
+from collections import Counter, OrderedDict
 import math
+from modules.benchmark import BenchmarkHarness, data_path, histogram
+from modules.byte_stats import block_repetition_file, byte_statistics
+from modules.randomness import run_battery
+from modules.rsa_weakness import FERMAT_BUDGET_MS, check_modulus
 
 class AESCrypto:
     """Cifrado AES con diferentes modos de operación"""
@@ -22,6 +31,44 @@ class AESCrypto:
         """Genera una clave AES aleatoria (128, 192 o 256 bits)"""
         return get_random_bytes(key_size // 8)
     
+    @staticmethod
+    def encrypt_raw(plaintext, key, mode='CBC'):
+        """
+        Cifra texto usando AES y devuelve bytes sin codificar
+        
+        Returns:
+            {'ciphertext', 'mode'} más 'iv' o 'nonce' según el modo (bytes).
+            Lanza ValueError si el modo no está soportado.
+        """
+        # Convertir texto a bytes
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        
+        # Crear cipher según el modo
+        if mode == 'ECB':
+            cipher = AES.new(key, AES.MODE_ECB)
+            return {'ciphertext': cipher.encrypt(pad(plaintext, AES.block_size)), 'mode': mode}
+        
+        elif mode == 'CBC':
+            cipher = AES.new(key, AES.MODE_CBC)
+            ciphertext = cipher.encrypt(pad(plaintext, AES.block_size))
+            return {'ciphertext': ciphertext, 'iv': cipher.iv, 'mode': mode}
+        
+        elif mode == 'CFB':
+            cipher = AES.new(key, AES.MODE_CFB)
+            return {'ciphertext': cipher.encrypt(plaintext), 'iv': cipher.iv, 'mode': mode}
+        
+        elif mode == 'OFB':
+            cipher = AES.new(key, AES.MODE_OFB)
+            return {'ciphertext': cipher.encrypt(plaintext), 'iv': cipher.iv, 'mode': mode}
+        
+        elif mode == 'CTR':
+            cipher = AES.new(key, AES.MODE_CTR)
+            return {'ciphertext': cipher.encrypt(plaintext), 'nonce': cipher.nonce, 'mode': mode}
+        
+        else:
+            raise ValueError(f"Modo no soportado: {mode}")
+    
     @staticmethod
     def encrypt(plaintext, key, mode='CBC'):
         """
@@ -29,62 +76,14 @@ class AESCrypto:
         Modos soportados: ECB, CBC, CFB, OFB, CTR
         """
         try:
-            # Convertir texto a bytes
-            if isinstance(plaintext, str):
-                plaintext = plaintext.encode('utf-8')
-            
-            # Crear cipher según el modo
-            if mode == 'ECB':
-                cipher = AES.new(key, AES.MODE_ECB)
-                ciphertext = cipher.encrypt(pad(plaintext, AES.block_size))
-                return {
-                    'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-                    'mode': mode,
-                    'key': base64.b64encode(key).decode('utf-8')
-                }
-            
-            elif mode == 'CBC':
-                cipher = AES.new(key, AES.MODE_CBC)
-                ciphertext = cipher.encrypt(pad(plaintext, AES.block_size))
-                return {
-                    'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-                    'iv': base64.b64encode(cipher.iv).decode('utf-8'),
-                    'mode': mode,
-                    'key': base64.b64encode(key).decode('utf-8')
-                }
-            
-            elif mode == 'CFB':
-                cipher = AES.new(key, AES.MODE_CFB)
-                ciphertext = cipher.encrypt(plaintext)
-                return {
-                    'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-                    'iv': base64.b64encode(cipher.iv).decode('utf-8'),
-                    'mode': mode,
-                    'key': base64.b64encode(key).decode('utf-8')
-                }
-            
-            elif mode == 'OFB':
-                cipher = AES.new(key, AES.MODE_OFB)
-                ciphertext = cipher.encrypt(plaintext)
-                return {
-                    'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-                    'iv': base64.b64encode(cipher.iv).decode('utf-8'),
-                    'mode': mode,
-                    'key': base64.b64encode(key).decode('utf-8')
-                }
-            
-            elif mode == 'CTR':
-                cipher = AES.new(key, AES.MODE_CTR)
-                ciphertext = cipher.encrypt(plaintext)
-                return {
-                    'ciphertext': base64.b64encode(ciphertext).decode('utf-8'),
-                    'nonce': base64.b64encode(cipher.nonce).decode('utf-8'),
-                    'mode': mode,
-                    'key': base64.b64encode(key).decode('utf-8')
-                }
-            
-            else:
-                raise ValueError(f"Modo no soportado: {mode}")
+            raw = AESCrypto.encrypt_raw(plaintext, key, mode)
+            result = {'ciphertext': base64.b64encode(raw['ciphertext']).decode('utf-8')}
+            for field in ('iv', 'nonce'):
+                if field in raw:
+                    result[field] = base64.b64encode(raw[field]).decode('utf-8')
+            result['mode'] = mode
+            result['key'] = base64.b64encode(key).decode('utf-8')
+            return result
         
         except Exception as e:
             return {'error': str(e)}
@@ -141,39 +140,182 @@ class AESCrypto:
             return f"Error al descifrar: {str(e)}"
     
     @staticmethod
-    def benchmark(plaintext, key_sizes=[128, 192, 256], iterations=100):
-        """Compara el rendimiento de diferentes tamaños de clave AES"""
+    def benchmark(plaintext, key_sizes=[128, 192, 256], iterations=100, cpu=None):
+        """
+        Compara el rendimiento de diferentes tamaños de clave AES
+        
+        iterations es el número de muestras medidas; los tiempos reportados
+        son la mediana por operación y el detalle estadístico va en *_stats.
+        """
+        harness = BenchmarkHarness(samples=iterations, cpu=cpu)
+        payload_bytes = len(plaintext.encode('utf-8')) if isinstance(plaintext, str) else len(plaintext)
         results = []
         
         for key_size in key_sizes:
             key = AESCrypto.generate_key(key_size)
             
             # Medir tiempo de cifrado
-            start = time.time()
-            for _ in range(iterations):
-                AESCrypto.encrypt(plaintext, key, mode='CBC')
-            encrypt_time = (time.time() - start) / iterations
+            encrypt_stats = harness.measure(
+                lambda: AESCrypto.encrypt(plaintext, key, mode='CBC'),
+                payload_bytes
+            )
             
             # Medir tiempo de descifrado
             encrypted = AESCrypto.encrypt(plaintext, key, mode='CBC')
-            start = time.time()
-            for _ in range(iterations):
-                AESCrypto.decrypt(
+            decrypt_stats = harness.measure(
+                lambda: AESCrypto.decrypt(
                     encrypted['ciphertext'], 
                     key, 
                     mode='CBC', 
                     iv=encrypted['iv']
-                )
-            decrypt_time = (time.time() - start) / iterations
+                ),
+                payload_bytes
+            )
             
             results.append({
                 'key_size': key_size,
-                'encrypt_time_ms': encrypt_time * 1000,
-                'decrypt_time_ms': decrypt_time * 1000,
-                'total_time_ms': (encrypt_time + decrypt_time) * 1000
+                'encrypt_time_ms': encrypt_stats['median_ms'],
+                'decrypt_time_ms': decrypt_stats['median_ms'],
+                'total_time_ms': encrypt_stats['median_ms'] + decrypt_stats['median_ms'],
+                'encrypt_stats': encrypt_stats,
+                'decrypt_stats': decrypt_stats
             })
         
         return results
+    
+    MATRIX_MODES = ['ECB', 'CBC', 'CFB', 'OFB', 'CTR', 'GCM']
+    MATRIX_KEY_SIZES = [128, 192, 256]
+    MATRIX_PAYLOAD_SIZES = [16, 256, 4096, 65536, 1024 * 1024]
+    MATRIX_MAX_PAYLOAD = 64 * 1024 * 1024
+    
+    @staticmethod
+    def _new_cipher(key, mode):
+        """Crea el objeto de cifrado de pycryptodome para un modo"""
+        if mode == 'ECB':
+            return AES.new(key, AES.MODE_ECB)
+        elif mode == 'CBC':
+            return AES.new(key, AES.MODE_CBC, iv=bytes(16))
+        elif mode == 'CFB':
+            return AES.new(key, AES.MODE_CFB, iv=bytes(16))
+        elif mode == 'OFB':
+            return AES.new(key, AES.MODE_OFB, iv=bytes(16))
+        elif mode == 'CTR':
+            return AES.new(key, AES.MODE_CTR, nonce=bytes(8))
+        elif mode == 'GCM':
+            return AES.new(key, AES.MODE_GCM, nonce=bytes(12))
+        raise ValueError(f"Modo no soportado: {mode}")
+    
+    @staticmethod
+    def benchmark_matrix(modes=None, key_sizes=None, payload_sizes=None, samples=10, cpu=None):
+        """
+        Benchmark de cifrado AES en matriz: modo × tamaño de clave × tamaño de mensaje
+        
+        Mide el cifrador de pycryptodome directamente (sin base64 ni padding) sobre
+        buffers preasignados. Para cada modo y clave separa:
+          - key_setup_us: coste de crear el cifrador (expansión de clave)
+          - per_message_us: coste fijo por mensaje (ordenada de la recta tiempo/tamaño)
+          - steady_state_mb_s: rendimiento sostenido (inversa de la pendiente)
+        
+        Returns:
+            Diccionario con 'rows' (una fila por celda de la matriz) y 'summary'
+            (una fila por modo y tamaño de clave), listo para tabular o graficar
+        """
+        modes = modes or AESCrypto.MATRIX_MODES
+        key_sizes = [int(k) for k in (key_sizes or AESCrypto.MATRIX_KEY_SIZES)]
+        payload_sizes = [int(s) for s in (payload_sizes or AESCrypto.MATRIX_PAYLOAD_SIZES)]
+        
+        for mode in modes:
+            if mode not in AESCrypto.MATRIX_MODES:
+                raise ValueError(f"Modo no soportado: {mode}")
+        
+        # Tamaños múltiplos del bloque para que ECB/CBC no necesiten padding
+        # (sin repetidos tras redondear: el modelo de coste divide por su diferencia)
+        payload_sizes = sorted(set(max(16, -(-size // 16) * 16) for size in payload_sizes))
+        if payload_sizes[-1] > AESCrypto.MATRIX_MAX_PAYLOAD:
+            raise ValueError('El tamaño máximo de mensaje es 64 MB')
+        
+        # Un solo buffer de entrada y otro de salida reutilizados en todas las celdas
+        largest = payload_sizes[-1]
+        source = memoryview(get_random_bytes(largest))
+        output = memoryview(bytearray(largest))
+        
+        setup_harness = BenchmarkHarness(samples=samples, cpu=cpu)
+        rows = []
+        summary = []
+        
+        for mode in modes:
+            for key_size in key_sizes:
+                key = AESCrypto.generate_key(key_size)
+                setup_stats = setup_harness.measure(lambda: AESCrypto._new_cipher(key, mode))
+                
+                cell_rows = []
+                for size in payload_sizes:
+                    data = source[:size]
+                    out = output[:size]
+                    
+                    def encrypt_message():
+                        cipher = AESCrypto._new_cipher(key, mode)
+                        cipher.encrypt(data, output=out)
+                        if mode == 'GCM':
+                            cipher.digest()
+                    
+                    # Menos muestras para mensajes grandes: cada una ya dura mucho
+                    size_samples = samples if size <= 1024 * 1024 else max(3, samples // 4)
+                    harness = BenchmarkHarness(samples=size_samples, warmup_rounds=2 if size > 1024 * 1024 else 5, cpu=cpu)
+                    stats = harness.measure(encrypt_message, size)
+                    
+                    cell_rows.append({
+                        'mode': mode,
+                        'key_size': key_size,
+                        'payload_bytes': size,
+                        'median_ms': stats['median_ms'],
+                        'p95_ms': stats['p95_ms'],
+                        'stddev_ms': stats['stddev_ms'],
+                        'ci95_ms': stats['ci95_ms'],
+                        'mb_per_s': stats['mb_per_s'],
+                        'ops_per_s': stats['ops_per_s'],
+                        'memory': stats['memory']
+                    })
+                
+                rows.extend(cell_rows)
+                
+                # Modelo tiempo = fijo + tamaño / rendimiento: la pendiente sale de
+                # los dos mensajes más grandes y el coste fijo del más pequeño
+                per_message_s, slope = AESCrypto._cost_model(cell_rows)
+                
+                summary.append({
+                    'mode': mode,
+                    'key_size': key_size,
+                    'key_setup_us': setup_stats['median_ms'] * 1000,
+                    'per_message_us': per_message_s * 1e6,
+                    'steady_state_mb_s': (1 / slope) / 1e6 if slope > 0 else 0,
+                    'peak_mb_s': max(r['mb_per_s'] for r in cell_rows)
+                })
+        
+        return {
+            'modes': list(modes),
+            'key_sizes': key_sizes,
+            'payload_sizes': payload_sizes,
+            'rows': rows,
+            'summary': summary
+        }
+    
+    @staticmethod
+    def _cost_model(cell_rows):
+        """Devuelve (coste fijo por mensaje en s, segundos por byte)"""
+        smallest = cell_rows[0]
+        largest = cell_rows[-1]
+        
+        if len(cell_rows) > 1:
+            previous = cell_rows[-2]
+            slope = (largest['median_ms'] - previous['median_ms']) / 1000 / (largest['payload_bytes'] - previous['payload_bytes'])
+        else:
+            slope = 0
+        if slope <= 0:
+            slope = largest['median_ms'] / 1000 / largest['payload_bytes']
+        
+        per_message = smallest['median_ms'] / 1000 - smallest['payload_bytes'] * slope
+        return max(0, per_message), slope
 
 
 class RSACrypto:
@@ -235,42 +377,509 @@ class RSACrypto:
             return f"Error al descifrar: {str(e)}"
     
     @staticmethod
-    def benchmark(plaintext, key_sizes=[1024, 2048, 4096], iterations=10):
+    def benchmark(plaintext, key_sizes=[1024, 2048, 4096], iterations=10, cpu=None):
         """Compara el rendimiento de diferentes tamaños de clave RSA"""
+        harness = BenchmarkHarness(samples=iterations, warmup_rounds=2, cpu=cpu)
         results = []
         
         for key_size in key_sizes:
-            keypair = RSACrypto.generate_keypair(key_size)
+            keypair = RSACrypto.benchmark_keypair(key_size)
             
             # Limitar texto para RSA
             test_text = plaintext[:100]
+            payload_bytes = len(test_text.encode('utf-8'))
             
             # Medir tiempo de cifrado
-            start = time.time()
-            for _ in range(iterations):
-                RSACrypto.encrypt(test_text, keypair['public_key'])
-            encrypt_time = (time.time() - start) / iterations
+            encrypt_stats = harness.measure(
+                lambda: RSACrypto.encrypt(test_text, keypair['public_key']),
+                payload_bytes
+            )
             
             # Medir tiempo de descifrado
             encrypted = RSACrypto.encrypt(test_text, keypair['public_key'])
-            start = time.time()
-            for _ in range(iterations):
-                RSACrypto.decrypt(encrypted, keypair['private_key'])
-            decrypt_time = (time.time() - start) / iterations
+            decrypt_stats = harness.measure(
+                lambda: RSACrypto.decrypt(encrypted, keypair['private_key']),
+                payload_bytes
+            )
             
             results.append({
                 'key_size': key_size,
-                'encrypt_time_ms': encrypt_time * 1000,
-                'decrypt_time_ms': decrypt_time * 1000,
-                'total_time_ms': (encrypt_time + decrypt_time) * 1000
+                'encrypt_time_ms': encrypt_stats['median_ms'],
+                'decrypt_time_ms': decrypt_stats['median_ms'],
+                'total_time_ms': encrypt_stats['median_ms'] + decrypt_stats['median_ms'],
+                'encrypt_stats': encrypt_stats,
+                'decrypt_stats': decrypt_stats
             })
         
         return results
 
+    # Claves de prueba para benchmarks: se cargan de disco una vez por proceso
+    _benchmark_keys = {}
+    _benchmark_keys_lock = threading.Lock()
+    
+    @staticmethod
+    def benchmark_keypair(key_size):
+        """
+        Par de claves fijo para benchmarks
+        
+        Se guarda en DATA_DIR/benchmark_keys y se mantiene en memoria, así los
+        benchmarks de cifrado no pagan la generación de claves en cada llamada.
+        Solo debe usarse para medir rendimiento, nunca para proteger datos.
+        """
+        key_size = int(key_size)
+        with RSACrypto._benchmark_keys_lock:
+            keypair = RSACrypto._benchmark_keys.get(key_size)
+            if keypair is not None:
+                return keypair
+            
+            path = data_path('benchmark_keys', f'rsa_{key_size}.pem')
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    key = RSA.import_key(f.read())
+            else:
+                key = RSA.generate(key_size)
+                tmp_path = path + '.tmp'
+                with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+                    f.write(key.export_key())
+                os.replace(tmp_path, path)
+            
+            keypair = {
+                'private_key': key.export_key().decode('utf-8'),
+                'public_key': key.publickey().export_key().decode('utf-8'),
+                'key_size': key_size
+            }
+            RSACrypto._benchmark_keys[key_size] = keypair
+            return keypair
+    
+    @staticmethod
+    def benchmark_keygen(key_sizes=(1024, 2048), runs=20, workers=None):
+        """
+        Distribución del tiempo de generación de claves RSA
+        
+        La búsqueda de primos tiene una cola pesada, así que se ejecutan muchas
+        generaciones en un ProcessPoolExecutor y se reportan percentiles e histograma.
+        Solo se admiten los tamaños de KEYGEN_KEY_SIZES (sin repetir).
+        """
+        sizes = []
+        for key_size in key_sizes:
+            key_size = int(key_size)
+            if key_size not in RSACrypto.KEYGEN_KEY_SIZES:
+                raise ValueError(f"Tamaño de clave no soportado: {key_size} (use {', '.join(map(str, RSACrypto.KEYGEN_KEY_SIZES))})")
+            if key_size not in sizes:
+                sizes.append(key_size)
+        if not sizes:
+            raise ValueError('Se requiere al menos un tamaño de clave')
+        
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(int(workers or cpu_count), cpu_count))
+        results = []
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for key_size in sizes:
+                timings_ns = list(executor.map(_timed_keygen, [key_size] * runs))
+                stats = BenchmarkHarness.summarize(timings_ns)
+                # La media sin descartar atípicos es la que importa con cola pesada
+                stats['mean_all_ms'] = sum(timings_ns) / len(timings_ns) / 1e6
+                stats['histogram_ms'] = histogram([t / 1e6 for t in timings_ns])
+                results.append({
+                    'key_size': key_size,
+                    'runs': runs,
+                    'workers': workers,
+                    'stats': stats
+                })
+        
+        return results
+    
+    # Tamaños admitidos en el benchmark de generación de claves
+    KEYGEN_KEY_SIZES = (1024, 2048, 3072, 4096)
+    
+    # Operaciones con clave privada: se reparten entre procesos
+    PRIVATE_OPERATIONS = ('decrypt', 'sign')
+    BATCH_OPERATIONS = ('encrypt', 'decrypt', 'sign', 'verify')
+
+    # Por debajo de este tamaño no compensa arrancar procesos
+    BATCH_PARALLEL_THRESHOLD = 64
+
+    @staticmethod
+    def batch_encrypt(messages, public_key_pem):
+        """Cifra muchos mensajes con la misma clave pública"""
+        return RSACrypto.batch('encrypt', messages, public_key_pem)
+
+    @staticmethod
+    def batch_decrypt(ciphertexts_b64, private_key_pem, workers=None):
+        """Descifra muchos mensajes con la misma clave privada en paralelo"""
+        return RSACrypto.batch('decrypt', ciphertexts_b64, private_key_pem, workers)
+
+    @staticmethod
+    def batch_sign(messages, private_key_pem, workers=None):
+        """Firma muchos mensajes (RSA-PSS con SHA-256) en paralelo"""
+        return RSACrypto.batch('sign', messages, private_key_pem, workers)
+
+    @staticmethod
+    def batch_verify(items, public_key_pem):
+        """
+        Verifica muchas firmas con la misma clave pública
+        Cada elemento es un diccionario con 'message' y 'signature' (base64)
+        """
+        return RSACrypto.batch('verify', items, public_key_pem)
+
+    @staticmethod
+    def batch(operation, items, key_pem, workers=None):
+        """
+        Aplica una operación RSA a muchos elementos con una sola clave.
+
+        La clave se importa una vez (una vez por proceso en paralelo). Las
+        operaciones con clave privada se reparten en un ProcessPoolExecutor
+        porque son intensivas en CPU; las públicas se ejecutan en línea.
+
+        Returns:
+            Lista con un diccionario por elemento, en el mismo orden:
+            {'success': True, 'result': ...} o {'success': False, 'error': ...}
+        """
+        if operation not in RSACrypto.BATCH_OPERATIONS:
+            raise ValueError(f"Operación no soportada: {operation}")
+
+        items = list(items)
+        # Nunca más procesos que núcleos, aunque lo pida el cliente
+        cpu_count = os.cpu_count() or 1
+        workers = max(1, min(int(workers or cpu_count), cpu_count))
+
+        if (operation not in RSACrypto.PRIVATE_OPERATIONS
+                or workers == 1
+                or len(items) < RSACrypto.BATCH_PARALLEL_THRESHOLD):
+            state = _rsa_batch_state(key_pem)
+            return [_rsa_batch_apply(state, operation, item) for item in items]
+
+        # Varios trozos por proceso para equilibrar la carga
+        chunk_size = max(1, math.ceil(len(items) / (workers * 4)))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        results = []
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_rsa_batch_worker_init,
+                                 initargs=(key_pem,)) as executor:
+            for chunk_results in executor.map(_rsa_batch_worker_run, [operation] * len(chunks), chunks):
+                results.extend(chunk_results)
+
+        return results
+
+
+_rsa_worker_state = None
+
+
+def _timed_keygen(key_size):
+    """Tiempo en ns de generar un par de claves (ejecutado en un proceso trabajador)"""
+    start = time.perf_counter_ns()
+    RSA.generate(key_size)
+    return time.perf_counter_ns() - start
+
+
+def _rsa_batch_state(key_pem):
+    """Importa la clave y prepara los objetos de cifrado/firma"""
+    key = RSA.import_key(key_pem)
+    return {
+        'key': key,
+        'oaep': PKCS1_OAEP.new(key),
+        'pss': pss.new(key),
+        'max_length': key.size_in_bytes() - 42  # OAEP padding
+    }
+
+
+def _rsa_batch_apply(state, operation, item):
+    """Aplica una operación RSA a un solo elemento del lote"""
+    try:
+        if operation == 'encrypt':
+            plaintext = item.encode('utf-8') if isinstance(item, str) else item
+            if len(plaintext) > state['max_length']:
+                raise ValueError('Texto demasiado largo para RSA. Use AES para textos largos.')
+            result = base64.b64encode(state['oaep'].encrypt(plaintext)).decode('utf-8')
+
+        elif operation == 'decrypt':
+            result = state['oaep'].decrypt(base64.b64decode(item)).decode('utf-8')
+
+        elif operation == 'sign':
+            message = item.encode('utf-8') if isinstance(item, str) else item
+            signature = state['pss'].sign(SHA256.new(message))
+            result = base64.b64encode(signature).decode('utf-8')
+
+        else:  # verify
+            message = item['message']
+            message = message.encode('utf-8') if isinstance(message, str) else message
+            try:
+                state['pss'].verify(SHA256.new(message), base64.b64decode(item['signature']))
+                result = True
+            except ValueError:
+                result = False
+
+        return {'success': True, 'result': result}
+
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def _rsa_batch_worker_init(key_pem):
+    """Importa la clave una sola vez por proceso trabajador"""
+    global _rsa_worker_state
+    _rsa_worker_state = _rsa_batch_state(key_pem)
+
+
+def _rsa_batch_worker_run(operation, chunk):
+    """Procesa un trozo del lote dentro de un proceso trabajador"""
+    return [_rsa_batch_apply(_rsa_worker_state, operation, item) for item in chunk]
+
 
 class HybridCrypto:
     """Cifrado híbrido: RSA para clave + AES para datos"""
     
+    # Formato binario del sobre (todos los enteros en big-endian):
+    #   cabecera: magic | versión | flags | nº destinatarios
+    #             por destinatario: id de clave (8) | longitud | clave AES envuelta con RSA-OAEP
+    #             longitud del nonce | nonce
+    #   cuerpo:   AES-256-GCM del mensaje, autenticando la cabecera como AAD
+    #   trailer:  longitud del cuerpo (8) | tag GCM (16)
+    ENVELOPE_MAGIC = b'CAEV'
+    ENVELOPE_VERSION = 1
+    ENVELOPE_NONCE_SIZE = 12
+    _ENVELOPE_PREFIX = struct.Struct('>4sBBH')
+    _ENVELOPE_RECIPIENT = struct.Struct('>8sH')
+    _ENVELOPE_TRAILER = struct.Struct('>Q16s')
+    
+    @staticmethod
+    def key_id(key):
+        """Identificador corto de una clave RSA (SHA-256 de la clave pública)"""
+        if isinstance(key, (str, bytes)):
+            key = RSA.import_key(key)
+        return hashlib.sha256(key.publickey().export_key(format='DER')).digest()[:8]
+    
+    @staticmethod
+    def encrypt_envelope(plaintext, public_key_pems):
+        """
+        Cifra un mensaje para uno o varios destinatarios en un sobre binario
+        
+        El cuerpo se cifra una sola vez con AES-256-GCM sin importar el número
+        de destinatarios; solo la clave de datos se envuelve con RSA para cada uno.
+        
+        Returns:
+            bytearray con el sobre completo
+        """
+        if isinstance(plaintext, str):
+            plaintext = plaintext.encode('utf-8')
+        
+        data_key = AESCrypto.generate_key(256)
+        nonce = get_random_bytes(HybridCrypto.ENVELOPE_NONCE_SIZE)
+        header = HybridCrypto._build_envelope_header(public_key_pems, data_key, nonce)
+        
+        cipher = AES.new(data_key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(header)
+        
+        # Un solo buffer para todo el sobre; el cuerpo se cifra directamente en él
+        body_start = len(header)
+        body_end = body_start + len(plaintext)
+        envelope = bytearray(body_end + HybridCrypto._ENVELOPE_TRAILER.size)
+        view = memoryview(envelope)
+        view[:body_start] = header
+        if plaintext:
+            cipher.encrypt(plaintext, output=view[body_start:body_end])
+        HybridCrypto._ENVELOPE_TRAILER.pack_into(envelope, body_end, len(plaintext), cipher.digest())
+        
+        return envelope
+    
+    @staticmethod
+    def decrypt_envelope(envelope, private_key_pem):
+        """Descifra un sobre binario con la clave privada de uno de sus destinatarios"""
+        view = memoryview(envelope)
+        offset = 0
+        
+        def read(size):
+            nonlocal offset
+            if offset + size > len(view):
+                raise ValueError('Sobre truncado')
+            chunk = view[offset:offset + size]
+            offset += size
+            return chunk
+        
+        header = HybridCrypto._read_envelope_header(read)
+        header_size = offset
+        
+        trailer_size = HybridCrypto._ENVELOPE_TRAILER.size
+        if len(view) < header_size + trailer_size:
+            raise ValueError('Sobre truncado')
+        body_size, tag = HybridCrypto._ENVELOPE_TRAILER.unpack_from(view, len(view) - trailer_size)
+        if header_size + body_size + trailer_size != len(view):
+            raise ValueError('Longitud del cuerpo no coincide con el trailer')
+        
+        cipher = HybridCrypto._open_envelope_cipher(header, private_key_pem)
+        cipher.update(view[:header_size])
+        
+        plaintext = bytearray(body_size)
+        if body_size:
+            cipher.decrypt(view[header_size:header_size + body_size], output=plaintext)
+        cipher.verify(tag)
+        
+        return plaintext
+    
+    @staticmethod
+    def inspect_envelope(envelope):
+        """Devuelve la información de la cabecera sin descifrar el sobre"""
+        view = memoryview(envelope)
+        if len(view) < HybridCrypto._ENVELOPE_PREFIX.size + HybridCrypto._ENVELOPE_TRAILER.size:
+            raise ValueError('Sobre truncado')
+        offset = 0
+        
+        def read(size):
+            nonlocal offset
+            if offset + size > len(view):
+                raise ValueError('Sobre truncado')
+            chunk = view[offset:offset + size]
+            offset += size
+            return chunk
+        
+        header = HybridCrypto._read_envelope_header(read)
+        if len(view) - offset < HybridCrypto._ENVELOPE_TRAILER.size:
+            raise ValueError('Sobre truncado')
+        body_size, _ = HybridCrypto._ENVELOPE_TRAILER.unpack_from(view, len(view) - HybridCrypto._ENVELOPE_TRAILER.size)
+        
+        return {
+            'version': header['version'],
+            'recipients': [key_id.hex() for key_id in header['recipients']],
+            'header_size': offset,
+            'body_size': body_size,
+            'total_size': len(view),
+            'method': 'RSA-OAEP + AES-256-GCM'
+        }
+    
+    @staticmethod
+    def encrypt_envelope_stream(source, destination, public_key_pems, chunk_size=1024 * 1024):
+        """
+        Cifra un flujo (objeto con readinto) hacia otro (objeto con write)
+        
+        Como la longitud y el tag van en el trailer, no hace falta conocer
+        el tamaño del mensaje de antemano. Devuelve el número de bytes escritos.
+        """
+        data_key = AESCrypto.generate_key(256)
+        nonce = get_random_bytes(HybridCrypto.ENVELOPE_NONCE_SIZE)
+        header = HybridCrypto._build_envelope_header(public_key_pems, data_key, nonce)
+        
+        cipher = AES.new(data_key, AES.MODE_GCM, nonce=nonce)
+        cipher.update(header)
+        destination.write(header)
+        
+        in_buffer = bytearray(chunk_size)
+        out_buffer = bytearray(chunk_size)
+        in_view = memoryview(in_buffer)
+        out_view = memoryview(out_buffer)
+        body_size = 0
+        
+        while True:
+            read = source.readinto(in_buffer)
+            if not read:
+                break
+            cipher.encrypt(in_view[:read], output=out_view[:read])
+            destination.write(out_view[:read])
+            body_size += read
+        
+        destination.write(HybridCrypto._ENVELOPE_TRAILER.pack(body_size, cipher.digest()))
+        
+        return len(header) + body_size + HybridCrypto._ENVELOPE_TRAILER.size
+    
+    @staticmethod
+    def decrypt_envelope_stream(source, destination, private_key_pem, chunk_size=1024 * 1024):
+        """
+        Descifra un sobre desde un flujo hacia otro
+        
+        El texto plano se escribe a medida que se descifra; solo debe
+        considerarse válido si la función termina sin lanzar ValueError.
+        Devuelve el número de bytes de texto plano escritos.
+        """
+        header_parts = []
+        
+        def read(size):
+            chunk = source.read(size)
+            if len(chunk) != size:
+                raise ValueError('Sobre truncado')
+            header_parts.append(chunk)
+            return chunk
+        
+        header = HybridCrypto._read_envelope_header(read)
+        cipher = HybridCrypto._open_envelope_cipher(header, private_key_pem)
+        cipher.update(b''.join(header_parts))
+        
+        # Se retienen siempre los últimos bytes porque pueden ser el trailer
+        trailer_size = HybridCrypto._ENVELOPE_TRAILER.size
+        pending = bytearray()
+        body_size = 0
+        
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            pending += chunk
+            ready = len(pending) - trailer_size
+            if ready > 0:
+                destination.write(cipher.decrypt(memoryview(pending)[:ready]))
+                body_size += ready
+                del pending[:ready]
+        
+        if len(pending) != trailer_size:
+            raise ValueError('Sobre truncado')
+        expected_size, tag = HybridCrypto._ENVELOPE_TRAILER.unpack(pending)
+        if expected_size != body_size:
+            raise ValueError('Longitud del cuerpo no coincide con el trailer')
+        cipher.verify(tag)
+        
+        return body_size
+    
+    @staticmethod
+    def _build_envelope_header(public_key_pems, data_key, nonce):
+        """Construye la cabecera con la clave de datos envuelta para cada destinatario"""
+        if isinstance(public_key_pems, (str, bytes)):
+            public_key_pems = [public_key_pems]
+        if not public_key_pems:
+            raise ValueError('Se requiere al menos un destinatario')
+        
+        parts = [HybridCrypto._ENVELOPE_PREFIX.pack(
+            HybridCrypto.ENVELOPE_MAGIC, HybridCrypto.ENVELOPE_VERSION, 0, len(public_key_pems)
+        )]
+        for pem in public_key_pems:
+            public_key = RSA.import_key(pem)
+            wrapped_key = PKCS1_OAEP.new(public_key).encrypt(data_key)
+            parts.append(HybridCrypto._ENVELOPE_RECIPIENT.pack(HybridCrypto.key_id(public_key), len(wrapped_key)))
+            parts.append(wrapped_key)
+        parts.append(bytes([len(nonce)]))
+        parts.append(nonce)
+        
+        return b''.join(parts)
+    
+    @staticmethod
+    def _read_envelope_header(read):
+        """Interpreta la cabecera usando una función read(n)"""
+        magic, version, _, count = HybridCrypto._ENVELOPE_PREFIX.unpack(read(HybridCrypto._ENVELOPE_PREFIX.size))
+        if magic != HybridCrypto.ENVELOPE_MAGIC:
+            raise ValueError('No es un sobre de CryptoAnalyzer')
+        if version != HybridCrypto.ENVELOPE_VERSION:
+            raise ValueError(f'Versión de sobre no soportada: {version}')
+        
+        recipients = {}
+        for _ in range(count):
+            key_id, wrapped_size = HybridCrypto._ENVELOPE_RECIPIENT.unpack(read(HybridCrypto._ENVELOPE_RECIPIENT.size))
+            recipients[bytes(key_id)] = read(wrapped_size)
+        
+        nonce_size = read(1)[0]
+        nonce = bytes(read(nonce_size))
+        
+        return {'version': version, 'recipients': recipients, 'nonce': nonce}
+    
+    @staticmethod
+    def _open_envelope_cipher(header, private_key_pem):
+        """Recupera la clave de datos del destinatario y crea el cifrador GCM"""
+        private_key = RSA.import_key(private_key_pem)
+        wrapped_key = header['recipients'].get(HybridCrypto.key_id(private_key))
+        if wrapped_key is None:
+            raise ValueError('La clave no corresponde a ningún destinatario del sobre')
+        
+        data_key = PKCS1_OAEP.new(private_key).decrypt(bytes(wrapped_key))
+        return AES.new(data_key, AES.MODE_GCM, nonce=header['nonce'])
+    
     @staticmethod
     def encrypt(plaintext, public_key_pem):
         """Cifra usando esquema híbrido RSA-AES"""
@@ -644,97 +1253,91 @@ import math
 class CryptoAnalyzer:
     """Análisis de fortaleza criptográfica"""
     
+    @staticmethod
+    def analyze_ciphertext(ciphertext, block_size=16):
+        """
+        Entropía, distribución y repetición de bloques en una sola pasada
+        
+        Acepta bytes, memoryview o base64. Devuelve las claves de
+        analyze_distribution más 'entropy' y 'blocks' (como detect_patterns).
+        """
+        return byte_statistics(ciphertext, block_size)
+    
     @staticmethod
     def calculate_entropy(data):
         """Calcula la entropía de Shannon de los datos"""
         if not data:
             return 0
         
-        # Contar frecuencias
-        counter = Counter(data)
-        length = len(data)
-        
-        # Calcular entropía
-        entropy = 0
-        for count in counter.values():
-            probability = count / length
-            entropy -= probability * math.log2(probability)
+        if isinstance(data, str):
+            # Las cadenas se miden por carácter (no son base64 como en analyze_ciphertext)
+            if data.isascii():
+                data = data.encode('ascii')
+            else:
+                length = len(data)
+                return -sum(count / length * math.log2(count / length) for count in Counter(data).values())
         
-        return entropy
+        return byte_statistics(data, block_size=None)['entropy']
     
     @staticmethod
     def analyze_distribution(ciphertext):
         """Analiza la distribución de bytes en el texto cifrado"""
-        if isinstance(ciphertext, str):
-            import base64
-            data = base64.b64decode(ciphertext)
-        else:
-            data = ciphertext
-        
-        byte_counts = Counter(data)
-        total_bytes = len(data)
-        
-        # Calcular chi-cuadrado para uniformidad
-        expected = total_bytes / 256
-        chi_squared = sum((count - expected) ** 2 / expected for count in byte_counts.values())
-        
-        # Bytes únicos
-        unique_bytes = len(byte_counts)
+        stats = byte_statistics(ciphertext, block_size=None)
         
+        return CryptoAnalyzer._distribution(stats)
+    
+    @staticmethod
+    def _distribution(stats):
         return {
-            'unique_bytes': unique_bytes,
-            'total_bytes': total_bytes,
-            'chi_squared': chi_squared,
-            'uniformity': unique_bytes / 256 * 100  # Porcentaje de bytes únicos
+            'unique_bytes': stats['unique_bytes'],
+            'total_bytes': stats['total_bytes'],
+            'chi_squared': stats['chi_squared'],
+            'uniformity': stats['uniformity']  # Porcentaje de bytes únicos
         }
     
     @staticmethod
     def detect_patterns(ciphertext, block_size=16):
         """Detecta patrones repetidos (vulnerabilidad ECB)"""
-        if isinstance(ciphertext, str):
-            import base64
-            data = base64.b64decode(ciphertext)
-        else:
-            data = ciphertext
-        
-        # Dividir en bloques
-        blocks = [data[i:i+block_size] for i in range(0, len(data), block_size)]
-        
-        # Contar bloques únicos
-        unique_blocks = len(set(blocks))
-        total_blocks = len(blocks)
-        
-        # Detectar repeticiones
-        block_counts = Counter(blocks)
-        repeated_blocks = sum(1 for count in block_counts.values() if count > 1)
-        
-        return {
-            'total_blocks': total_blocks,
-            'unique_blocks': unique_blocks,
-            'repeated_blocks': repeated_blocks,
-            'repetition_rate': (total_blocks - unique_blocks) / total_blocks * 100 if total_blocks > 0 else 0
-        }
+        return byte_statistics(ciphertext, block_size)['blocks']
+    
+    @staticmethod
+    def detect_patterns_file(path, block_size=16, memory_limit=256 * 1024 * 1024):
+        """Detecta bloques repetidos en un fichero (imágenes de disco, volcados) por particiones"""
+        return block_repetition_file(path, block_size, memory_limit=memory_limit)
 
 
 class VulnerabilityDetector:
     """Detector de vulnerabilidades en implementaciones"""
     
     @staticmethod
-    def test_iv_reuse(plaintext, key, mode='CBC'):
-        """Detecta si el IV se reutiliza (genera mismo cifrado)"""
+    def test_iv_reuse(plaintext, key, mode='CBC', ciphertext=None):
+        """
+        Detecta si el IV se reutiliza (genera mismo cifrado)
+        
+        Si se pasa ciphertext (bytes de un cifrado previo del mismo texto con
+        la misma clave y modo) solo se vuelve a cifrar el primer bloque: con
+        el mismo IV/nonce el primer bloque cifrado coincide en todos los modos.
+        """
         try:
-            # Cifrar dos veces el mismo texto
-            result1 = AESCrypto.encrypt(plaintext, key, mode)
-            result2 = AESCrypto.encrypt(plaintext, key, mode)
-            
-            if 'error' in result1 or 'error' in result2:
-                return {
-                    'vulnerable': False,
-                    'message': 'No se pudo realizar la prueba'
-                }
+            if ciphertext is None:
+                # Cifrar dos veces el mismo texto
+                result1 = AESCrypto.encrypt(plaintext, key, mode)
+                result2 = AESCrypto.encrypt(plaintext, key, mode)
+                
+                if 'error' in result1 or 'error' in result2:
+                    return {
+                        'vulnerable': False,
+                        'message': 'No se pudo realizar la prueba'
+                    }
+                deterministic = result1['ciphertext'] == result2['ciphertext']
+            else:
+                if isinstance(plaintext, str):
+                    plaintext = plaintext.encode('utf-8')
+                first_block = AESCrypto.encrypt_raw(plaintext[:AES.block_size], key, mode)['ciphertext']
+                deterministic = first_block[:AES.block_size] == ciphertext[:AES.block_size]
             
             # Si el cifrado es idéntico, el IV se está reutilizando (MALO)
-            if result1['ciphertext'] == result2['ciphertext']:
+            if deterministic:
                 return {
                     'vulnerable': True,
                     'severity': 'CRÍTICO',
@@ -756,22 +1359,28 @@ class VulnerabilityDetector:
     
     @staticmethod
     def test_ecb_weakness(plaintext, key):
-        """Detecta vulnerabilidad ECB mediante patrones"""
+        """
+        Detecta vulnerabilidad ECB mediante patrones
+        
+        ECB cifra cada bloque por separado con una permutación fija, así que
+        los bloques cifrados se repiten exactamente donde se repiten los del
+        texto plano rellenado: se cuentan sobre este sin cifrar el texto
+        triplicado. La clave solo se valida.
+        """
         try:
-            # Crear texto con repeticiones
-            repeated_text = plaintext * 3
-            
-            # Cifrar en modo ECB
-            result = AESCrypto.encrypt(repeated_text, key, 'ECB')
-            
-            if 'error' in result:
+            if len(key) not in AES.key_size:
                 return {
                     'vulnerable': False,
                     'message': 'No se pudo realizar la prueba'
                 }
             
+            # Crear texto con repeticiones
+            if isinstance(plaintext, str):
+                plaintext = plaintext.encode('utf-8')
+            repeated_text = pad(plaintext * 3, AES.block_size)
+            
             # Analizar patrones
-            patterns = CryptoAnalyzer.detect_patterns(result['ciphertext'])
+            patterns = CryptoAnalyzer.detect_patterns(repeated_text)
             
             if patterns['repetition_rate'] > 10:
                 return {
@@ -798,9 +1407,18 @@ class VulnerabilityDetector:
     def analyze_key_strength(key_b64):
         """Analiza la fortaleza de la clave"""
         try:
-            import base64
             key = base64.b64decode(key_b64)
-            
+        except Exception as e:
+            return {
+                'strong': False,
+                'message': f'Error al analizar clave: {str(e)}'
+            }
+        
+        return VulnerabilityDetector._key_strength(key)
+    
+    @staticmethod
+    def _key_strength(key):
+        try:
             # Calcular entropía
             entropy = CryptoAnalyzer.calculate_entropy(key)
             max_entropy = 8.0  # Máxima entropía para bytes
@@ -863,8 +1481,14 @@ class VulnerabilityDetector:
             }
     
     @staticmethod
-    def test_rsa_key_properties(public_key_pem):
-        """Analiza propiedades de la clave RSA"""
+    def test_rsa_key_properties(public_key_pem, budget_ms=FERMAT_BUDGET_MS):
+        """
+        Analiza propiedades de la clave RSA
+        
+        Además del exponente, la paridad y el tamaño, busca factores primos
+        pequeños, módulos cuadrados perfectos y primos próximos (Fermat con
+        budget_ms de CPU como máximo).
+        """
         try:
             from Crypto.PublicKey import RSA
             
@@ -906,10 +1530,15 @@ class VulnerabilityDetector:
                     'recommendation': 'Usar mínimo 2048 bits'
                 })
             
+            # Factores pequeños, cuadrado perfecto y primos próximos
+            weakness = check_modulus(n, budget_ms)
+            issues.extend(weakness['issues'])
+            
             return {
                 'bit_length': bit_length,
                 'exponent': e,
                 'modulus_length': len(bin(n)) - 2,
+                'weakness_checks': weakness['checks'],
                 'issues': issues,
                 'secure': len([i for i in issues if i['severity'] == 'CRÍTICO']) == 0
             }
@@ -920,104 +1549,180 @@ class VulnerabilityDetector:
             }
 
 
+# Evaluaciones AES recientes por (huella de la clave, modo, hash del texto plano)
+AES_EVALUATION_CACHE_SIZE = 64
+_aes_evaluation_cache = OrderedDict()
+_aes_evaluation_lock = threading.Lock()
+
+
 class StrengthEvaluator:
     """Evaluador integral de fortaleza"""
     
     @staticmethod
-    def evaluate_aes_implementation(plaintext, key_b64, mode):
-        """Evaluación completa de implementación AES"""
+    def evaluate_aes_implementation(plaintext, key_b64, mode, use_cache=True):
+        """
+        Evaluación completa de implementación AES
+        
+        Se ejecuta como una secuencia de etapas que comparten un contexto con
+        los resultados intermedios (clave decodificada, texto cifrado en bytes,
+        estadísticas), de modo que nada se decodifica ni se cifra dos veces.
+        'timings' recoge la duración de cada etapa en ms. El resultado se
+        memoriza por (SHA-256 de la clave, modo, SHA-256 del texto plano).
+        """
         try:
-            import base64
+            started = time.perf_counter()
+            if isinstance(plaintext, str):
+                plaintext = plaintext.encode('utf-8')
             key = base64.b64decode(key_b64)
-            
-            # 1. Analizar clave
-            key_analysis = VulnerabilityDetector.analyze_key_strength(key_b64)
-            
-            # 2. Cifrar
-            result = AESCrypto.encrypt(plaintext, key, mode)
-            if 'error' in result:
-                return {'error': result['error']}
-            
-            # 3. Analizar texto cifrado
-            entropy = CryptoAnalyzer.calculate_entropy(base64.b64decode(result['ciphertext']))
-            distribution = CryptoAnalyzer.analyze_distribution(result['ciphertext'])
-            patterns = CryptoAnalyzer.detect_patterns(result['ciphertext'])
-            
-            # 4. Pruebas de vulnerabilidades
-            iv_test = VulnerabilityDetector.test_iv_reuse(plaintext, key, mode)
-            
-            # 5. Prueba ECB si aplica
-            ecb_test = None
-            if mode == 'ECB':
-                ecb_test = VulnerabilityDetector.test_ecb_weakness(plaintext, key)
-            
-            # Calcular puntuación
-            score = 0
-            issues = []
-            
-            # Puntuación por clave
-            if key_analysis['strong']:
-                score += 30
-            else:
-                issues.append(f"Clave: {key_analysis['message']}")
-                score += 10
-            
-            # Puntuación por modo
-            mode_scores = {'CBC': 25, 'CTR': 30, 'CFB': 20, 'OFB': 20, 'ECB': 0}
-            score += mode_scores.get(mode, 15)
-            
-            if mode == 'ECB':
-                issues.append('Modo ECB es inseguro')
-            
-            # Puntuación por entropía
-            if entropy > 7.5:
-                score += 25
-            elif entropy > 6.5:
-                score += 15
-            else:
-                score += 5
-                issues.append(f'Entropía baja: {entropy:.2f}/8.0')
-            
-            # Puntuación por uniformidad
-            if distribution['uniformity'] > 80:
-                score += 10
-            elif distribution['uniformity'] > 60:
-                score += 5
-            
-            # Penalización por patrones
-            if patterns['repetition_rate'] > 10:
-                score -= 20
-                issues.append(f'{patterns["repetition_rate"]:.1f}% de bloques repetidos')
-            
-            # Penalización por IV reutilizado
-            if iv_test.get('vulnerable'):
-                score -= 30
-                issues.append('IV reutilizado detectado')
-            
-            # Puntuación por tamaño de clave
-            key_size = len(key) * 8
-            if key_size >= 256:
-                score += 10
-            elif key_size >= 192:
-                score += 5
-            
-            score = max(0, min(100, score))
-            
-            return {
-                'score': score,
-                'key_analysis': key_analysis,
-                'entropy': entropy,
-                'distribution': distribution,
-                'patterns': patterns,
-                'iv_test': iv_test,
-                'ecb_test': ecb_test,
-                'issues': issues,
-                'ciphertext_sample': result['ciphertext'][:100]
-            }
+            cache_key = (hashlib.sha256(key).digest(), mode, hashlib.sha256(plaintext).digest())
+            
+            if use_cache:
+                with _aes_evaluation_lock:
+                    cached = _aes_evaluation_cache.get(cache_key)
+                    if cached is not None:
+                        _aes_evaluation_cache.move_to_end(cache_key)
+                        return dict(cached, cached=True)
+            
+            context = {'plaintext': plaintext, 'key': key, 'mode': mode}
+            timings = {'decode_ms': (time.perf_counter() - started) * 1000}
+            stages = (
+                ('key', StrengthEvaluator._aes_key_stage),
+                ('encrypt', StrengthEvaluator._aes_encrypt_stage),
+                ('statistics', StrengthEvaluator._aes_statistics_stage),
+                ('randomness', StrengthEvaluator._aes_randomness_stage),
+                ('vulnerabilities', StrengthEvaluator._aes_vulnerability_stage),
+                ('score', StrengthEvaluator._aes_score_stage)
+            )
+            for name, stage in stages:
+                stage_start = time.perf_counter()
+                stage(context)
+                timings[f'{name}_ms'] = (time.perf_counter() - stage_start) * 1000
+            timings['total_ms'] = (time.perf_counter() - started) * 1000
+            
+            result = dict(context['result'], timings=timings, cached=False)
+            if use_cache:
+                with _aes_evaluation_lock:
+                    _aes_evaluation_cache[cache_key] = result
+                    while len(_aes_evaluation_cache) > AES_EVALUATION_CACHE_SIZE:
+                        _aes_evaluation_cache.popitem(last=False)
+            return result
             
         except Exception as e:
             return {'error': str(e)}
     
+    @staticmethod
+    def _aes_key_stage(context):
+        """1. Analizar clave"""
+        context['key_analysis'] = VulnerabilityDetector._key_strength(context['key'])
+    
+    @staticmethod
+    def _aes_encrypt_stage(context):
+        """2. Cifrar (una sola vez, en bytes)"""
+        context['ciphertext'] = AESCrypto.encrypt_raw(context['plaintext'], context['key'], context['mode'])['ciphertext']
+    
+    @staticmethod
+    def _aes_statistics_stage(context):
+        """3. Analizar texto cifrado (una sola pasada sobre los bytes)"""
+        context['statistics'] = CryptoAnalyzer.analyze_ciphertext(context['ciphertext'])
+    
+    @staticmethod
+    def _aes_randomness_stage(context):
+        """4. Batería de aleatoriedad sobre el mismo texto cifrado"""
+        context['randomness'] = run_battery(context['ciphertext'])
+    
+    @staticmethod
+    def _aes_vulnerability_stage(context):
+        """5. Pruebas de vulnerabilidades (IV reutilizado y ECB si aplica)"""
+        context['iv_test'] = VulnerabilityDetector.test_iv_reuse(
+            context['plaintext'], context['key'], context['mode'], ciphertext=context['ciphertext']
+        )
+        context['ecb_test'] = None
+        if context['mode'] == 'ECB':
+            context['ecb_test'] = VulnerabilityDetector.test_ecb_weakness(context['plaintext'], context['key'])
+    
+    @staticmethod
+    def _aes_score_stage(context):
+        """6. Calcular puntuación"""
+        key = context['key']
+        mode = context['mode']
+        key_analysis = context['key_analysis']
+        entropy = context['statistics']['entropy']
+        distribution = CryptoAnalyzer._distribution(context['statistics'])
+        patterns = context['statistics']['blocks']
+        randomness = context['randomness']
+        iv_test = context['iv_test']
+        
+        score = 0
+        issues = []
+        
+        # Puntuación por clave
+        if key_analysis['strong']:
+            score += 30
+        else:
+            issues.append(f"Clave: {key_analysis['message']}")
+            score += 10
+        
+        # Puntuación por modo
+        mode_scores = {'CBC': 25, 'CTR': 30, 'CFB': 20, 'OFB': 20, 'ECB': 0}
+        score += mode_scores.get(mode, 15)
+        
+        if mode == 'ECB':
+            issues.append('Modo ECB es inseguro')
+        
+        # Puntuación por entropía
+        if entropy > 7.5:
+            score += 25
+        elif entropy > 6.5:
+            score += 15
+        else:
+            score += 5
+            issues.append(f'Entropía baja: {entropy:.2f}/8.0')
+        
+        # Puntuación por uniformidad
+        if distribution['uniformity'] > 80:
+            score += 10
+        elif distribution['uniformity'] > 60:
+            score += 5
+        
+        # Penalización por patrones
+        if patterns['repetition_rate'] > 10:
+            score -= 20
+            issues.append(f'{patterns["repetition_rate"]:.1f}% de bloques repetidos')
+        
+        # Penalización por pruebas de aleatoriedad (con alfa = 0.01 un fallo
+        # aislado es esperable en datos aleatorios; dos o más no)
+        if len(randomness['failed']) >= 2:
+            score -= 10
+            issues.append(f"Pruebas de aleatoriedad fallidas: {len(randomness['failed'])} de {randomness['applicable']}")
+        
+        # Penalización por IV reutilizado
+        if iv_test.get('vulnerable'):
+            score -= 30
+            issues.append('IV reutilizado detectado')
+        
+        # Puntuación por tamaño de clave
+        key_size = len(key) * 8
+        if key_size >= 256:
+            score += 10
+        elif key_size >= 192:
+            score += 5
+        
+        score = max(0, min(100, score))
+        
+        context['result'] = {
+            'score': score,
+            'key_analysis': key_analysis,
+            'entropy': entropy,
+            'distribution': distribution,
+            'patterns': patterns,
+            'randomness': randomness,
+            'iv_test': iv_test,
+            'ecb_test': context['ecb_test'],
+            'issues': issues,
+            # 75 bytes son exactamente 100 caracteres base64
+            'ciphertext_sample': base64.b64encode(context['ciphertext'][:75]).decode('utf-8')
+        }
+    
     @staticmethod
     def evaluate_rsa_implementation(public_key_pem, key_size):
         """Evaluación completa de implementación RSA"""
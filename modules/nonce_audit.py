@@ -0,0 +1,320 @@
+"""
+Detección de reutilización de IV/nonce en registros de mensajes cifrados
+
+Lee un log de registros (id de clave, IV/nonce, texto cifrado) en una sola
+pasada. Cada registro se reduce a una huella de 128 bits de (clave, nonce)
+más su número y su posición en el fichero; las huellas se guardan en arrays
+NumPy y, si superan el límite de memoria, se reparten por hash en
+particiones en disco. De cada huella solo se conservan el recuento y sus
+primeros registros, así que un nonce constante en millones de registros no
+ocupa más que uno repetido dos veces. Las huellas repetidas se comprueban
+después releyendo solo esos registros del log.
+"""
+
+from datetime import datetime
+import base64
+import csv
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from modules.benchmark import DATA_DIR
+
+
+# Registros que se acumulan en listas antes de pasarlos a NumPy
+BUFFER_RECORDS = 100_000
+
+# Particiones en disco (por el byte alto de la huella)
+PARTITIONS = 256
+
+# count: registros con la huella representados por la fila (0 en las filas
+# que solo aportan un registro más de una huella ya contada)
+RECORD_DTYPE = np.dtype([('hi', '<u8'), ('lo', '<u8'), ('record', '<u8'), ('offset', '<u8'), ('count', '<u8')])
+
+KEY_FIELDS = ('key_id', 'key')
+NONCE_FIELDS = ('nonce', 'iv')
+
+# Límite de max_pairs y max_groups (cada par se relee del log y va al informe)
+MAX_REPORTED = 1000
+
+
+def fingerprint(key_id, nonce):
+    """Huella de 128 bits de (clave, nonce) como dos enteros de 64 bits"""
+    digest = hashlib.blake2b(key_id.encode('utf-8') + b'\x00' + nonce, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+def decode_nonce(value, encoding):
+    """Bytes del nonce según la codificación del log ('text', 'hex' o 'base64')"""
+    if encoding == 'hex':
+        return bytes.fromhex(value)
+    if encoding == 'base64':
+        return base64.b64decode(value, validate=True)
+    return value.encode('utf-8')
+
+
+def _fingerprint_groups(records):
+    """Registros ordenados por (huella, número) e inicio de cada huella"""
+    records = records[np.lexsort((records['record'], records['lo'], records['hi']))]
+    changes = (records['hi'][1:] != records['hi'][:-1]) | (records['lo'][1:] != records['lo'][:-1])
+    return records, np.flatnonzero(np.concatenate([[True], changes]))
+
+
+def _collapse(records, keep):
+    """
+    Deja como mucho `keep` registros por huella (los de menor número); el
+    primero lleva el recuento total de la huella y el resto 0
+    """
+    if records.size == 0:
+        return records
+    records, starts = _fingerprint_groups(records)
+    totals = np.add.reduceat(records['count'], starts)
+    sizes = np.diff(np.append(starts, records.size))
+    rank = np.arange(records.size) - np.repeat(starts, sizes)
+    records['count'] = 0
+    records['count'][starts] = totals
+    return records[rank < keep]
+
+
+def _first(record, fields):
+    for field in fields:
+        if record.get(field) not in (None, ''):
+            return str(record[field])
+    return None
+
+
+class NonceReuseDetector:
+    """
+    Índice de huellas (clave, nonce) con memoria acotada
+
+    add() acepta registros de uno en uno; collisions() devuelve, para cada
+    huella repetida, el número de registros y los `keep` primeros.
+    """
+
+    def __init__(self, memory_limit=256 * 1024 * 1024, temp_dir=None, keep=101):
+        self.memory_limit = memory_limit
+        self.temp_dir = temp_dir or DATA_DIR
+        self.keep = max(2, int(keep))
+        self.records = 0
+        self._buffer = []
+        self._chunks = []
+        self._chunk_bytes = 0
+        self._workdir = None
+
+    def add(self, key_id, nonce, record, offset):
+        hi, lo = fingerprint(key_id, nonce)
+        self._buffer.append((hi, lo, record, offset, 1))
+        self.records += 1
+        if len(self._buffer) >= BUFFER_RECORDS:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        chunk = _collapse(np.array(self._buffer, dtype=RECORD_DTYPE), self.keep)
+        self._buffer = []
+
+        if self._workdir is not None:
+            self._spill(chunk)
+            return
+
+        self._chunks.append(chunk)
+        self._chunk_bytes += chunk.nbytes
+        # Ordenar necesita unas tres veces los datos: a partir de ahí, a disco
+        if self._chunk_bytes * 3 > self.memory_limit:
+            os.makedirs(self.temp_dir, exist_ok=True)
+            self._workdir = tempfile.TemporaryDirectory(prefix='nonces-', dir=self.temp_dir)
+            for pending in self._chunks:
+                self._spill(pending)
+            self._chunks = []
+            self._chunk_bytes = 0
+
+    def _partition_path(self, partition):
+        return os.path.join(self._workdir.name, f'{partition}.bin')
+
+    def _spill(self, chunk):
+        partitions = (chunk['hi'] >> np.uint64(56)).astype(np.int64) % PARTITIONS
+        order = np.argsort(partitions, kind='stable')
+        chunk = chunk[order]
+        bounds = np.searchsorted(partitions[order], np.arange(PARTITIONS + 1))
+        for p in range(PARTITIONS):
+            if bounds[p] < bounds[p + 1]:
+                with open(self._partition_path(p), 'ab') as f:
+                    chunk[bounds[p]:bounds[p + 1]].tofile(f)
+
+    @property
+    def spilled(self):
+        return self._workdir is not None
+
+    def collisions(self):
+        """
+        Genera (registros con la huella, array RECORD_DTYPE con los `keep`
+        primeros por número de registro) para cada huella repetida
+        """
+        self._flush()
+        try:
+            if self._workdir is None:
+                sources = [np.concatenate(self._chunks)] if self._chunks else []
+            else:
+                sources = (
+                    np.fromfile(self._partition_path(p), dtype=RECORD_DTYPE)
+                    for p in range(PARTITIONS) if os.path.exists(self._partition_path(p))
+                )
+            for records in sources:
+                records, starts = _fingerprint_groups(records)
+                totals = np.add.reduceat(records['count'], starts)
+                ends = np.append(starts[1:], records.size)
+                for g in np.flatnonzero(totals > 1):
+                    yield int(totals[g]), records[starts[g]:min(ends[g], starts[g] + self.keep)]
+        finally:
+            self.close()
+
+    def close(self):
+        self._chunks = []
+        if self._workdir is not None:
+            self._workdir.cleanup()
+            self._workdir = None
+
+
+class LogReader:
+    """Registros de un log NDJSON o CSV con cabecera, con su posición en bytes"""
+
+    def __init__(self, path, log_format='auto'):
+        self.path = path
+        self.log_format = log_format
+        if log_format == 'auto':
+            with open(path, 'rb') as f:
+                first = f.read(1024).lstrip()
+            self.log_format = 'ndjson' if first.startswith(b'{') else 'csv'
+        if self.log_format not in ('ndjson', 'csv'):
+            raise ValueError(f'Formato no soportado: {log_format}')
+        self._header = None
+
+    def __iter__(self):
+        """(número de registro, posición, registro o None si la línea no es válida)"""
+        with open(self.path, 'rb') as f:
+            offset = 0
+            number = 0
+            for line in f:
+                line_offset = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                if self.log_format == 'csv' and self._header is None:
+                    self._header = next(csv.reader([line.decode('utf-8')]))
+                    continue
+                number += 1
+                yield number, line_offset, self.parse(line)
+
+    def parse(self, line):
+        try:
+            if self.log_format == 'ndjson':
+                record = json.loads(line)
+                return record if isinstance(record, dict) else None
+            return dict(zip(self._header, next(csv.reader([line.decode('utf-8')]))))
+        except (ValueError, StopIteration):
+            return None
+
+    def read_at(self, f, offset):
+        """Relee del fichero abierto f el registro que empieza en una posición"""
+        f.seek(offset)
+        return self.parse(f.readline())
+
+
+def _reuse_report(key_id, nonce, count, members, max_pairs):
+    """Pares (primer registro, registro posterior) de un nonce reutilizado"""
+    first_number, first_record = members[0]
+    first_ciphertext = first_record.get('ciphertext')
+    pairs = [
+        {
+            'first': first_record.get('id', first_number),
+            'second': record.get('id', number),
+            # Mismo texto cifrado: probablemente un reenvío, no dos mensajes distintos
+            'identical_ciphertext': first_ciphertext is not None and record.get('ciphertext') == first_ciphertext
+        }
+        for number, record in members[1:max_pairs + 1]
+    ]
+    return {
+        'key_id': key_id,
+        'nonce': nonce.hex(),
+        'count': count,
+        'pairs': pairs,
+        'pairs_truncated': count - 1 > len(pairs)
+    }
+
+
+def audit_log(path, log_format='auto', nonce_encoding='text', memory_limit=256 * 1024 * 1024,
+              max_pairs=100, max_groups=1000, temp_dir=None):
+    """
+    Busca todos los IV/nonce reutilizados con la misma clave en un log
+
+    Args:
+        path: Log NDJSON ({"key_id", "nonce"|"iv", "ciphertext", "id"}) o CSV con cabecera
+        nonce_encoding: 'text' (compara la cadena), 'hex' o 'base64'
+        memory_limit: Memoria para el índice de huellas antes de usar disco
+        max_pairs: Pares comprobados y reportados por nonce repetido
+        max_groups: Nonces repetidos incluidos en el informe (los de más registros)
+        (ambos se ajustan a 1..MAX_REPORTED)
+
+    Returns:
+        Resumen y lista de reutilizaciones con sus pares de registros
+    """
+    max_pairs = min(max(int(max_pairs), 1), MAX_REPORTED)
+    max_groups = min(max(int(max_groups), 1), MAX_REPORTED)
+    reader = LogReader(path, log_format)
+    detector = NonceReuseDetector(memory_limit, temp_dir, keep=max_pairs + 1)
+    invalid = 0
+
+    for number, offset, record in reader:
+        key_id = _first(record, KEY_FIELDS) if record else None
+        nonce = _first(record, NONCE_FIELDS) if record else None
+        if key_id is None or nonce is None:
+            invalid += 1
+            continue
+        try:
+            detector.add(key_id, decode_nonce(nonce, nonce_encoding), number, offset)
+        except ValueError:
+            invalid += 1
+
+    spilled = detector.spilled
+    reuses = []
+    affected_records = 0
+    keys = {}
+
+    with open(path, 'rb') as log:
+        for total, group in detector.collisions():
+            # Comprobación exacta releyendo los registros del grupo (hasta max_pairs + 1)
+            verified = {}
+            for entry in group:
+                record = reader.read_at(log, int(entry['offset']))
+                nonce = decode_nonce(_first(record, NONCE_FIELDS), nonce_encoding)
+                exact_key = (_first(record, KEY_FIELDS), nonce)
+                verified.setdefault(exact_key, []).append((int(entry['record']), record))
+
+            for (key_id, nonce), members in verified.items():
+                if len(members) < 2:
+                    continue
+                # Si todos los comprobados coinciden, el resto del grupo también (huella de 128 bits)
+                count = total if len(verified) == 1 else len(members)
+                reuses.append(_reuse_report(key_id, nonce, count, members, max_pairs))
+                affected_records += count
+                keys[key_id] = keys.get(key_id, 0) + 1
+
+    reuses.sort(key=lambda reuse: (-reuse['count'], reuse['key_id']))
+
+    return {
+        'path': path,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'records': detector.records,
+        'invalid_records': invalid,
+        'reused_nonces': len(reuses),
+        'affected_records': affected_records,
+        'affected_keys': len(keys),
+        'reuses_per_key': dict(sorted(keys.items(), key=lambda item: -item[1])[:max_groups]),
+        'spilled_to_disk': spilled,
+        'reuses': reuses[:max_groups],
+        'reuses_truncated': len(reuses) > max_groups
+    }
@@ -0,0 +1,385 @@
+"""
+Batería de pruebas de aleatoriedad al estilo NIST SP 800-22 con NumPy
+
+Las pruebas trabajan sobre vistas np.unpackbits de los datos y acumulan
+estadísticos suficientes por fragmentos, así que se pueden aplicar a
+entradas de varios MB (o a un flujo) con memoria acotada.
+"""
+
+import math
+
+import numpy as np
+
+from modules.byte_stats import as_buffer
+
+
+# Nivel de significación de SP 800-22
+ALPHA = 0.01
+
+# Tamaño de los fragmentos procesados de una vez (bytes)
+CHUNK_SIZE = 1024 * 1024
+
+# Mínimo de bits para las pruebas básicas (SP 800-22 recomienda n >= 100)
+MIN_BITS = 100
+
+# Bloque de la prueba de frecuencia por bloques (bits)
+BLOCK_FREQUENCY_SIZE = 128
+
+# Racha más larga de unos: M -> (categoría mínima, categoría máxima, probabilidades)
+LONGEST_RUN_TABLES = {
+    8: (1, 4, [0.2148, 0.3672, 0.2305, 0.1875]),
+    128: (4, 9, [0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124]),
+    10000: (10, 16, [0.0882, 0.2092, 0.2483, 0.1933, 0.1208, 0.0675, 0.0727])
+}
+
+TEST_NAMES = {
+    'monobit': 'Frecuencia (monobit)',
+    'block_frequency': 'Frecuencia por bloques',
+    'runs': 'Rachas',
+    'longest_run': 'Racha más larga de unos',
+    'serial': 'Serial',
+    'approximate_entropy': 'Entropía aproximada',
+    'cumulative_sums': 'Sumas acumuladas'
+}
+
+
+def igamc(a, x):
+    """Función gamma incompleta superior regularizada Q(a, x)"""
+    if x <= 0:
+        return 1.0
+
+    log_prefactor = -x + a * math.log(x) - math.lgamma(a)
+
+    if x < a + 1:
+        # Serie de P(a, x); Q = 1 - P
+        term = 1.0 / a
+        total = term
+        denominator = a
+        for _ in range(100000):
+            denominator += 1
+            term *= x / denominator
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return min(1.0, max(0.0, 1.0 - total * math.exp(log_prefactor)))
+
+    # Fracción continua de Q(a, x) por el método de Lentz
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 100000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        if abs(d) < tiny:
+            d = tiny
+        c = b + an / c
+        if abs(c) < tiny:
+            c = tiny
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return min(1.0, max(0.0, math.exp(log_prefactor) * h))
+
+
+def _normal_cdf(x):
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+def _cusum_p_value(n, z):
+    """p-valor de la prueba de sumas acumuladas para la excursión máxima z"""
+    sqrt_n = math.sqrt(n)
+    # Fuera de ±10 desviaciones los términos son 0 o se cancelan
+    limit = 10 * sqrt_n / z
+
+    def k_range(low, high):
+        return range(max(math.ceil(low), math.floor(-limit / 4) - 1),
+                     min(math.floor(high), math.ceil(limit / 4) + 1) + 1)
+
+    total = 1.0
+    for k in k_range((-n / z + 1) / 4, (n / z - 1) / 4):
+        total -= _normal_cdf((4 * k + 1) * z / sqrt_n) - _normal_cdf((4 * k - 1) * z / sqrt_n)
+    for k in k_range((-n / z - 3) / 4, (n / z - 1) / 4):
+        total += _normal_cdf((4 * k + 3) * z / sqrt_n) - _normal_cdf((4 * k + 1) * z / sqrt_n)
+    return min(1.0, max(0.0, total))
+
+
+def _longest_runs(blocks):
+    """Racha más larga de unos en cada fila de una matriz (N, M) de bits"""
+    rows, width = blocks.shape
+    padded = np.zeros((rows, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = blocks
+    edges = np.diff(padded.ravel())
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    longest = np.zeros(rows, dtype=np.int64)
+    np.maximum.at(longest, starts // (width + 2), ends - starts)
+    return longest
+
+
+def _marginal_counts(counts, bits):
+    """Cuentas de patrones de `bits` bits a partir de las de patrones más largos (circulares)"""
+    if bits == 0:
+        return None
+    return counts.reshape(2 ** bits, -1).sum(axis=1)
+
+
+class RandomnessBattery:
+    """
+    Acumula los estadísticos de la batería sobre uno o varios fragmentos
+
+    Uso:
+        battery = RandomnessBattery()
+        for chunk in chunks:
+            battery.update(chunk)
+        report = battery.results()
+    """
+
+    def __init__(self, pattern_bits=16):
+        # Las pruebas serial y de entropía aproximada derivan sus órdenes
+        # de las cuentas circulares de patrones de pattern_bits bits
+        self.pattern_bits = pattern_bits
+        self.n = 0
+        self.ones = 0
+        self.transitions = 0
+        self.last_bit = None
+
+        self.pattern_counts = np.zeros(2 ** pattern_bits, dtype=np.int64)
+        self.head = np.zeros(0, dtype=np.uint8)
+        self.tail = np.zeros(0, dtype=np.uint8)
+
+        self.block_frequency_sum = 0.0
+        self.block_frequency_blocks = 0
+        self.block_frequency_pending = np.zeros(0, dtype=np.uint8)
+
+        self.longest_run_counts = {m: np.zeros(len(table[2]), dtype=np.int64) for m, table in LONGEST_RUN_TABLES.items()}
+        self.longest_run_pending = {m: np.zeros(0, dtype=np.uint8) for m in LONGEST_RUN_TABLES}
+
+        self.prefix_sum = 0
+        self.prefix_max = 0
+        self.prefix_min = 0
+
+    def update(self, data):
+        """Añade bytes (o base64) a la secuencia analizada"""
+        buffer = memoryview(as_buffer(data)).cast('B')
+        for start in range(0, len(buffer), CHUNK_SIZE):
+            self._update_bits(np.unpackbits(np.frombuffer(buffer[start:start + CHUNK_SIZE], dtype=np.uint8)))
+        return self
+
+    def _update_bits(self, bits):
+        if not bits.size:
+            return
+
+        # Frecuencia y rachas
+        self.ones += int(np.count_nonzero(bits))
+        self.transitions += int(np.count_nonzero(bits[1:] != bits[:-1]))
+        if self.last_bit is not None and self.last_bit != bits[0]:
+            self.transitions += 1
+        self.last_bit = int(bits[-1])
+
+        # Sumas acumuladas (+1 por cada uno, -1 por cada cero)
+        walk = np.cumsum(bits.astype(np.int32) * 2 - 1, dtype=np.int64) + self.prefix_sum
+        self.prefix_max = max(self.prefix_max, int(walk.max()))
+        self.prefix_min = min(self.prefix_min, int(walk.min()))
+        self.prefix_sum = int(walk[-1])
+        del walk
+
+        # Pruebas por bloques: se guarda el resto para el siguiente fragmento
+        blocks, self.block_frequency_pending = self._blocks(self.block_frequency_pending, bits, BLOCK_FREQUENCY_SIZE)
+        if blocks.size:
+            proportions = blocks.sum(axis=1) / BLOCK_FREQUENCY_SIZE
+            self.block_frequency_sum += float(((proportions - 0.5) ** 2).sum())
+            self.block_frequency_blocks += blocks.shape[0]
+
+        for m, (low, high, _) in LONGEST_RUN_TABLES.items():
+            blocks, self.longest_run_pending[m] = self._blocks(self.longest_run_pending[m], bits, m)
+            if blocks.size:
+                categories = np.clip(_longest_runs(blocks), low, high) - low
+                self.longest_run_counts[m] += np.bincount(categories, minlength=high - low + 1)
+
+        # Patrones solapados; el cierre circular se añade al calcular resultados
+        width = self.pattern_bits
+        if self.head.size < width - 1:
+            self.head = np.concatenate([self.head, bits[:width - 1 - self.head.size]])
+        window = np.concatenate([self.tail, bits])
+        self.pattern_counts += self._pattern_counts(window, width)
+        self.tail = window[-(width - 1):].copy() if width > 1 else np.zeros(0, dtype=np.uint8)
+
+        self.n += int(bits.size)
+
+    @staticmethod
+    def _blocks(pending, bits, size):
+        joined = np.concatenate([pending, bits]) if pending.size else bits
+        complete = joined.size // size
+        return joined[:complete * size].reshape(complete, size), joined[complete * size:].copy()
+
+    @staticmethod
+    def _pattern_counts(window, width):
+        windows = window.size - width + 1
+        if windows <= 0:
+            return 0
+        values = np.zeros(windows, dtype=np.uint32)
+        for offset in range(width):
+            values <<= 1
+            values |= window[offset:offset + windows]
+        return np.bincount(values, minlength=2 ** width)
+
+    def _circular_counts(self):
+        """Cuentas de patrones con la secuencia tratada como circular"""
+        wrap = np.concatenate([self.tail, self.head])
+        return self.pattern_counts + self._pattern_counts(wrap, self.pattern_bits)
+
+    @staticmethod
+    def _result(test, p_values, details=None):
+        if p_values is None:
+            return {
+                'test': test,
+                'name': TEST_NAMES[test],
+                'applicable': False,
+                'p_value': None,
+                'passed': None,
+                'details': details or {}
+            }
+        p_value = min(p_values.values())
+        return {
+            'test': test,
+            'name': TEST_NAMES[test],
+            'applicable': True,
+            'p_value': p_value,
+            'p_values': p_values,
+            'passed': p_value >= ALPHA,
+            'details': details or {}
+        }
+
+    def results(self):
+        """Resultados de las siete pruebas con los datos acumulados hasta ahora"""
+        n = self.n
+        tests = []
+
+        # Frecuencia (monobit)
+        if n >= MIN_BITS:
+            s_obs = abs(2 * self.ones - n) / math.sqrt(n)
+            tests.append(self._result('monobit', {'p_value': math.erfc(s_obs / math.sqrt(2))},
+                                      {'ones': self.ones, 'zeros': n - self.ones}))
+        else:
+            tests.append(self._result('monobit', None))
+
+        # Frecuencia por bloques
+        blocks = self.block_frequency_blocks
+        if n >= MIN_BITS and blocks:
+            chi_squared = 4 * BLOCK_FREQUENCY_SIZE * self.block_frequency_sum
+            tests.append(self._result('block_frequency', {'p_value': igamc(blocks / 2, chi_squared / 2)},
+                                      {'block_size': BLOCK_FREQUENCY_SIZE, 'blocks': blocks, 'chi_squared': chi_squared}))
+        else:
+            tests.append(self._result('block_frequency', None))
+
+        # Rachas (requiere que la proporción de unos pase la prueba previa)
+        if n >= MIN_BITS:
+            pi = self.ones / n
+            runs = self.transitions + 1
+            if abs(pi - 0.5) >= 2 / math.sqrt(n):
+                p_value = 0.0
+            else:
+                p_value = math.erfc(abs(runs - 2 * n * pi * (1 - pi)) / (2 * math.sqrt(2 * n) * pi * (1 - pi)))
+            tests.append(self._result('runs', {'p_value': p_value}, {'runs': runs, 'proportion_ones': pi}))
+        else:
+            tests.append(self._result('runs', None))
+
+        # Racha más larga de unos: el tamaño de bloque depende de n
+        if n >= 750000:
+            m = 10000
+        elif n >= 6272:
+            m = 128
+        elif n >= 128:
+            m = 8
+        else:
+            m = None
+        if m:
+            counts = self.longest_run_counts[m]
+            probabilities = np.array(LONGEST_RUN_TABLES[m][2])
+            total = int(counts.sum())
+            expected = total * probabilities
+            chi_squared = float(((counts - expected) ** 2 / expected).sum())
+            tests.append(self._result('longest_run', {'p_value': igamc((len(probabilities) - 1) / 2, chi_squared / 2)},
+                                      {'block_size': m, 'blocks': total, 'chi_squared': chi_squared,
+                                       'counts': counts.tolist()}))
+        else:
+            tests.append(self._result('longest_run', None))
+
+        # Serial y entropía aproximada sobre los patrones circulares
+        log_n = int(math.log2(n)) if n else 0
+        serial_m = min(self.pattern_bits, log_n - 3)
+        apen_m = min(self.pattern_bits - 1, log_n - 6)
+        counts = self._circular_counts() if n >= MIN_BITS and (serial_m >= 2 or apen_m >= 1) else None
+
+        if counts is not None and serial_m >= 2:
+            def psi(bits):
+                if bits == 0:
+                    return 0.0
+                marginal = _marginal_counts(counts, bits).astype(np.float64)
+                return float((marginal ** 2).sum()) * 2 ** bits / n - n
+
+            psi_m, psi_m1, psi_m2 = psi(serial_m), psi(serial_m - 1), psi(serial_m - 2)
+            delta1 = psi_m - psi_m1
+            delta2 = psi_m - 2 * psi_m1 + psi_m2
+            tests.append(self._result('serial', {
+                'p_value1': igamc(2 ** (serial_m - 2), delta1 / 2),
+                'p_value2': igamc(2 ** (serial_m - 3), delta2 / 2)
+            }, {'m': serial_m, 'delta1': delta1, 'delta2': delta2}))
+        else:
+            tests.append(self._result('serial', None))
+
+        if counts is not None and apen_m >= 1:
+            def phi(bits):
+                marginal = _marginal_counts(counts, bits)
+                frequencies = marginal[marginal > 0] / n
+                return float((frequencies * np.log(frequencies)).sum())
+
+            apen = phi(apen_m) - phi(apen_m + 1)
+            chi_squared = 2 * n * (math.log(2) - apen)
+            tests.append(self._result('approximate_entropy', {'p_value': igamc(2 ** (apen_m - 1), chi_squared / 2)},
+                                      {'m': apen_m, 'apen': apen, 'chi_squared': chi_squared}))
+        else:
+            tests.append(self._result('approximate_entropy', None))
+
+        # Sumas acumuladas hacia delante y hacia atrás
+        if n >= MIN_BITS:
+            forward = max(abs(self.prefix_max), abs(self.prefix_min))
+            backward = max(abs(self.prefix_sum - self.prefix_min), abs(self.prefix_sum - self.prefix_max))
+            tests.append(self._result('cumulative_sums', {
+                'forward': _cusum_p_value(n, forward),
+                'backward': _cusum_p_value(n, backward)
+            }, {'max_forward': forward, 'max_backward': backward}))
+        else:
+            tests.append(self._result('cumulative_sums', None))
+
+        applicable = [t for t in tests if t['applicable']]
+        return {
+            'bits': n,
+            'alpha': ALPHA,
+            'tests': tests,
+            'applicable': len(applicable),
+            'passed': sum(1 for t in applicable if t['passed']),
+            'failed': [t['test'] for t in applicable if not t['passed']]
+        }
+
+
+def run_battery(data):
+    """Batería completa sobre bytes, memoryview o base64"""
+    return RandomnessBattery().update(data).results()
+
+
+def run_battery_stream(stream, chunk_size=CHUNK_SIZE):
+    """Batería sobre un objeto con read() (fichero, subida), por fragmentos"""
+    battery = RandomnessBattery()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        battery.update(chunk)
+    return battery.results()
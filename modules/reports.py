@@ -4,45 +4,209 @@ Generación de reportes de auditoría criptográfica
 
 from datetime import datetime
 import json
+import os
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from modules.findings import FindingsCollection
+
+
+# Tamaño aproximado de cada fragmento de los reportes en streaming
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# Plantillas compiladas una sola vez, al importar el módulo
+_templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')),
+    autoescape=select_autoescape(['html'])
+)
+HTML_TEMPLATE = _templates.get_template('report_export.html')
+
+
+def _buffered(pieces, chunk_size=STREAM_CHUNK_SIZE):
+    """Agrupa piezas de texto pequeñas en fragmentos de unos chunk_size caracteres"""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def _json_pieces(report):
+    """JSON del reporte pieza a pieza: las listas de primer nivel, elemento a elemento"""
+    yield '{'
+    for i, (key, value) in enumerate(report.items()):
+        yield (',\n  ' if i else '\n  ') + json.dumps(key, ensure_ascii=False) + ': '
+        if isinstance(value, dict) or isinstance(value, str) or not hasattr(value, '__iter__'):
+            yield json.dumps(value, ensure_ascii=False)
+            continue
+        yield '['
+        empty = True
+        for item in value:
+            yield ('\n    ' if empty else ',\n    ') + json.dumps(item, ensure_ascii=False)
+            empty = False
+        yield ']' if empty else '\n  ]'
+    yield '\n}\n'
 
 
 class ReportGenerator:
     """Genera reportes detallados de auditoría criptográfica"""
     
+    # Hallazgos AES (texto de StrengthEvaluator) -> (tipo, severidad, recomendación)
+    AES_ISSUE_TYPES = (
+        ('Modo ECB', 'Modo ECB No Seguro', 'CRÍTICA', 'Cambiar a CBC, CTR o GCM'),
+        ('IV reutilizado', 'Reutilización de IV/Nonce', 'CRÍTICA', 'Generar un IV/nonce aleatorio por mensaje'),
+        ('bloques repetidos', 'Patrones Repetidos', 'ALTA', 'Usar un modo de cifrado con difusión entre bloques'),
+        ('Clave:', 'Clave Débil', 'ALTA', 'Generar la clave con un generador criptográficamente seguro'),
+        ('Entropía baja', 'Entropía Baja', 'MEDIA', 'Revisar el modo de cifrado y la fuente de aleatoriedad'),
+        ('aleatoriedad', 'Aleatoriedad Insuficiente', 'MEDIA', 'Revisar el modo de cifrado y la fuente de aleatoriedad'),
+    )
+    
+    # Tipos de VulnerabilityDetector con el nombre que usan las recomendaciones
+    RSA_ISSUE_TYPES = {'Clave demasiado corta': 'Clave Demasiado Corta'}
+    
+    SEVERITY_NAMES = {'CRÍTICO': 'CRÍTICA', 'ALTO': 'ALTA', 'MEDIO': 'MEDIA', 'BAJO': 'BAJA'}
+    
+    SEVERITY_IMPACT = {
+        'CRÍTICA': 'Compromete directamente la confidencialidad de los datos cifrados',
+        'ALTA': 'Reduce significativamente el margen de seguridad',
+        'MEDIA': 'Debilidad que puede facilitar otros ataques',
+        'BAJA': 'Impacto limitado'
+    }
+    
+    @staticmethod
+    def analysis_data_from_evaluations(aes_analysis=None, rsa_analysis=None):
+        """
+        Datos de análisis (formato de generate_full_report) a partir de las
+        evaluaciones que guarda la página de reportes (AES y/o RSA)
+        """
+        vulnerabilities = []
+        algorithms = []
+        technical_details = {}
+        
+        if aes_analysis:
+            algorithms.append('AES')
+            technical_details['aes'] = {
+                key: aes_analysis.get(key) for key in ('score', 'entropy', 'distribution', 'patterns')
+            }
+            for issue in aes_analysis.get('issues', []):
+                vuln_type, severity, recommendation = 'Debilidad de Configuración', 'MEDIA', 'Revisar la configuración'
+                for marker, known_type, known_severity, known_recommendation in ReportGenerator.AES_ISSUE_TYPES:
+                    if marker in issue:
+                        vuln_type, severity, recommendation = known_type, known_severity, known_recommendation
+                        break
+                vulnerabilities.append({
+                    'type': vuln_type,
+                    'severity': severity,
+                    'description': issue,
+                    'impact': ReportGenerator.SEVERITY_IMPACT[severity],
+                    'recommendation': recommendation
+                })
+        
+        if rsa_analysis:
+            algorithms.append('RSA')
+            technical_details['rsa'] = {
+                key: rsa_analysis.get(key) for key in ('score', 'bit_length', 'exponent')
+            }
+            for issue in (rsa_analysis.get('key_properties') or {}).get('issues', []):
+                severity = ReportGenerator.SEVERITY_NAMES.get(issue.get('severity'), 'MEDIA')
+                vulnerabilities.append({
+                    'type': ReportGenerator.RSA_ISSUE_TYPES.get(issue.get('type'), issue.get('type')),
+                    'severity': severity,
+                    'description': issue.get('detail', ''),
+                    'impact': ReportGenerator.SEVERITY_IMPACT[severity],
+                    'recommendation': issue.get('recommendation', '')
+                })
+        
+        return {
+            'algorithm': ' + '.join(algorithms) or 'Desconocido',
+            'vulnerabilities': vulnerabilities,
+            'technical_details': technical_details
+        }
+    
+    @staticmethod
+    def _findings(analysis_data):
+        """Hallazgos del análisis como FindingsCollection (lista de dicts o colección)"""
+        vulnerabilities = analysis_data.get('vulnerabilities', [])
+        if isinstance(vulnerabilities, FindingsCollection):
+            return vulnerabilities
+        return FindingsCollection(vulnerabilities)
+    
+    @staticmethod
+    def consolidate(analyses):
+        """
+        Fusiona los resultados de varios análisis en uno solo para un reporte consolidado
+        
+        Args:
+            analyses: Iterable de diccionarios de análisis (mismo formato que
+                generate_full_report); los hallazgos se etiquetan con su algoritmo
+        
+        Returns:
+            Diccionario de análisis con una FindingsCollection en 'vulnerabilities'
+        """
+        findings = FindingsCollection()
+        algorithms = []
+        technical_details = {}
+        
+        for index, analysis_data in enumerate(analyses):
+            algorithm = analysis_data.get('algorithm', 'Desconocido')
+            if algorithm not in algorithms:
+                algorithms.append(algorithm)
+            vulnerabilities = analysis_data.get('vulnerabilities', [])
+            if isinstance(vulnerabilities, FindingsCollection):
+                findings.merge(vulnerabilities)
+            else:
+                findings.extend(vulnerabilities, source=algorithm)
+            if analysis_data.get('technical_details'):
+                technical_details[f'{index}:{algorithm}'] = analysis_data['technical_details']
+        
+        return {
+            'algorithm': ' + '.join(algorithms) or 'Desconocido',
+            'vulnerabilities': findings,
+            'technical_details': technical_details
+        }
+    
     @staticmethod
     def generate_full_report(analysis_data):
         """
         Genera un reporte completo de auditoría
         
         Args:
-            analysis_data: Diccionario con resultados de análisis
+            analysis_data: Diccionario con resultados de análisis; 'vulnerabilities'
+                puede ser una lista de diccionarios o una FindingsCollection
         
         Returns:
             Diccionario con el reporte formateado
         """
+        findings = ReportGenerator._findings(analysis_data)
         report = {
             'metadata': {
                 'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'tool': 'CryptoAnalyzer v1.0',
                 'analyst': 'Sistema Automatizado'
             },
-            'executive_summary': ReportGenerator._generate_executive_summary(analysis_data),
-            'detailed_findings': analysis_data.get('vulnerabilities', []),
-            'recommendations': ReportGenerator._generate_recommendations(analysis_data),
+            'executive_summary': ReportGenerator._generate_executive_summary(analysis_data, findings),
+            'detailed_findings': findings.to_dicts(),
+            'recommendations': ReportGenerator._generate_recommendations(analysis_data, findings),
             'technical_details': analysis_data.get('technical_details', {}),
-            'risk_assessment': ReportGenerator._generate_risk_assessment(analysis_data)
+            'risk_assessment': ReportGenerator._generate_risk_assessment(analysis_data, findings)
         }
         
         return report
     
     @staticmethod
-    def _generate_executive_summary(analysis_data):
+    def _generate_executive_summary(analysis_data, findings=None):
         """Genera resumen ejecutivo del análisis"""
         algorithm = analysis_data.get('algorithm', 'Desconocido')
-        vulnerabilities = analysis_data.get('vulnerabilities', [])
+        findings = findings if findings is not None else ReportGenerator._findings(analysis_data)
         
-        critical_count = sum(1 for v in vulnerabilities if v['severity'] == 'CRÍTICA')
-        high_count = sum(1 for v in vulnerabilities if v['severity'] == 'ALTA')
+        critical_count = findings.count('CRÍTICA')
+        high_count = findings.count('ALTA')
         
         if critical_count > 0:
             risk_level = 'CRÍTICO'
@@ -50,7 +214,7 @@ class ReportGenerator:
         elif high_count > 0:
             risk_level = 'ALTO'
             summary = f'El análisis del algoritmo {algorithm} identificó {high_count} vulnerabilidad(es) de alta severidad que deben ser atendidas prioritariamente.'
-        elif len(vulnerabilities) > 0:
+        elif len(findings) > 0:
             risk_level = 'MEDIO'
             summary = f'El análisis del algoritmo {algorithm} encontró algunas debilidades que deberían ser consideradas para mejorar la seguridad.'
         else:
@@ -60,16 +224,16 @@ class ReportGenerator:
         return {
             'algorithm': algorithm,
             'risk_level': risk_level,
-            'total_vulnerabilities': len(vulnerabilities),
+            'total_vulnerabilities': len(findings),
             'critical_vulnerabilities': critical_count,
             'high_vulnerabilities': high_count,
             'summary': summary
         }
     
     @staticmethod
-    def _generate_recommendations(analysis_data):
+    def _generate_recommendations(analysis_data, findings=None):
         """Genera recomendaciones basadas en vulnerabilidades encontradas"""
-        vulnerabilities = analysis_data.get('vulnerabilities', [])
+        findings = findings if findings is not None else ReportGenerator._findings(analysis_data)
         algorithm = analysis_data.get('algorithm', '').lower()
         
         recommendations = []
@@ -86,9 +250,7 @@ class ReportGenerator:
             })
         
         # Recomendaciones específicas por vulnerabilidad
-        vuln_types = set(v['type'] for v in vulnerabilities)
-        
-        if 'Modo ECB No Seguro' in vuln_types:
+        if findings.has_type('Modo ECB No Seguro'):
             recommendations.append({
                 'priority': 'CRÍTICA',
                 'category': 'Configuración de Cifrado',
@@ -98,7 +260,7 @@ class ReportGenerator:
                 'security_impact': 'Crítico'
             })
         
-        if 'Tamaño de Clave Insuficiente' in vuln_types or 'Clave Demasiado Corta' in vuln_types:
+        if findings.has_type('Tamaño de Clave Insuficiente') or findings.has_type('Clave Demasiado Corta'):
             recommendations.append({
                 'priority': 'ALTA',
                 'category': 'Gestión de Claves',
@@ -108,7 +270,7 @@ class ReportGenerator:
                 'security_impact': 'Alto'
             })
         
-        if 'Sin Autenticación' in vuln_types:
+        if findings.has_type('Sin Autenticación'):
             recommendations.append({
                 'priority': 'MEDIA',
                 'category': 'Integridad de Datos',
@@ -118,7 +280,7 @@ class ReportGenerator:
                 'security_impact': 'Alto'
             })
         
-        if 'Reutilización de IV/Nonce' in vuln_types:
+        if findings.has_type('Reutilización de IV/Nonce'):
             recommendations.append({
                 'priority': 'CRÍTICA',
                 'category': 'Vectores de Inicialización',
@@ -150,18 +312,10 @@ class ReportGenerator:
         return recommendations
     
     @staticmethod
-    def _generate_risk_assessment(analysis_data):
+    def _generate_risk_assessment(analysis_data, findings=None):
         """Genera evaluación de riesgos"""
-        vulnerabilities = analysis_data.get('vulnerabilities', [])
-        
-        risk_scores = {
-            'CRÍTICA': 10,
-            'ALTA': 7,
-            'MEDIA': 4,
-            'BAJA': 1
-        }
-        
-        total_risk = sum(risk_scores.get(v['severity'], 0) for v in vulnerabilities)
+        findings = findings if findings is not None else ReportGenerator._findings(analysis_data)
+        total_risk = findings.risk_score
         
         if total_risk >= 20:
             overall_risk = 'CRÍTICO'
@@ -181,191 +335,27 @@ class ReportGenerator:
             'risk_score': total_risk,
             'risk_description': risk_description,
             'vulnerabilities_by_severity': {
-                'critical': sum(1 for v in vulnerabilities if v['severity'] == 'CRÍTICA'),
-                'high': sum(1 for v in vulnerabilities if v['severity'] == 'ALTA'),
-                'medium': sum(1 for v in vulnerabilities if v['severity'] == 'MEDIA'),
-                'low': sum(1 for v in vulnerabilities if v['severity'] == 'BAJA')
+                'critical': findings.count('CRÍTICA'),
+                'high': findings.count('ALTA'),
+                'medium': findings.count('MEDIA'),
+                'low': findings.count('BAJA')
             }
         }
     
+    @staticmethod
+    def stream_html_report(report, chunk_size=STREAM_CHUNK_SIZE):
+        """HTML del reporte por fragmentos, renderizado con la plantilla precompilada"""
+        return _buffered(HTML_TEMPLATE.generate(report=report), chunk_size)
+    
+    @staticmethod
+    def stream_json_report(report, chunk_size=STREAM_CHUNK_SIZE):
+        """JSON del reporte por fragmentos, codificando los hallazgos de uno en uno"""
+        return _buffered(_json_pieces(report), chunk_size)
+    
     @staticmethod
     def format_html_report(report):
         """Formatea el reporte en HTML para visualización"""
-        html = f"""
-        <!DOCTYPE html>
-        <html lang="es">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Reporte de Auditoría Criptográfica</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    max-width: 1200px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background: #f5f5f5;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                    color: white;
-                    padding: 30px;
-                    border-radius: 10px;
-                    margin-bottom: 30px;
-                }}
-                .header h1 {{
-                    margin: 0;
-                    font-size: 2.5em;
-                }}
-                .metadata {{
-                    background: white;
-                    padding: 20px;
-                    border-radius: 8px;
-                    margin-bottom: 20px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .executive-summary {{
-                    background: white;
-                    padding: 25px;
-                    border-radius: 8px;
-                    margin-bottom: 20px;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .risk-badge {{
-                    display: inline-block;
-                    padding: 8px 16px;
-                    border-radius: 20px;
-                    font-weight: bold;
-                    font-size: 0.9em;
-                }}
-                .risk-CRÍTICO {{ background: #dc3545; color: white; }}
-                .risk-ALTO {{ background: #fd7e14; color: white; }}
-                .risk-MEDIO {{ background: #ffc107; color: black; }}
-                .risk-BAJO {{ background: #28a745; color: white; }}
-                .vulnerability {{
-                    background: white;
-                    padding: 20px;
-                    margin-bottom: 15px;
-                    border-radius: 8px;
-                    border-left: 4px solid #dc3545;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .vulnerability.ALTA {{ border-left-color: #fd7e14; }}
-                .vulnerability.MEDIA {{ border-left-color: #ffc107; }}
-                .vulnerability.BAJA {{ border-left-color: #28a745; }}
-                .recommendation {{
-                    background: white;
-                    padding: 20px;
-                    margin-bottom: 15px;
-                    border-radius: 8px;
-                    border-left: 4px solid #007bff;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .stats {{
-                    display: grid;
-                    grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                    gap: 15px;
-                    margin-bottom: 20px;
-                }}
-                .stat-card {{
-                    background: white;
-                    padding: 20px;
-                    border-radius: 8px;
-                    text-align: center;
-                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-                }}
-                .stat-card h3 {{
-                    margin: 0;
-                    color: #666;
-                    font-size: 0.9em;
-                }}
-                .stat-card .number {{
-                    font-size: 2.5em;
-                    font-weight: bold;
-                    color: #667eea;
-                    margin: 10px 0;
-                }}
-                h2 {{
-                    color: #333;
-                    border-bottom: 2px solid #667eea;
-                    padding-bottom: 10px;
-                    margin-top: 30px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>🔒 Reporte de Auditoría Criptográfica</h1>
-                <p>CryptoAnalyzer - Análisis de Fortaleza Criptográfica</p>
-            </div>
-            
-            <div class="metadata">
-                <p><strong>Fecha de Generación:</strong> {report['metadata']['generated_at']}</p>
-                <p><strong>Herramienta:</strong> {report['metadata']['tool']}</p>
-                <p><strong>Algoritmo Analizado:</strong> {report['executive_summary']['algorithm']}</p>
-            </div>
-            
-            <div class="executive-summary">
-                <h2>📊 Resumen Ejecutivo</h2>
-                <p><strong>Nivel de Riesgo:</strong> <span class="risk-badge risk-{report['executive_summary']['risk_level']}">{report['executive_summary']['risk_level']}</span></p>
-                <p>{report['executive_summary']['summary']}</p>
-                
-                <div class="stats">
-                    <div class="stat-card">
-                        <h3>Total Vulnerabilidades</h3>
-                        <div class="number">{report['executive_summary']['total_vulnerabilities']}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Críticas</h3>
-                        <div class="number" style="color: #dc3545;">{report['executive_summary']['critical_vulnerabilities']}</div>
-                    </div>
-                    <div class="stat-card">
-                        <h3>Altas</h3>
-                        <div class="number" style="color: #fd7e14;">{report['executive_summary']['high_vulnerabilities']}</div>
-                    </div>
-                </div>
-            </div>
-            
-            <h2>🔍 Vulnerabilidades Detectadas</h2>
-        """
-        
-        if report['detailed_findings']:
-            for vuln in report['detailed_findings']:
-                html += f"""
-                <div class="vulnerability {vuln['severity']}">
-                    <h3>{vuln['type']} <span class="risk-badge risk-{vuln['severity']}">{vuln['severity']}</span></h3>
-                    <p><strong>Descripción:</strong> {vuln['description']}</p>
-                    <p><strong>Impacto:</strong> {vuln['impact']}</p>
-                    <p><strong>Recomendación:</strong> {vuln['recommendation']}</p>
-                </div>
-                """
-        else:
-            html += "<p>No se detectaron vulnerabilidades.</p>"
-        
-        html += "<h2>💡 Recomendaciones</h2>"
-        
-        for rec in report['recommendations']:
-            html += f"""
-            <div class="recommendation">
-                <h3>{rec['recommendation']} <span class="risk-badge risk-{rec['priority']}">{rec['priority']}</span></h3>
-                <p><strong>Categoría:</strong> {rec['category']}</p>
-                <p><strong>Detalles:</strong> {rec['details']}</p>
-                <p><strong>Esfuerzo Estimado:</strong> {rec['estimated_effort']} | <strong>Impacto en Seguridad:</strong> {rec['security_impact']}</p>
-            </div>
-            """
-        
-        html += f"""
-            <h2>⚠️ Evaluación de Riesgos</h2>
-            <div class="executive-summary">
-                <p><strong>Riesgo General:</strong> <span class="risk-badge risk-{report['risk_assessment']['overall_risk']}">{report['risk_assessment']['overall_risk']}</span></p>
-                <p><strong>Puntuación de Riesgo:</strong> {report['risk_assessment']['risk_score']}</p>
-                <p>{report['risk_assessment']['risk_description']}</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        return html
+        return ''.join(ReportGenerator.stream_html_report(report))
     
     @staticmethod
     def export_json(report):
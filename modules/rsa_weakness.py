@@ -0,0 +1,203 @@
+"""
+Comprobaciones rápidas de módulos RSA débiles
+
+- Factores pequeños: un único gcd con el primorial de todos los primos
+  menores que PRIMORIAL_BOUND (en vez de división por tentativa). El
+  primorial se calcula una vez y se guarda en DATA_DIR.
+- Módulo cuadrado perfecto (p == q).
+- Factorización de Fermat con presupuesto de CPU por clave, que rompe en
+  pocos pasos los módulos con p y q demasiado próximos.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import math
+import os
+import time
+
+import numpy as np
+
+from modules.batch_gcd import product_tree
+from modules.benchmark import data_path
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+PRIMORIAL_BOUND = 1_000_000
+
+# Presupuesto de CPU por clave para Fermat
+FERMAT_BUDGET_MS = 10
+
+# Máximo que puede pedir un cliente de la API
+MAX_FERMAT_BUDGET_MS = 10 * FERMAT_BUDGET_MS
+
+# Pasos de Fermat entre consultas del reloj de CPU
+FERMAT_CHECK_EVERY = 512
+
+# Restos cuadráticos módulo 64: descarta la mayoría de no cuadrados sin isqrt
+_SQUARES_MOD_64 = frozenset(i * i % 64 for i in range(64))
+
+_primorial_cache = {}
+
+
+def primes_below(bound):
+    """Primos menores que bound (criba de Eratóstenes con NumPy)"""
+    sieve = np.ones(bound, dtype=bool)
+    sieve[:2] = False
+    for p in range(2, math.isqrt(bound - 1) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = False
+    return np.flatnonzero(sieve)
+
+
+def primorial(bound=PRIMORIAL_BOUND):
+    """Producto de los primos menores que bound, memorizado y cacheado en disco"""
+    if bound in _primorial_cache:
+        return _primorial_cache[bound]
+
+    path = data_path('primorial', f'{bound}.bin')
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            value = int.from_bytes(f.read(), 'big')
+    else:
+        value = int(product_tree([int(p) for p in primes_below(bound)])[-1][0])
+        # Escritura atómica: otro proceso puede estar leyendo la caché
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+        os.replace(temp_path, path)
+
+    _primorial_cache[bound] = value
+    return value
+
+
+def is_perfect_square(n):
+    if gmpy2 is not None:
+        return bool(gmpy2.is_square(n))
+    if n < 0 or n % 64 not in _SQUARES_MOD_64:
+        return False
+    root = math.isqrt(n)
+    return root * root == n
+
+
+def small_factors(n, bound=PRIMORIAL_BOUND):
+    """Primos menores que bound que dividen a n (un gcd; solo se desglosa si hay alguno)"""
+    g = math.gcd(n, primorial(bound) % n)
+    if g == 1:
+        return []
+    factors = []
+    for p in primes_below(bound).tolist():
+        if g % p == 0:
+            factors.append(p)
+            g //= p
+            if g == 1:
+                break
+    return factors
+
+
+def fermat_factor(n, budget_ms=FERMAT_BUDGET_MS):
+    """
+    Factorización de Fermat acotada por tiempo de CPU del hilo que la ejecuta
+
+    Se usa time.thread_time(): process_time() sumaría la CPU del resto de
+    hilos del proceso (p. ej. peticiones concurrentes) y agotaría antes el
+    presupuesto.
+
+    Busca a tal que a^2 - n sea un cuadrado b^2, con n = (a - b)(a + b).
+    Si |p - q| es pequeño comparado con n^(1/4) basta con un paso.
+
+    Returns:
+        {'factors': (p, q) o None, 'steps', 'exhausted'}
+    """
+    if n % 2 == 0:
+        return {'factors': None, 'steps': 0, 'exhausted': False}
+
+    deadline = time.thread_time() + budget_ms / 1000
+    a = math.isqrt(n)
+    if a * a < n:
+        a += 1
+    b2 = a * a - n
+    steps = 0
+
+    while True:
+        if is_perfect_square(b2):
+            b = math.isqrt(b2)
+            if a - b > 1:
+                return {'factors': (a - b, a + b), 'steps': steps, 'exhausted': False}
+        # (a + 1)^2 - n = b2 + 2a + 1
+        b2 += 2 * a + 1
+        a += 1
+        steps += 1
+        if steps % FERMAT_CHECK_EVERY == 0 and time.thread_time() > deadline:
+            return {'factors': None, 'steps': steps, 'exhausted': True}
+
+
+def check_modulus(n, budget_ms=FERMAT_BUDGET_MS):
+    """
+    Comprobaciones de debilidad de un módulo
+
+    Returns:
+        {'issues': [...], 'checks': {...}} con issues en el formato de
+        VulnerabilityDetector.test_rsa_key_properties
+    """
+    issues = []
+    checks = {}
+
+    started = time.perf_counter()
+    factors = [p for p in small_factors(n) if p != 2]  # n par ya se reporta aparte
+    checks['small_factors_ms'] = (time.perf_counter() - started) * 1000
+    if factors:
+        issues.append({
+            'type': 'Factor primo pequeño',
+            'severity': 'CRÍTICO',
+            'detail': f'n es divisible por {", ".join(map(str, factors[:10]))}',
+            'recommendation': 'Regenerar clave con un generador de primos correcto'
+        })
+
+    started = time.perf_counter()
+    square = is_perfect_square(n)
+    checks['perfect_square_ms'] = (time.perf_counter() - started) * 1000
+    if square:
+        issues.append({
+            'type': 'Módulo cuadrado perfecto',
+            'severity': 'CRÍTICO',
+            'detail': 'n = p^2: la clave privada se obtiene con una raíz cuadrada',
+            'recommendation': 'Regenerar clave con p y q distintos'
+        })
+        return {'issues': issues, 'checks': checks}
+
+    started = time.perf_counter()
+    fermat = fermat_factor(n, budget_ms)
+    checks['fermat_ms'] = (time.perf_counter() - started) * 1000
+    checks['fermat_steps'] = fermat['steps']
+    checks['fermat_exhausted'] = fermat['exhausted']
+    if fermat['factors']:
+        p, q = fermat['factors']
+        issues.append({
+            'type': 'Primos demasiado próximos',
+            'severity': 'CRÍTICO',
+            'detail': f'Factorizado por Fermat en {fermat["steps"] + 1} pasos (|p - q| de {(q - p).bit_length()} bits)',
+            'recommendation': 'Regenerar clave con p y q generados de forma independiente'
+        })
+
+    return {'issues': issues, 'checks': checks}
+
+
+def _check_many(moduli, budget_ms):
+    return [check_modulus(n, budget_ms) for n in moduli]
+
+
+def check_moduli(moduli, budget_ms=FERMAT_BUDGET_MS, workers=None, chunk_size=256):
+    """check_modulus para muchos módulos, repartidos en trozos entre procesos"""
+    primorial()  # Se crea la caché en disco antes de arrancar los procesos
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(int(workers or cpu_count), cpu_count))
+    if workers == 1 or len(moduli) <= chunk_size:
+        return _check_many(moduli, budget_ms)
+
+    chunks = [moduli[i:i + chunk_size] for i in range(0, len(moduli), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_check_many, chunks, [budget_ms] * len(chunks))
+        return [result for chunk in results for result in chunk]
@@ -0,0 +1,367 @@
+"""
+Escáner de corpus: busca patrones ECB y textos cifrados débiles en muchos blobs
+
+Recorre un directorio (un blob por fichero) o un fichero con un texto
+cifrado en base64 por línea, analiza cada elemento en un pool de procesos
+y escribe un resultado NDJSON por elemento junto con un resumen agregado.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import base64
+import binascii
+import json
+import math
+import os
+import threading
+import uuid
+
+from modules.benchmark import data_path
+from modules.byte_stats import byte_statistics
+
+
+# Elementos por tarea enviada al pool
+SCAN_BATCH_SIZE = 64
+
+# Proporción de la entropía máxima posible por debajo de la cual se marca el blob
+LOW_ENTROPY_RATIO = 0.9
+
+# Por debajo de este tamaño la entropía de datos aleatorios varía demasiado
+MIN_ENTROPY_BYTES = 64
+
+# Blobs más sospechosos que se conservan en el resumen
+TOP_ITEMS = 20
+
+SEVERITY_ORDER = {'CRÍTICO': 0, 'ALTO': 1, 'MEDIO': 2, 'OK': 3, 'ERROR': 4}
+
+# Trabajos terminados que se conservan (con su NDJSON) antes de descartar los más antiguos
+MAX_FINISHED_JOBS = 50
+
+# Escaneos simultáneos (cada uno con su pool de procesos)
+MAX_RUNNING_JOBS = 2
+
+
+def iter_directory(path):
+    """
+    Elementos (id, tipo, ruta) de todos los ficheros bajo path, en orden estable
+
+    Los enlaces simbólicos se ignoran (os.walk tampoco entra en los de
+    directorio), así el escaneo nunca sale de path.
+    """
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full_path = os.path.join(root, name)
+            if os.path.islink(full_path):
+                continue
+            yield os.path.relpath(full_path, path), 'file', full_path
+
+
+def iter_lines(path):
+    """Elementos (id, tipo, base64) de un fichero con un texto cifrado por línea"""
+    with open(path, encoding='ascii', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if line:
+                yield f'{os.path.basename(path)}:{number}', 'line', line
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _load(kind, payload, encoding):
+    """Bytes de un elemento según su origen y la codificación pedida"""
+    if kind == 'line':
+        return base64.b64decode(payload, validate=True)
+
+    with open(payload, 'rb') as f:
+        data = f.read()
+    if encoding == 'raw':
+        return data
+    if encoding == 'base64':
+        return base64.b64decode(b''.join(data.split()), validate=True)
+
+    # auto: base64 si todo el contenido lo es, bytes tal cual si no
+    try:
+        decoded = base64.b64decode(b''.join(data.split()), validate=True)
+        return decoded if decoded else data
+    except (binascii.Error, ValueError):
+        return data
+
+
+def analyze_blob(data, block_size=16):
+    """Entropía, distribución y repetición de bloques de un blob, con marcas de riesgo"""
+    stats = byte_statistics(data, block_size)
+    blocks = stats['blocks']
+    total = stats['total_bytes']
+
+    # Con pocos bytes la entropía máxima alcanzable es log2(n), no 8
+    max_entropy = math.log2(min(total, 256)) if total > 1 else 0
+    entropy_ratio = stats['entropy'] / max_entropy if max_entropy else 0
+
+    flags = []
+    if total == 0:
+        flags.append('empty')
+    if blocks['repeated_blocks']:
+        flags.append('ecb')
+    if total >= MIN_ENTROPY_BYTES and entropy_ratio < LOW_ENTROPY_RATIO:
+        flags.append('low_entropy')
+    if total % block_size:
+        flags.append('unaligned')
+
+    if 'ecb' in flags:
+        severity = 'CRÍTICO'
+    elif 'low_entropy' in flags or 'empty' in flags:
+        severity = 'ALTO'
+    else:
+        severity = 'OK'
+
+    return {
+        'bytes': total,
+        'entropy': stats['entropy'],
+        'entropy_ratio': entropy_ratio,
+        'chi_squared': stats['chi_squared'],
+        'uniformity': stats['uniformity'],
+        'total_blocks': blocks['total_blocks'],
+        'repeated_blocks': blocks['repeated_blocks'],
+        'repetition_rate': blocks['repetition_rate'],
+        'repeats': blocks['repeats'][:3],
+        'flags': flags,
+        'severity': severity
+    }
+
+
+def _scan_batch(batch, encoding, block_size):
+    """Analiza un lote de elementos (se ejecuta en un proceso del pool)"""
+    results = []
+    for item_id, kind, payload in batch:
+        try:
+            result = analyze_blob(_load(kind, payload, encoding), block_size)
+        except Exception as e:
+            result = {'flags': ['error'], 'severity': 'ERROR', 'error': str(e)}
+        results.append(dict(result, id=item_id))
+    return results
+
+
+class ScanSummary:
+    """Resumen agregado de un escaneo, actualizado elemento a elemento"""
+
+    def __init__(self):
+        self.items = 0
+        self.errors = 0
+        self.total_bytes = 0
+        self.entropy_sum = 0.0
+        self.flags = {}
+        self.severities = {}
+        self.top = []
+
+    def add(self, result):
+        self.items += 1
+        self.severities[result['severity']] = self.severities.get(result['severity'], 0) + 1
+        for flag in result['flags']:
+            self.flags[flag] = self.flags.get(flag, 0) + 1
+
+        if result['severity'] == 'ERROR':
+            self.errors += 1
+            return
+
+        self.total_bytes += result['bytes']
+        self.entropy_sum += result['entropy']
+        if result['severity'] != 'OK':
+            self.top.append({
+                'id': result['id'],
+                'severity': result['severity'],
+                'flags': result['flags'],
+                'repetition_rate': result['repetition_rate'],
+                'entropy_ratio': result['entropy_ratio']
+            })
+            if len(self.top) > TOP_ITEMS * 2:
+                self._trim()
+
+    def _trim(self):
+        self.top.sort(key=lambda r: (SEVERITY_ORDER[r['severity']], -r['repetition_rate'], r['entropy_ratio']))
+        del self.top[TOP_ITEMS:]
+
+    def to_dict(self):
+        self._trim()
+        analyzed = self.items - self.errors
+        return {
+            'items': self.items,
+            'analyzed': analyzed,
+            'errors': self.errors,
+            'total_bytes': self.total_bytes,
+            'mean_entropy': self.entropy_sum / analyzed if analyzed else 0,
+            'flags': dict(self.flags),
+            'severities': dict(self.severities),
+            'flagged': self.items - self.severities.get('OK', 0) - self.errors,
+            'top': list(self.top)
+        }
+
+
+def scan(source, lines=False, output=None, workers=None, encoding='auto', block_size=16,
+         progress=None, cancelled=None):
+    """
+    Escanea un directorio o un fichero de líneas base64
+
+    Args:
+        source: Directorio (un blob por fichero) o fichero de líneas
+        lines: Tratar source como fichero con un texto cifrado base64 por línea
+        output: Flujo de texto donde escribir un resultado JSON por línea
+        workers: Procesos del pool (1 analiza en el propio proceso)
+        encoding: 'auto', 'raw' o 'base64' para los ficheros de un directorio
+        progress: Función opcional llamada con el ScanSummary tras cada lote
+        cancelled: Función opcional; si devuelve True el escaneo se detiene
+
+    Returns:
+        Resumen agregado (ScanSummary.to_dict())
+    """
+    if lines and not os.path.isfile(source):
+        raise ValueError(f'No existe el fichero {source}')
+    if not lines and not os.path.isdir(source):
+        raise ValueError(f'No existe el directorio {source}')
+    if encoding not in ('auto', 'raw', 'base64'):
+        raise ValueError(f'Codificación no soportada: {encoding}')
+
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(int(workers or cpu_count), cpu_count))
+    batches = _batched(iter_lines(source) if lines else iter_directory(source), SCAN_BATCH_SIZE)
+    summary = ScanSummary()
+
+    def consume(results):
+        for result in results:
+            if output is not None:
+                output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            summary.add(result)
+        if progress:
+            progress(summary)
+
+    if workers == 1:
+        for batch in batches:
+            if cancelled and cancelled():
+                break
+            consume(_scan_batch(batch, encoding, block_size))
+        return summary.to_dict()
+
+    # Ventana acotada de lotes en vuelo: memoria constante y resultados en orden
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for batch in batches:
+            if cancelled and cancelled():
+                break
+            pending.append(executor.submit(_scan_batch, batch, encoding, block_size))
+            if len(pending) >= workers * 2:
+                consume(pending.popleft().result())
+        while pending:
+            consume(pending.popleft().result())
+
+    return summary.to_dict()
+
+
+# ============================================
+# TRABAJOS EN SEGUNDO PLANO
+# ============================================
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def start_scan_job(source, lines=False, encoding='auto', workers=None, label=None):
+    """
+    Lanza un escaneo en un hilo; los resultados van a DATA_DIR/scans/<id>.ndjson
+
+    label es el nombre de source que se muestra en el estado público del
+    trabajo (por defecto, la propia ruta). Con MAX_RUNNING_JOBS escaneos en
+    curso se rechazan los nuevos.
+    """
+    label = label or source
+    if lines and not os.path.isfile(source):
+        raise ValueError(f'No existe el fichero {label}')
+    if not lines and not os.path.isdir(source):
+        raise ValueError(f'No existe el directorio {label}')
+
+    job_id = uuid.uuid4().hex[:12]
+    job = {
+        'id': job_id,
+        'status': 'running',
+        'source': label,
+        'lines': lines,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'finished_at': None,
+        'output': data_path('scans', f'{job_id}.ndjson'),
+        'summary': None,
+        'error': None,
+        'cancel': False
+    }
+
+    def run():
+        def progress(summary):
+            job['summary'] = summary.to_dict()
+
+        try:
+            with open(job['output'], 'w', encoding='utf-8') as output:
+                job['summary'] = scan(source, lines, output, workers, encoding,
+                                      progress=progress, cancelled=lambda: job['cancel'])
+            job['status'] = 'cancelled' if job['cancel'] else 'finished'
+        except Exception as e:
+            job['status'] = 'error'
+            job['error'] = str(e)
+        job['finished_at'] = datetime.now().isoformat(timespec='seconds')
+
+    with _jobs_lock:
+        running = sum(1 for other in _jobs.values() if other['status'] == 'running')
+        if running >= MAX_RUNNING_JOBS:
+            raise ValueError(f'Ya hay {running} escaneos en curso; espere a que terminen')
+        _prune_jobs_locked()
+        _jobs[job_id] = job
+    threading.Thread(target=run, name=f'scan-{job_id}', daemon=True).start()
+    return get_scan_job(job_id)
+
+
+def _prune_jobs_locked():
+    """Descarta los trabajos terminados más antiguos y sus resultados"""
+    finished = [job_id for job_id, job in _jobs.items() if job['finished_at'] is not None]
+    for job_id in finished[:-MAX_FINISHED_JOBS]:
+        job = _jobs.pop(job_id)
+        try:
+            os.remove(job['output'])
+        except OSError:
+            pass
+
+
+def get_scan_job(job_id):
+    """Estado público de un trabajo (None si no existe)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+    return {key: value for key, value in job.items() if key not in ('output', 'cancel')}
+
+
+def scan_job_output(job_id):
+    """Ruta del NDJSON de un trabajo (None si no existe)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    return job['output'] if job else None
+
+
+def cancel_scan_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return None
+    job['cancel'] = True
+    return get_scan_job(job_id)
+
+
+def list_scan_jobs():
+    with _jobs_lock:
+        job_ids = list(_jobs)
+    return [get_scan_job(job_id) for job_id in job_ids]
@@ -32,6 +32,7 @@ function updateTextSize() {
 // Variables globales para almacenar resultados
 let aesResults = null;
 let rsaResults = null;
+let aesMatrixResults = null;
 
 // ============================================
 // BENCHMARK AES
@@ -62,6 +63,7 @@ async function runAESBenchmark() {
             aesResults = data.results;
             displayAESResults(data.results);
             showNotification('Benchmark AES completado', 'success');
+            reportRegressions(data.history);
         } else {
             showNotification('Error: ' + data.error, 'error');
         }
@@ -88,6 +90,8 @@ function displayAESResults(results) {
                 <td>${result.encrypt_time_ms.toFixed(3)} ms</td>
                 <td>${result.decrypt_time_ms.toFixed(3)} ms</td>
                 <td><strong>${result.total_time_ms.toFixed(3)} ms</strong></td>
+                <td>${formatStatsCell(result)}</td>
+                <td>${formatThroughputCell(result, 'mb')}</td>
                 <td>${getSpeedRating(result.total_time_ms, results)}</td>
             </tr>
         `;
@@ -234,6 +238,7 @@ async function runRSABenchmark() {
             rsaResults = data.results;
             displayRSAResults(data.results);
             showNotification('Benchmark RSA completado', 'success');
+            reportRegressions(data.history);
         } else {
             showNotification('Error: ' + data.error, 'error');
         }
@@ -261,6 +266,8 @@ function displayRSAResults(results) {
                 <td>${result.encrypt_time_ms.toFixed(3)} ms</td>
                 <td>${result.decrypt_time_ms.toFixed(3)} ms</td>
                 <td><strong>${result.total_time_ms.toFixed(3)} ms</strong></td>
+                <td>${formatStatsCell(result)}</td>
+                <td>${formatThroughputCell(result, 'ops')}</td>
                 <td>${getSpeedRating(result.total_time_ms, results)}</td>
             </tr>
         `;
@@ -362,6 +369,48 @@ function createRSAChart(results) {
     });
 }
 
+async function runRSAKeygenBenchmark() {
+    document.getElementById('rsa-keygen-loading').style.display = 'block';
+    document.getElementById('rsa-keygen-result').style.display = 'none';
+    
+    try {
+        const response = await fetch('/api/benchmark/rsa/keygen', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ key_sizes: [1024, 2048], runs: 20 })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            let tbody = '';
+            data.results.forEach(result => {
+                const stats = result.stats;
+                tbody += `
+                    <tr>
+                        <td><strong>RSA-${result.key_size}</strong></td>
+                        <td>${result.runs} (${result.workers} procesos)</td>
+                        <td>${stats.median_ms.toFixed(1)}</td>
+                        <td>${stats.mean_all_ms.toFixed(1)}</td>
+                        <td>${stats.p95_ms.toFixed(1)}</td>
+                        <td>${stats.p99_ms.toFixed(1)}</td>
+                        <td>${stats.max_ms.toFixed(1)}</td>
+                    </tr>
+                `;
+            });
+            document.getElementById('rsa-keygen-tbody').innerHTML = tbody;
+            document.getElementById('rsa-keygen-result').style.display = 'block';
+            showNotification('Benchmark de generación completado', 'success');
+        } else {
+            showNotification('Error: ' + data.error, 'error');
+        }
+    } catch (error) {
+        showNotification('Error de conexión: ' + error, 'error');
+    } finally {
+        document.getElementById('rsa-keygen-loading').style.display = 'none';
+    }
+}
+
 function getRSAConclusion(factor) {
     if (factor < 5) {
         return 'Diferencia moderada entre tamaños. RSA-2048 ofrece buen balance.';
@@ -372,6 +421,271 @@ function getRSAConclusion(factor) {
     }
 }
 
+// ============================================
+// MATRIZ AES
+// ============================================
+const MATRIX_PAYLOAD_SIZES = [16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864];
+
+async function runAESMatrixBenchmark() {
+    const iterations = parseInt(document.getElementById('benchmark-iterations').value);
+    const maxPayload = parseInt(document.getElementById('matrix-max-payload').value);
+    const payloadSizes = MATRIX_PAYLOAD_SIZES.filter(size => size <= maxPayload);
+    
+    document.getElementById('aes-matrix-loading').style.display = 'block';
+    document.getElementById('aes-matrix-result').style.display = 'none';
+    
+    try {
+        const response = await fetch('/api/benchmark/aes/matrix', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ payload_sizes: payloadSizes, samples: Math.min(iterations, 30) })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            aesMatrixResults = data.results;
+            displayAESMatrixResults(data.results);
+            showNotification('Matriz AES completada', 'success');
+        } else {
+            showNotification('Error: ' + data.error, 'error');
+        }
+    } catch (error) {
+        showNotification('Error de conexión: ' + error, 'error');
+    } finally {
+        document.getElementById('aes-matrix-loading').style.display = 'none';
+    }
+}
+
+function displayAESMatrixResults(results) {
+    const best = results.summary.reduce((prev, current) =>
+        prev.steady_state_mb_s > current.steady_state_mb_s ? prev : current
+    );
+    
+    let tbody = '';
+    results.summary.forEach(row => {
+        const isBest = row === best;
+        const badge = isBest ? '<span class="material-icons" style="color: #00ff00;">flash_on</span>' : '';
+        const warning = row.mode === 'ECB' ? '<span style="color: #ff0000;">⚠️</span> ' : '';
+        
+        tbody += `
+            <tr class="${isBest ? 'fastest-row' : ''}">
+                <td><strong>${warning}${row.mode}</strong> ${badge}</td>
+                <td>AES-${row.key_size}</td>
+                <td>${row.key_setup_us.toFixed(2)}</td>
+                <td>${row.per_message_us.toFixed(2)}</td>
+                <td><strong>${row.steady_state_mb_s.toFixed(1)}</strong></td>
+                <td>${row.peak_mb_s.toFixed(1)}</td>
+            </tr>
+        `;
+    });
+    
+    document.getElementById('aes-matrix-tbody').innerHTML = tbody;
+    document.getElementById('aes-matrix-result').style.display = 'block';
+    
+    createMatrixChart();
+}
+
+function createMatrixChart() {
+    if (!aesMatrixResults) return;
+    
+    const ctx = document.getElementById('aes-matrix-chart');
+    const keySize = parseInt(document.getElementById('matrix-chart-key-size').value);
+    const palette = ['255, 0, 0', '0, 255, 0', '0, 255, 255', '255, 255, 0', '255, 0, 255', '255, 128, 0'];
+    
+    if (window.aesMatrixChartInstance) {
+        window.aesMatrixChartInstance.destroy();
+    }
+    
+    const datasets = aesMatrixResults.modes.map((mode, index) => ({
+        label: mode,
+        data: aesMatrixResults.rows
+            .filter(row => row.mode === mode && row.key_size === keySize)
+            .map(row => ({ x: row.payload_bytes, y: row.mb_per_s })),
+        borderColor: `rgba(${palette[index % palette.length]}, 1)`,
+        backgroundColor: `rgba(${palette[index % palette.length]}, 0.3)`,
+        borderWidth: 2,
+        fill: false
+    }));
+    
+    window.aesMatrixChartInstance = new Chart(ctx, {
+        type: 'line',
+        data: { datasets: datasets },
+        options: {
+            responsive: true,
+            plugins: {
+                title: {
+                    display: true,
+                    text: `Rendimiento AES-${keySize} según tamaño de mensaje`,
+                    color: '#00ff00',
+                    font: { size: 18 }
+                },
+                legend: {
+                    labels: { color: '#00ff00' }
+                }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: { color: '#00ff00' },
+                    grid: { color: 'rgba(0, 255, 0, 0.1)' },
+                    title: {
+                        display: true,
+                        text: 'MB/s',
+                        color: '#00ff00'
+                    }
+                },
+                x: {
+                    type: 'logarithmic',
+                    ticks: {
+                        color: '#00ff00',
+                        callback: value => formatBytes(value)
+                    },
+                    grid: { color: 'rgba(0, 255, 0, 0.1)' },
+                    title: {
+                        display: true,
+                        text: 'Tamaño del mensaje',
+                        color: '#00ff00'
+                    }
+                }
+            }
+        }
+    });
+}
+
+function formatBytes(bytes) {
+    if (bytes >= 1048576) return `${+(bytes / 1048576).toFixed(1)} MB`;
+    if (bytes >= 1024) return `${+(bytes / 1024).toFixed(1)} KB`;
+    return `${bytes} B`;
+}
+
+// ============================================
+// CLÁSICOS Y CRIPTOANÁLISIS
+// ============================================
+const COMPLEXITY_SIZES = [100, 1000, 10000, 50000, 200000];
+
+async function runComplexityBenchmark(kind) {
+    const maxSize = parseInt(document.getElementById('complexity-max-size').value);
+    const sizes = COMPLEXITY_SIZES.filter(size => size <= maxSize);
+    
+    document.getElementById('complexity-loading').style.display = 'block';
+    document.getElementById('complexity-result').style.display = 'none';
+    
+    try {
+        const response = await fetch(`/api/benchmark/${kind}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ sizes: sizes, samples: 5 })
+        });
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            displayComplexityResults(kind, data.results);
+            showNotification('Benchmark completado', 'success');
+        } else {
+            showNotification('Error: ' + data.error, 'error');
+        }
+    } catch (error) {
+        showNotification('Error de conexión: ' + error, 'error');
+    } finally {
+        document.getElementById('complexity-loading').style.display = 'none';
+    }
+}
+
+function displayComplexityResults(kind, results) {
+    document.getElementById('complexity-title').textContent =
+        kind === 'classic' ? 'Cifrados Clásicos' : 'Criptoanálisis';
+    
+    let tbody = '';
+    results.forEach(result => {
+        const exponent = result.complexity_exponent !== null ? result.complexity_exponent.toFixed(2) : '-';
+        result.points.forEach((point, index) => {
+            tbody += `
+                <tr>
+                    <td><strong>${index === 0 ? result.name : ''}</strong></td>
+                    <td>${point.size.toLocaleString()}</td>
+                    <td>${point.median_ms.toFixed(4)}</td>
+                    <td>${Math.round(point.chars_per_s).toLocaleString()}</td>
+                    <td>${formatBytes(point.peak_memory_bytes)}</td>
+                    <td>${point.memory_per_char.toFixed(2)}</td>
+                    <td>${index === 0 ? exponent : ''}</td>
+                </tr>
+            `;
+        });
+    });
+    
+    document.getElementById('complexity-tbody').innerHTML = tbody;
+    document.getElementById('complexity-result').style.display = 'block';
+    
+    window.complexityTimeChartInstance = createComplexityChart(
+        'complexity-time-chart', window.complexityTimeChartInstance, results,
+        point => point.chars_per_s, 'Rendimiento según longitud del texto', 'Caracteres/s'
+    );
+    window.complexityMemoryChartInstance = createComplexityChart(
+        'complexity-memory-chart', window.complexityMemoryChartInstance, results,
+        point => point.peak_memory_bytes, 'Memoria pico según longitud del texto', 'Bytes'
+    );
+}
+
+function createComplexityChart(canvasId, previous, results, value, title, axisLabel) {
+    const palette = ['255, 0, 0', '0, 255, 0', '0, 255, 255', '255, 255, 0', '255, 0, 255', '255, 128, 0'];
+    
+    if (previous) {
+        previous.destroy();
+    }
+    
+    const datasets = results.map((result, index) => ({
+        label: result.name.split('/')[1],
+        data: result.points.map(point => ({ x: point.size, y: value(point) })),
+        borderColor: `rgba(${palette[index % palette.length]}, 1)`,
+        backgroundColor: `rgba(${palette[index % palette.length]}, 0.3)`,
+        borderWidth: 2,
+        fill: false
+    }));
+    
+    return new Chart(document.getElementById(canvasId), {
+        type: 'line',
+        data: { datasets: datasets },
+        options: {
+            responsive: true,
+            plugins: {
+                title: {
+                    display: true,
+                    text: title,
+                    color: '#00ff00',
+                    font: { size: 18 }
+                },
+                legend: {
+                    labels: { color: '#00ff00' }
+                }
+            },
+            scales: {
+                y: {
+                    type: 'logarithmic',
+                    ticks: { color: '#00ff00' },
+                    grid: { color: 'rgba(0, 255, 0, 0.1)' },
+                    title: {
+                        display: true,
+                        text: axisLabel,
+                        color: '#00ff00'
+                    }
+                },
+                x: {
+                    type: 'logarithmic',
+                    ticks: { color: '#00ff00' },
+                    grid: { color: 'rgba(0, 255, 0, 0.1)' },
+                    title: {
+                        display: true,
+                        text: 'Longitud del texto (caracteres)',
+                        color: '#00ff00'
+                    }
+                }
+            }
+        }
+    });
+}
+
 // ============================================
 // COMPARACIÓN GLOBAL
 // ============================================
@@ -595,6 +909,56 @@ function getSpeedRating(time, allResults) {
     return '<span style="color: #ff6f00;">🔴 Lento</span>';
 }
 
+function formatStatsCell(result) {
+    const enc = result.encrypt_stats;
+    const dec = result.decrypt_stats;
+    if (!enc || !dec) return '-';
+    
+    const margin = stats => ((stats.ci95_ms[1] - stats.ci95_ms[0]) / 2).toFixed(3);
+    
+    return `
+        <small>
+            p95: ${enc.p95_ms.toFixed(3)} / ${dec.p95_ms.toFixed(3)} ms<br>
+            p99: ${enc.p99_ms.toFixed(3)} / ${dec.p99_ms.toFixed(3)} ms<br>
+            σ: ${enc.stddev_ms.toFixed(3)} / ${dec.stddev_ms.toFixed(3)} ms<br>
+            IC95: ±${margin(enc)} / ±${margin(dec)} ms<br>
+            Atípicos: ${enc.outliers} / ${dec.outliers} de ${enc.samples}${formatMemoryLine(enc, dec)}
+        </small>
+    `;
+}
+
+function formatMemoryLine(enc, dec) {
+    if (!enc.memory || !dec.memory) return '';
+    
+    const perByte = memory => memory.peak_bytes_per_input_byte !== null
+        ? ` (${memory.peak_bytes_per_input_byte.toFixed(1)} B/B)` : '';
+    
+    return `<br>Memoria pico: ${formatBytes(enc.memory.peak_bytes)}${perByte(enc.memory)} / ` +
+        `${formatBytes(dec.memory.peak_bytes)}${perByte(dec.memory)}`;
+}
+
+function formatThroughputCell(result, unit) {
+    const enc = result.encrypt_stats;
+    const dec = result.decrypt_stats;
+    if (!enc || !dec) return '-';
+    
+    if (unit === 'mb') {
+        return `<small>${enc.mb_per_s.toFixed(2)} / ${dec.mb_per_s.toFixed(2)} MB/s</small>`;
+    }
+    return `<small>${enc.ops_per_s.toFixed(1)} / ${dec.ops_per_s.toFixed(1)} ops/s</small>`;
+}
+
+function reportRegressions(history) {
+    if (!history || !history.regressions || history.regressions.length === 0) return;
+    
+    const worst = history.regressions[0];
+    console.warn('Regresiones frente a la ejecución base', history.baseline_run_id, history.regressions);
+    showNotification(
+        `Regresión detectada: ${worst.name} ${worst.slowdown_percent.toFixed(1)}% más lento que la base (${history.regressions.length} en total)`,
+        'warning'
+    );
+}
+
 function getRelativeSpeed(time, fastestTime) {
     const factor = (time / fastestTime).toFixed(1);
     return `${factor}x`;
@@ -164,6 +164,7 @@ function displayAESAnalysis(analysis) {
         <p style="margin-top: 10px; font-size: 14px;">
             <strong>Chi-cuadrado:</strong> ${dist.chi_squared.toFixed(2)}
         </p>
+        ${formatRandomnessTests(analysis.randomness)}
     `;
     
     // Patrones
@@ -180,6 +181,10 @@ function displayAESAnalysis(analysis) {
         <p style="font-size: 12px; color: #666; margin-top: 5px;">
             ${patterns.repetition_rate.toFixed(1)}% de repetición
         </p>
+        ${patterns.repeats && patterns.repeats.length ? `
+        <p style="font-size: 12px; color: #666; margin-top: 5px;">
+            Bloque más repetido: ${patterns.repeats[0].count} veces (offsets ${patterns.repeats[0].offsets.slice(0, 5).join(', ')})
+        </p>` : ''}
         <p style="margin-top: 10px; font-size: 14px;">
             ${patterns.repetition_rate < 5 ? '✓ No hay patrones sospechosos' : 
               patterns.repetition_rate < 15 ? '⚠ Algunos bloques se repiten' : 
@@ -631,6 +636,24 @@ function displayRSAAnalysis(analysis, padding) {
 // ============================================
 // GUARDAR RESULTADOS EN LOCALSTORAGE
 // ============================================
+function formatRandomnessTests(randomness) {
+    if (!randomness || !randomness.applicable) return '';
+    
+    const rows = randomness.tests.filter(test => test.applicable).map(test => `
+        <li style="color: ${test.passed ? '#28a745' : '#d32f2f'};">
+            ${test.passed ? '✓' : '✗'} ${test.name}: p = ${test.p_value.toFixed(4)}
+        </li>
+    `).join('');
+    
+    return `
+        <p style="margin-top: 10px; font-size: 14px;">
+            <strong>Pruebas SP 800-22:</strong> ${randomness.passed} / ${randomness.applicable} superadas
+            (${randomness.bits} bits, α = ${randomness.alpha})
+        </p>
+        <ul style="font-size: 12px; margin-top: 5px;">${rows}</ul>
+    `;
+}
+
 function saveAESAnalysis(evaluation) {
     try {
         const analysisData = {